@@ -0,0 +1,149 @@
+import os
+import re
+import json
+import time
+import shutil
+import sqlite3
+import tempfile
+import threading
+from contextlib import closing
+
+from media_cache import normalize_url
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Artifact types
+VIRAL_ANALYSIS = "viral_analysis"
+MIND_MAP = "mind_map"
+VISUAL_DEEP_DIVE = "visual_deep_dive"
+VISUAL_TIMELINE = "visual_timeline"
+RECREATION_SCRIPT = "recreation_script"
+CAMPAIGN = "campaign"
+STORYBOARD = "storyboard"
+PODCAST = "podcast"
+PDF = "pdf"
+AUDIO_TRANSCRIPT = "audio_transcript"
+
+TEXT, JSON, FILE = "text", "json", "file"
+
+
+def source_key(source):
+    """Stable key for a source: its database id, or the normalized URL for unsaved previews."""
+    key = str(source.get("id") or normalize_url(source.get("url", "")))
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", key)
+
+
+class ArtifactStore:
+    """
+    Generated outputs per (source, artifact type): files on local disk plus a SQLite metadata table.
+    Each source has its own directory, so one job can never overwrite another source's PDF or podcast;
+    storing the same type again replaces only that source's previous version.
+    """
+
+    def __init__(self, root=None):
+        self.root = root or os.getenv("ARTIFACT_DIR", os.path.join(BASE_DIR, ".cache", "artifacts"))
+        os.makedirs(self.root, exist_ok=True)
+        self.db_path = os.path.join(self.root, "artifacts.sqlite3")
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS artifacts (
+                    source TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    format TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    size INTEGER,
+                    meta TEXT,
+                    created_at REAL,
+                    PRIMARY KEY (source, kind)
+                )
+            """)
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+
+    def _target(self, source, kind, ext):
+        folder = os.path.join(self.root, source)
+        os.makedirs(folder, exist_ok=True)
+        return os.path.join(folder, kind + ext)
+
+    def _record(self, source, kind, fmt, path, meta):
+        with closing(self._connect()) as conn:
+            old = conn.execute("SELECT path FROM artifacts WHERE source = ? AND kind = ?", (source, kind)).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO artifacts (source, kind, format, path, size, meta, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (source, kind, fmt, path, os.path.getsize(path), json.dumps(meta or {}), time.time()),
+            )
+        if old and old[0] != path and os.path.exists(old[0]):
+            os.remove(old[0])  # e.g. a .txt replaced by a .json
+        return self.get(source, kind)
+
+    def _write(self, target, data):
+        # Write-then-rename, so a reader never sees a half-written artifact
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(target), prefix=".tmp_")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, target)
+        return target
+
+    def put_text(self, source, kind, text, ext=".md", meta=None):
+        path = self._write(self._target(source, kind, ext), (text or "").encode("utf-8"))
+        return self._record(source, kind, TEXT, path, meta)
+
+    def put_json(self, source, kind, value, meta=None):
+        path = self._write(self._target(source, kind, ".json"), json.dumps(value).encode("utf-8"))
+        return self._record(source, kind, JSON, path, meta)
+
+    def put_file(self, source, kind, file_path, move=True, meta=None):
+        """Store a generated file (PDF, mp3, ...); it is moved out of its scratch dir unless `move=False`."""
+        target = self._target(source, kind, os.path.splitext(file_path)[1])
+        tmp = target + ".part"
+        (shutil.move if move else shutil.copyfile)(file_path, tmp)
+        os.replace(tmp, target)
+        return self._record(source, kind, FILE, target, meta)
+
+    def get(self, source, kind):
+        """Metadata for one artifact ({"path", "format", "size", "meta", "created_at"}), or None."""
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT format, path, size, meta, created_at FROM artifacts WHERE source = ? AND kind = ?", (source, kind)
+            ).fetchone()
+        if not row or not os.path.exists(row[1]):
+            return None
+        fmt, path, size, meta, created_at = row
+        return {"source": source, "kind": kind, "format": fmt, "path": path, "size": size,
+                "meta": json.loads(meta or "{}"), "created_at": created_at}
+
+    def load(self, source, kind):
+        """The artifact's value: str for text, decoded JSON, or the file path for files. None if missing."""
+        record = self.get(source, kind)
+        if not record:
+            return None
+        if record["format"] == FILE:
+            return record["path"]
+        with open(record["path"], encoding="utf-8") as f:
+            return json.load(f) if record["format"] == JSON else f.read()
+
+    def list(self, source):
+        with closing(self._connect()) as conn:
+            kinds = [k for (k,) in conn.execute("SELECT kind FROM artifacts WHERE source = ?", (source,))]
+        return {kind: record for kind in kinds if (record := self.get(source, kind))}
+
+    def delete(self, source, kind):
+        record = self.get(source, kind)
+        with closing(self._connect()) as conn:
+            conn.execute("DELETE FROM artifacts WHERE source = ? AND kind = ?", (source, kind))
+        if record:
+            os.remove(record["path"])
+
+
+_store = None
+_lock = threading.Lock()
+
+
+def get_artifact_store():
+    global _store
+    with _lock:
+        if _store is None:
+            _store = ArtifactStore()
+    return _store
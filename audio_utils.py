@@ -0,0 +1,96 @@
+import os
+import shutil
+import subprocess
+
+# OpenAI TTS `response_format="pcm"`: raw 24 kHz, 16-bit signed little-endian, mono
+TTS_PCM_RATE = 24000
+TTS_PCM_WIDTH = 2
+TTS_PCM_CHANNELS = 1
+
+# What Whisper expects: 16 kHz mono
+WHISPER_SAMPLE_RATE = 16000
+
+
+def silence_pcm(duration_ms, sample_rate=TTS_PCM_RATE, sample_width=TTS_PCM_WIDTH, channels=TTS_PCM_CHANNELS):
+    frames = int(sample_rate * duration_ms / 1000)
+    return b"\x00" * (frames * sample_width * channels)
+
+
+def join_pcm(chunks, gap_ms=0, sample_rate=TTS_PCM_RATE, sample_width=TTS_PCM_WIDTH, channels=TTS_PCM_CHANNELS):
+    """Concatenate raw PCM chunks in one pass, appending `gap_ms` of silence after each chunk."""
+    gap = silence_pcm(gap_ms, sample_rate, sample_width, channels) if gap_ms else b""
+    return b"".join(chunk + gap for chunk in chunks)
+
+
+def export_pcm(pcm, out_path, format="mp3", sample_rate=TTS_PCM_RATE, sample_width=TTS_PCM_WIDTH, channels=TTS_PCM_CHANNELS):
+    """Encode a raw PCM buffer to `out_path` with a single ffmpeg pass."""
+    from pydub import AudioSegment
+
+    audio = AudioSegment(data=pcm, sample_width=sample_width, frame_rate=sample_rate, channels=channels)
+    audio.export(out_path, format=format)
+    return out_path
+
+
+# --- 🔊 DIRECT FFMPEG DEMUX ---
+def ffmpeg_binary():
+    """FFMPEG_BINARY, else the system ffmpeg, else the copy bundled with imageio-ffmpeg (a MoviePy dependency)."""
+    binary = os.getenv("FFMPEG_BINARY") or shutil.which("ffmpeg")
+    if binary:
+        return binary
+    import imageio_ffmpeg
+    return imageio_ffmpeg.get_ffmpeg_exe()
+
+
+def _ffmpeg_audio_args(video_path, sample_rate, start=None, max_seconds=None):
+    # -vn: never open the video decoder; only the audio stream is demuxed and resampled
+    seek = ["-ss", str(start)] if start else []  # before -i: seeks in the input instead of decoding up to it
+    limit = ["-t", str(max_seconds)] if max_seconds else []
+    return [ffmpeg_binary(), "-nostdin", "-hide_banner", "-loglevel", "error", "-threads", "0",
+            *seek, "-i", video_path, *limit, "-vn", "-sn", "-dn", "-ac", "1", "-ar", str(sample_rate)]
+
+
+def extract_audio_ffmpeg(video_path, out_path, sample_rate=WHISPER_SAMPLE_RATE):
+    """Write the audio track of `video_path` to `out_path` as 16-bit mono PCM WAV."""
+    cmd = _ffmpeg_audio_args(video_path, sample_rate) + ["-acodec", "pcm_s16le", "-y", out_path]
+    proc = subprocess.run(cmd, capture_output=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg audio extraction failed: {proc.stderr.decode(errors='ignore').strip()}")
+    return out_path
+
+
+def extract_audio_moviepy(video_path, out_path, sample_rate=WHISPER_SAMPLE_RATE):
+    """Previous path: opens the whole clip (video reader included) and pipes the audio through MoviePy."""
+    from moviepy import VideoFileClip
+
+    clip = VideoFileClip(video_path)
+    clip.audio.write_audiofile(out_path, codec='pcm_s16le', ffmpeg_params=["-ac", "1", "-ar", str(sample_rate)], logger=None)
+    clip.close()
+    return out_path
+
+
+def probe_duration(media_path):
+    """Duration in seconds from the container header (ffprobe); None when ffprobe is missing or cannot tell."""
+    binary = os.getenv("FFPROBE_BINARY") or shutil.which("ffprobe")
+    if not binary:
+        return None
+    proc = subprocess.run([binary, "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", media_path],
+                          capture_output=True)
+    try:
+        return float(proc.stdout.decode().strip())
+    except ValueError:
+        return None
+
+
+def load_audio(video_path, sample_rate=WHISPER_SAMPLE_RATE, start=None, max_seconds=None):
+    """
+    Decode the audio track straight into a float32 NumPy array in [-1, 1] — the in-memory
+    input both Whisper backends accept — without writing a WAV file. `start`/`max_seconds`
+    decode only that window.
+    """
+    import numpy as np
+
+    cmd = _ffmpeg_audio_args(video_path, sample_rate, start, max_seconds) + ["-f", "s16le", "-acodec", "pcm_s16le", "-"]
+    proc = subprocess.run(cmd, capture_output=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg audio decode failed: {proc.stderr.decode(errors='ignore').strip()}")
+    return np.frombuffer(proc.stdout, np.int16).astype(np.float32) / 32768.0
@@ -0,0 +1,154 @@
+import os
+import queue
+import bisect
+import threading
+from concurrent.futures import Future
+
+from audio_utils import load_audio, WHISPER_SAMPLE_RATE
+from longform import speech_regions, plan_chunks
+from model_pool import get_model_pool, default_backend, FASTER_WHISPER
+
+try:
+    from faster_whisper import BatchedInferencePipeline
+except ImportError:
+    BatchedInferencePipeline = None
+
+# Clips (and 30 s windows of longer clips) decoded together in one batched call; 0 or 1 disables batching
+BATCH_SIZE = int(os.getenv("WHISPER_BATCH_SIZE", "8"))
+BATCH_BEAM_SIZE = int(os.getenv("WHISPER_BATCH_BEAM_SIZE", "5"))
+# How long the batcher waits for more clips before decoding a partial batch
+BATCH_WAIT = float(os.getenv("WHISPER_BATCH_WAIT_MS", "250")) / 1000
+
+WINDOW_SECONDS = 30  # Whisper's context: every batch item is at most one window
+
+
+def batching_enabled(backend=None):
+    return BATCH_SIZE > 1 and BatchedInferencePipeline is not None and (backend or default_backend()) == FASTER_WHISPER
+
+
+def _windows(audio, sample_rate):
+    """Speech windows of one clip in samples, each at most WINDOW_SECONDS (cut in silences where possible)."""
+    duration = len(audio) / sample_rate
+    if duration <= WINDOW_SECONDS:
+        return [(0, len(audio))]
+    chunks = plan_chunks(speech_regions(audio, sample_rate), duration, target=WINDOW_SECONDS, overlap=0)
+    windows = [(int(s * sample_rate), min(len(audio), int(e * sample_rate))) for s, e in chunks]
+    return [(s, e) for s, e in windows if e > s]
+
+
+def _detect_language(model, audio):
+    try:
+        return model.detect_language(audio)[0]
+    except (AttributeError, TypeError):
+        return None  # older faster-whisper: the batched call detects one language for the batch
+
+
+def transcribe_batch(clips, model_size="base", compute_type="int8", batch_size=None, beam_size=None, language=None,
+                     cpu_threads=0):
+    """
+    Transcribe several clips (paths or 16 kHz float32 arrays) with one batched faster-whisper decode
+    per language: the clips are laid end to end, each cut into <=30 s windows passed as
+    `clip_timestamps`, so windows of different reels share a batch. Returns one
+    {"text", "language", "segments"} per clip, in input order, with clip-relative timestamps.
+    """
+    import numpy as np
+
+    sample_rate = WHISPER_SAMPLE_RATE
+    batch_size = batch_size or BATCH_SIZE
+    beam_size = beam_size or BATCH_BEAM_SIZE
+    audios = [load_audio(c) if isinstance(c, str) else c for c in clips]
+    model = get_model_pool().get(model_size, backend=FASTER_WHISPER, compute_type=compute_type, cpu_threads=cpu_threads)
+    pipeline = BatchedInferencePipeline(model=model)
+
+    languages = [language or _detect_language(model, a) for a in audios]
+    results = [{"text": "", "language": lang, "segments": []} for lang in languages]
+    for lang in dict.fromkeys(languages):
+        members = [i for i, l in enumerate(languages) if l == lang]
+        offsets, timestamps, position = [], [], 0
+        for i in members:
+            offsets.append(position)
+            timestamps += [{"start": position + s, "end": position + e} for s, e in _windows(audios[i], sample_rate)]
+            position += len(audios[i])
+        if not timestamps:
+            continue  # nothing but silence
+        joined = np.concatenate([audios[i] for i in members])
+
+        segments, info = pipeline.transcribe(joined, language=lang, beam_size=beam_size, batch_size=batch_size,
+                                             clip_timestamps=timestamps, vad_filter=False, without_timestamps=False)
+        starts = [o / sample_rate for o in offsets]
+        for seg in segments:
+            k = max(0, bisect.bisect_right(starts, seg.start) - 1)
+            result = results[members[k]]
+            result["language"] = result["language"] or info.language
+            result["segments"].append({"start": round(seg.start - starts[k], 2), "end": round(seg.end - starts[k], 2),
+                                       "text": seg.text.strip()})
+    for result in results:
+        result["text"] = " ".join(s["text"] for s in result["segments"]).strip()
+    return results
+
+
+class WhisperBatcher:
+    """
+    Micro-batcher shared by the threads of one worker process: `submit` queues a clip and returns a
+    Future; a background thread takes whatever has arrived within BATCH_WAIT (up to `batch_size`
+    clips with the same model settings) and decodes it with one `transcribe_batch` call.
+    """
+
+    def __init__(self, batch_size=None, beam_size=None, max_wait=None):
+        self.batch_size = batch_size or BATCH_SIZE
+        self.beam_size = beam_size or BATCH_BEAM_SIZE
+        self.max_wait = BATCH_WAIT if max_wait is None else max_wait
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._loop, name="whisper-batcher", daemon=True)
+        self._thread.start()
+        self.batches = 0
+        self.clips = 0
+
+    def submit(self, audio, model_size="base", compute_type="int8", beam_size=None, cpu_threads=0):
+        future = Future()
+        self._queue.put(((model_size, compute_type, beam_size or self.beam_size, cpu_threads), audio, future))
+        return future
+
+    def transcribe(self, audio, model_size="base", compute_type="int8", beam_size=None, cpu_threads=0, timeout=None):
+        return self.submit(audio, model_size, compute_type, beam_size, cpu_threads).result(timeout)
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        held = []
+        try:
+            while len(batch) < self.batch_size:
+                item = self._queue.get(timeout=self.max_wait)
+                (batch if item[0] == batch[0][0] else held).append(item)
+        except queue.Empty:
+            pass
+        for item in held:
+            self._queue.put(item)  # other model settings go in a later batch
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            (model_size, compute_type, beam_size, cpu_threads), futures = batch[0][0], [item[2] for item in batch]
+            try:
+                results = transcribe_batch([item[1] for item in batch], model_size, compute_type,
+                                           batch_size=self.batch_size, beam_size=beam_size, cpu_threads=cpu_threads)
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.clips += len(batch)
+            for future, result in zip(futures, results):
+                future.set_result(result)
+
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def get_batcher():
+    global _batcher
+    with _batcher_lock:
+        if _batcher is None:
+            _batcher = WhisperBatcher()
+        return _batcher
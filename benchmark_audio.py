@@ -0,0 +1,64 @@
+"""
+Compare audio extraction paths on real reels:
+
+    python benchmark_audio.py reel1.mp4 reel2.mp4 --runs 3
+
+- moviepy:       VideoFileClip(...).audio.write_audiofile (the old convert_video_to_audio)
+- ffmpeg-wav:    ffmpeg demux straight to 16 kHz mono WAV (-vn, video never decoded)
+- ffmpeg-numpy:  ffmpeg demux into an in-memory float32 array, no file written
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+from audio_utils import extract_audio_ffmpeg, extract_audio_moviepy, load_audio, WHISPER_SAMPLE_RATE
+from workspace import JobWorkspace
+
+
+def _time(fn, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), result
+
+
+def benchmark(video_path, runs=3):
+    with JobWorkspace(prefix="bench_") as ws:
+        methods = {
+            "moviepy": lambda: extract_audio_moviepy(video_path, ws.file("moviepy.wav")),
+            "ffmpeg-wav": lambda: extract_audio_ffmpeg(video_path, ws.file("ffmpeg.wav")),
+            "ffmpeg-numpy": lambda: load_audio(video_path),
+        }
+        rows = {}
+        for name, fn in methods.items():
+            seconds, result = _time(fn, runs)
+            if isinstance(result, str):
+                samples = (os.path.getsize(result) - 44) // 2  # 16-bit mono, 44-byte WAV header
+            else:
+                samples = len(result)
+            rows[name] = (seconds, samples)
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark MoviePy vs direct ffmpeg audio extraction")
+    parser.add_argument("videos", nargs="+")
+    parser.add_argument("--runs", type=int, default=3, help="Runs per method (median is reported)")
+    args = parser.parse_args(argv)
+
+    print(f"{'video':<32} {'method':<13} {'median s':>9} {'audio s':>8} {'x realtime':>11} {'speedup':>8}")
+    for video in args.videos:
+        rows = benchmark(video, args.runs)
+        baseline = rows["moviepy"][0]
+        for name, (seconds, samples) in rows.items():
+            audio_seconds = samples / WHISPER_SAMPLE_RATE
+            print(f"{os.path.basename(video)[:32]:<32} {name:<13} {seconds:>9.3f} {audio_seconds:>8.1f} "
+                  f"{audio_seconds / seconds:>11.0f} {baseline / seconds:>7.1f}x")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
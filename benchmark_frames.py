@@ -0,0 +1,56 @@
+"""
+Compare vision payload encodings on real reels:
+
+    python benchmark_frames.py reel1.mp4 reel2.mp4 --frames 12
+
+- native-q90:  full-resolution JPEG at quality 90 (the old encode_jpeg path)
+- jpeg-1024:   VISION_ENCODING defaults, longest edge 1024, JPEG quality 80
+- webp-1024:   same size as WebP
+- low-512:     low detail mode, 512px (flat 85 tokens per image)
+"""
+import os
+import sys
+import time
+import argparse
+
+from frames import FrameEncoding, VISION_ENCODING, LOW_DETAIL_ENCODING, encode_image, image_tokens, scaled_size, get_frame_sampler
+
+ENCODINGS = {
+    "native-q90": FrameEncoding(None, "jpeg", 90, "high"),
+    "jpeg-1024": VISION_ENCODING._replace(fmt="jpeg"),
+    "webp-1024": VISION_ENCODING._replace(fmt="webp"),
+    "low-512": LOW_DETAIL_ENCODING._replace(fmt="jpeg"),
+}
+
+
+def benchmark(video_path, n_frames=12):
+    sampler = get_frame_sampler(video_path)
+    raw = [frame for _, frame in sampler.sample(sampler.select(n_frames))]
+    rows = {}
+    for name, encoding in ENCODINGS.items():
+        start = time.perf_counter()
+        sizes = [len(encode_image(frame, encoding)) for frame in raw]
+        seconds = time.perf_counter() - start
+        height, width = raw[0].shape[:2]
+        tokens = image_tokens(*scaled_size((width, height), encoding.max_edge), detail=encoding.detail)
+        rows[name] = (sum(sizes) / len(sizes), tokens, seconds / len(raw))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark frame resize/recompression for vision requests")
+    parser.add_argument("videos", nargs="+")
+    parser.add_argument("--frames", type=int, default=12, help="Frames per video (picked by FrameSampler.select)")
+    args = parser.parse_args(argv)
+
+    print(f"{'video':<32} {'encoding':<11} {'KB/frame':>9} {'tokens':>7} {'ms/frame':>9} {'bytes vs native':>16}")
+    for video in args.videos:
+        rows = benchmark(video, args.frames)
+        baseline = rows["native-q90"][0]
+        for name, (size, tokens, seconds) in rows.items():
+            print(f"{os.path.basename(video)[:32]:<32} {name:<11} {size / 1024:>9.1f} {tokens:>7} "
+                  f"{seconds * 1000:>9.1f} {size / baseline:>15.0%}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""
+Full-text search latency on synthetic transcripts:
+
+    python benchmark_search.py --sizes 10000 100000
+
+Builds a throwaway FTS5 index per size and reports build time plus median/p95 query
+latency for word, phrase, prefix and multi-word queries, next to a linear substring
+scan (what `ilike '%q%'` does) over the same texts.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import statistics
+
+from search_index import TranscriptIndex
+from workspace import JobWorkspace
+
+# Real words for the queries, padded with generated ones to a speech-sized vocabulary
+WORDS = ("the and you this that it to is for with hook growth viral reel creator audience camera edit "
+         "story brand trend content lighting transition caption music voice engagement retention workout "
+         "recipe travel fashion beauty morning routine tips secret mistake lesson money business marketing").split()
+VOCAB_SIZE = 20000
+
+
+def synthetic_transcripts(n, words_per_doc=180, seed=7):
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    vocab = WORDS + ["".join(rng.choices(letters, k=rng.randint(3, 9))) for _ in range(VOCAB_SIZE - len(WORDS))]
+    # Zipf word frequencies, like real speech
+    weights = [1 / (i + 1) for i in range(len(vocab))]
+    for i in range(n):
+        yield {"url": f"https://www.instagram.com/reel/bench{i}/", "title": " ".join(rng.choices(vocab, weights, k=4)),
+               "text": " ".join(rng.choices(vocab, weights, k=words_per_doc)), "id": i}
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def bench(fn, queries, repeat):
+    timings = []
+    for _ in range(repeat):
+        for q in queries:
+            start = time.perf_counter()
+            fn(q)
+            timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), percentile(timings, 0.95)
+
+
+def run(size, repeat):
+    queries = {
+        "word": ["secret", "lighting", "recipe"],
+        "phrase": ['"morning routine"', '"viral hook"', '"brand story"'],
+        "prefix": ["retent*", "mark*", "eng*"],
+        "multi": ["camera lighting tips", "money mistake lesson", "travel fashion"],
+    }
+    with JobWorkspace(prefix="bench_search_") as ws:
+        index = TranscriptIndex(ws.file("search.sqlite3"))
+        docs = list(synthetic_transcripts(size))
+        start = time.perf_counter()
+        for i in range(0, size, 5000):
+            index.upsert_many(docs[i:i + 5000])
+        index.rebuild()
+        build = time.perf_counter() - start
+        size_mb = os.path.getsize(index.db_path) / 1e6
+        print(f"\n{size:,} transcripts — build {build:.1f}s ({size / build:,.0f} docs/s), index {size_mb:.0f} MB")
+        print(f"  {'query':<8} {'fts p50 ms':>11} {'fts p95 ms':>11} {'scan p50 ms':>12}")
+        texts = [d["text"] for d in docs]
+        for kind, qs in queries.items():
+            p50, p95 = bench(lambda q: index.search(q, limit=20), qs, repeat)
+            needle = qs[0].strip('"*').split()[0]
+            scan, _ = bench(lambda q: [t for t in texts if needle in t.lower()], [needle], 1)
+            print(f"  {kind:<8} {p50:>11.2f} {p95:>11.2f} {scan:>12.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the transcript full-text index")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+    for size in args.sizes:
+        run(size, args.repeat)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
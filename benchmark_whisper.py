@@ -0,0 +1,68 @@
+"""
+Compare one-at-a-time and batched faster-whisper decoding on a set of short reels:
+
+    python benchmark_whisper.py reel1.mp4 reel2.mp4 ... --model small --batch-sizes 4 8 16 --beams 1 5
+
+- sequential:   one TranscriptStream (model.transcribe, beam 5) per clip, as ingest did
+- batch-N-bM:   transcribe_batch over all clips, batch size N, beam size M
+
+Throughput is audio seconds transcribed per wall-clock second (higher is better).
+"""
+import sys
+import time
+import argparse
+
+from audio_utils import load_audio, WHISPER_SAMPLE_RATE
+from batch_whisper import transcribe_batch, BatchedInferencePipeline
+from model_pool import get_model_pool, FASTER_WHISPER
+from transcription import TranscriptStream
+
+
+def _sequential(audios, model_size, compute_type):
+    return [TranscriptStream(a, model_size, backend=FASTER_WHISPER, compute_type=compute_type, long_form=False).result()
+            for a in audios]
+
+
+def benchmark(paths, model_size="small", compute_type="int8", batch_sizes=(4, 8, 16), beams=(1, 5)):
+    audios = [load_audio(p) for p in paths]
+    audio_seconds = sum(len(a) for a in audios) / WHISPER_SAMPLE_RATE
+    get_model_pool().get(model_size, backend=FASTER_WHISPER, compute_type=compute_type)  # load outside the timings
+
+    methods = {"sequential": lambda: _sequential(audios, model_size, compute_type)}
+    for batch_size in batch_sizes:
+        for beam in beams:
+            methods[f"batch-{batch_size}-b{beam}"] = (
+                lambda b=batch_size, m=beam: transcribe_batch(audios, model_size, compute_type, batch_size=b, beam_size=m))
+
+    rows = {}
+    for name, fn in methods.items():
+        start = time.perf_counter()
+        results = fn()
+        seconds = time.perf_counter() - start
+        rows[name] = (seconds, sum(len(r["text"].split()) for r in results))
+    return audio_seconds, rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark batched vs one-at-a-time faster-whisper")
+    parser.add_argument("media", nargs="+", help="Audio or video files (short reels)")
+    parser.add_argument("--model", default="small")
+    parser.add_argument("--compute-type", default="int8")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[4, 8, 16])
+    parser.add_argument("--beams", type=int, nargs="+", default=[1, 5])
+    args = parser.parse_args(argv)
+
+    if BatchedInferencePipeline is None:
+        print("faster-whisper with BatchedInferencePipeline (>= 1.1) is required.")
+        return 1
+
+    audio_seconds, rows = benchmark(args.media, args.model, args.compute_type, args.batch_sizes, args.beams)
+    print(f"{len(args.media)} clips, {audio_seconds:.1f}s of audio, model {args.model} ({args.compute_type})")
+    print(f"{'method':<14} {'wall s':>8} {'audio s / wall s':>17} {'speedup':>8} {'words':>7}")
+    baseline = rows["sequential"][0]
+    for name, (seconds, words) in rows.items():
+        print(f"{name:<14} {seconds:>8.2f} {audio_seconds / seconds:>17.1f} {baseline / seconds:>7.1f}x {words:>7}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
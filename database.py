@@ -20,6 +20,11 @@ class DatabaseManager:
             return False
 
     def save_transcript(self, url, text, summary=None, metadata=None):
+        """
+        Upsert a transcript and update the local full-text index. Returns the saved row (with its
+        id) or False. Embedding it for semantic search is left to the caller (ingest's `index`
+        stage), so it finishes before a short-lived worker process exits.
+        """
         if not self.supabase:
             return False
         
@@ -33,11 +38,18 @@ class DatabaseManager:
         try:
             # Upsert is trickier in Supabase without a unique constraint violation handling or specific upsert call
             # Assuming 'url' is a unique key or primary key in the table "transcripts"
-            self.supabase.table("transcripts").upsert(data, on_conflict="url").execute()
-            return True
+            response = self.supabase.table("transcripts").upsert(data, on_conflict="url").execute()
         except Exception as e:
             st.error(f"Error saving to Supabase: {e}")
             return False
+        saved = {**data, "id": (response.data[0] if response.data else {}).get("id")}
+        # Keep the local full-text index in step; a failure here never fails the save
+        try:
+            from search_index import index_row
+            index_row(saved)
+        except Exception as e:
+            print(f"Search index update failed for {url}: {e}")
+        return saved
 
     def get_all_transcripts(self):
         if not self.supabase:
@@ -49,12 +61,64 @@ class DatabaseManager:
             st.error(f"Error fetching from Supabase: {e}")
             return []
 
-    def search_transcripts(self, query):
+    # Sidebar listing: only what a source row renders, never text/summary/segments
+    LIST_COLUMNS = "id, url, created_at, title:metadata->>title"
+
+    def list_transcripts(self, limit=25, cursor=None, search=None, columns=None):
+        """
+        One page of sources, newest first. `cursor` is the `next_cursor` returned for the previous
+        page. Keyset pagination on (created_at, id) keeps deep pages as cheap as the first, and the
+        id tiebreak means rows a batch saved in the same instant are neither skipped nor repeated.
+        Returns (rows, next_cursor); next_cursor is None on the last page.
+        `columns` overrides the projection (it must include created_at and id).
+        """
+        if not self.supabase:
+            return [], None
+        try:
+            query = self.supabase.table("transcripts").select(columns or self.LIST_COLUMNS)
+            if search:
+                term = "".join(c for c in search if c not in ',()"*')
+                query = query.or_(f"metadata->>title.ilike.*{term}*,url.ilike.*{term}*")
+            if cursor:
+                created_at, last_id = cursor
+                # Quoted: timestamps contain the '.' and ':' PostgREST reserves inside or=()
+                query = query.or_(f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt.{last_id})')
+            # One extra row tells us whether another page exists
+            response = query.order("created_at", desc=True).order("id", desc=True).limit(limit + 1).execute()
+            rows = response.data or []
+            next_cursor = (rows[limit - 1]["created_at"], rows[limit - 1]["id"]) if len(rows) > limit else None
+            return rows[:limit], next_cursor
+        except Exception as e:
+            st.error(f"Error fetching from Supabase: {e}")
+            return [], None
+
+    def get_transcript(self, transcript_id):
+        """Full row (text, summary, metadata) for one source, fetched only when it is opened."""
+        if not self.supabase:
+            return None
+        try:
+            response = self.supabase.table("transcripts").select("*").eq("id", transcript_id).limit(1).execute()
+            return response.data[0] if response.data else None
+        except Exception as e:
+            st.error(f"Error fetching from Supabase: {e}")
+            return None
+
+    def search_transcripts(self, query, limit=20):
+        """Full rows ranked by the local full-text index; falls back to ilike until the index has been built."""
         if not self.supabase:
             return []
         try:
-            # Simple text search on the 'text' column using ilike
-            # For full vector search, we'd need a different setup with embeddings
+            from search_index import get_search_index
+            index = get_search_index()
+            if index.count():
+                hits = index.search(query, limit=limit)
+                if not hits:
+                    return []
+                response = self.supabase.table("transcripts").select("*").in_("url", [h["url"] for h in hits]).execute()
+                by_url = {row["url"]: row for row in response.data}
+                return [{**by_url[h["url"]], "snippet": h["snippet"], "score": h["score"]} for h in hits if h["url"] in by_url]
+            # Index not built yet: simple ilike scan on the 'text' column
+            # Semantic (embedding) search lives in vector_index.find_reels
             response = self.supabase.table("transcripts").select("*").ilike("text", f"%{query}%").order("created_at", desc=True).execute()
             return response.data
         except Exception as e:
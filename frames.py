@@ -0,0 +1,237 @@
+import io
+import os
+import math
+import base64
+import threading
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+from PIL import Image
+
+# Tokens a request may spend on images, and how different two frames must be to both be sent
+VISION_TOKEN_BUDGET = int(os.getenv("VISION_TOKEN_BUDGET", "24000"))
+MIN_FRAME_DISTANCE = float(os.getenv("MIN_FRAME_DISTANCE", "0.08"))
+MAX_CANDIDATES = 240
+
+MIME_TYPES = {"jpeg": "image/jpeg", "webp": "image/webp"}
+
+
+class FrameEncoding(namedtuple("FrameEncoding", "max_edge fmt quality detail")):
+    """How frames are shrunk before they are sent: longest edge in px, jpeg/webp, quality, and the OpenAI detail mode."""
+
+    @property
+    def mime(self):
+        return MIME_TYPES[self.fmt]
+
+
+# Defaults sized for GPT-4o high detail: it downscales to 768px on the short side anyway, so
+# anything larger is bytes we upload for nothing. Low detail is a flat 85 tokens at 512px.
+VISION_ENCODING = FrameEncoding(
+    int(os.getenv("VISION_MAX_EDGE", "1024")),
+    os.getenv("VISION_IMAGE_FORMAT", "jpeg").lower(),
+    int(os.getenv("VISION_QUALITY", "80")),
+    os.getenv("VISION_DETAIL", "high"),
+)
+LOW_DETAIL_ENCODING = VISION_ENCODING._replace(max_edge=512, detail="low")
+
+
+def to_base64(data):
+    return base64.b64encode(data).decode("utf-8")
+
+
+def scaled_size(size, max_edge):
+    width, height = size
+    scale = min(1.0, max_edge / max(width, height)) if max_edge else 1.0
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def encode_image(frame, encoding=VISION_ENCODING):
+    """Downscale an RGB frame to `encoding.max_edge` and compress it as JPEG or WebP, in memory."""
+    img = Image.fromarray(frame).convert("RGB")
+    size = scaled_size(img.size, encoding.max_edge)
+    if size != img.size:
+        img = img.resize(size, Image.LANCZOS)
+    buf = io.BytesIO()
+    if encoding.fmt == "webp":
+        img.save(buf, format="WEBP", quality=encoding.quality, method=4)
+    else:
+        img.save(buf, format="JPEG", quality=encoding.quality, optimize=True)
+    return buf.getvalue()
+
+
+def image_part(frame, encoding=VISION_ENCODING):
+    """OpenAI chat content part for a frame dict from `FrameSampler.frames`, or a bare base64 string."""
+    if isinstance(frame, dict):
+        b64, mime, detail = frame["b64"], frame["mime"], frame["detail"]
+    else:
+        b64, mime, detail = frame, encoding.mime, encoding.detail
+    return {"type": "image_url", "image_url": {"url": f"data:{mime};base64,{b64}", "detail": detail}}
+
+
+def frame_signature(frame):
+    """
+    Cheap perceptual fingerprint of an RGB frame: a 64-bit difference hash (structure) and a
+    normalized 8-bin-per-channel colour histogram (palette/lighting).
+    """
+    img = Image.fromarray(frame).convert("RGB")
+    gray = np.asarray(img.convert("L").resize((9, 8), Image.BILINEAR), dtype=np.int16)
+    dhash = (gray[:, 1:] > gray[:, :-1]).ravel()
+    small = np.asarray(img.resize((32, 32), Image.BILINEAR)).reshape(-1, 3) // 32
+    hist = np.concatenate([np.bincount(small[:, c], minlength=8) for c in range(3)]).astype(np.float32)
+    return dhash, hist / hist.sum()
+
+
+def frame_distances(hashes, hists, hash_weight=0.5):
+    """Pairwise perceptual distance in [0, 1] between all frames: blended Hamming and histogram L1 distance."""
+    bits = np.asarray(hashes, dtype=np.float32)
+    hists = np.asarray(hists, dtype=np.float32)
+    # Row by row / via matrix products: memory stays O(n^2), never O(n^2 * bits)
+    hamming = (bits @ (1 - bits).T + (1 - bits) @ bits.T) / bits.shape[1]
+    hist_l1 = np.stack([np.abs(hists - row).sum(axis=1) for row in hists]) / 2
+    return hash_weight * hamming + (1 - hash_weight) * hist_l1
+
+
+def image_tokens(width, height, detail="high"):
+    """OpenAI vision token cost of one image: 85 for low detail, else 85 + 170 per 512px tile after scaling."""
+    if detail == "low":
+        return 85
+    scale = min(1.0, 2048 / max(width, height))
+    width, height = width * scale, height * scale
+    scale = min(1.0, 768 / min(width, height))
+    width, height = width * scale, height * scale
+    return 85 + 170 * math.ceil(width / 512) * math.ceil(height / 512)
+
+
+def pick_diverse(distances, novelty, k, forced=(), min_distance=MIN_FRAME_DISTANCE):
+    """
+    Greedy max-min selection over a distance matrix: start from `forced` (else the most novel frame),
+    then repeatedly add the frame farthest from everything chosen, weighted by its own novelty.
+    Frames closer than `min_distance` to a chosen one are near-duplicates and never picked.
+    Returns candidate indices in selection order (most informative first).
+    """
+    n = len(novelty)
+    chosen = list(dict.fromkeys(forced))[:k] or [int(np.argmax(novelty))]
+    nearest = distances[chosen].min(axis=0)
+    while len(chosen) < min(k, n):
+        score = nearest * (0.5 + novelty)
+        score[chosen] = -1
+        score[nearest < min_distance] = -1
+        best = int(np.argmax(score))
+        if score[best] < 0:
+            break  # everything left duplicates a chosen frame
+        chosen.append(best)
+        nearest = np.minimum(nearest, distances[best])
+    return chosen
+
+
+# --- 🎞️ SHARED FRAME SAMPLER ---
+class FrameSampler:
+    """
+    One open video serving frames to every visual feature (analysis, timeline, storyboard, PDF).
+    Requested timestamps are decoded in a single forward pass over the file, and the encoded
+    frames are kept, so a timestamp another feature already asked for is never decoded again.
+    """
+
+    def __init__(self, video_path):
+        self.video_path = video_path
+        self._clip = None
+        self._encoded = {}  # (t, encoding) -> image bytes
+        self._signatures = {}  # t -> (dhash, histogram)
+        self._lock = threading.Lock()
+
+    def _open(self):
+        if self._clip is None:
+            from moviepy import VideoFileClip
+            self._clip = VideoFileClip(self.video_path, audio=False)
+        return self._clip
+
+    @property
+    def duration(self):
+        with self._lock:
+            return self._open().duration
+
+    @property
+    def size(self):
+        with self._lock:
+            return tuple(self._open().size)
+
+    def _clamp(self, t):
+        # Timestamps past the last frame (e.g. `duration - 2` on a 1s clip) snap to the nearest frame
+        clip = self._open()
+        return min(max(0.0, t), max(0.0, clip.duration - 1.0 / (clip.fps or 30)))
+
+    def sample(self, timestamps):
+        """Yield (t, RGB array) for `timestamps` in ascending order, reading the file front to back once."""
+        with self._lock:
+            clip = self._open()
+            for t in sorted(set(timestamps)):
+                yield t, clip.get_frame(self._clamp(t))
+
+    def frames(self, timestamps, encoding=VISION_ENCODING):
+        """In-memory frames as {"t", "data", "b64", "mime", "detail"} dicts (see `encode_image`), in the order requested."""
+        missing = [t for t in set(timestamps) if (t, encoding) not in self._encoded]
+        for t, frame in self.sample(missing):
+            self._encoded[(t, encoding)] = encode_image(frame, encoding)
+        frames = []
+        for t in timestamps:
+            data = self._encoded[(t, encoding)]
+            frames.append({"t": t, "data": data, "b64": to_base64(data), "mime": encoding.mime, "detail": encoding.detail})
+        return frames
+
+    def signatures(self, timestamps):
+        """Perceptual signatures for `timestamps` (see `frame_signature`), decoded once and remembered."""
+        missing = [t for t in set(timestamps) if t not in self._signatures]
+        for t, frame in self.sample(missing):
+            self._signatures[t] = frame_signature(frame)
+        return [self._signatures[t] for t in timestamps]
+
+    def select(self, k, token_budget=None, encoding=VISION_ENCODING, include=(), step=None, min_distance=MIN_FRAME_DISTANCE):
+        """
+        The (at most) k most informative timestamps, ascending. Candidates on a fine grid (plus
+        `include`, e.g. scene cuts) are scored by perceptual change from the previous candidate;
+        near-duplicates are dropped and k is capped so the frames, as encoded, fit `token_budget` vision tokens.
+        The first frame (the hook) and `include` are kept first when they fit.
+        """
+        duration = self.duration
+        if token_budget:
+            k = min(k, max(1, token_budget // image_tokens(*scaled_size(self.size, encoding.max_edge), detail=encoding.detail)))
+        step = max(step or 0.5, duration / MAX_CANDIDATES)  # a fine step on a long video would decode thousands of frames
+        grid = [round(i * step, 2) for i in range(int(duration / step) + 1) if i * step < duration]
+        include = sorted({round(t, 2) for t in include if 0 <= t < duration})
+        candidates = sorted(set(grid) | set(include)) or [0.0]
+        if len(candidates) <= 1:
+            return candidates[:k]
+
+        hashes, hists = zip(*self.signatures(candidates))
+        distances = frame_distances(hashes, hists)
+        novelty = np.concatenate([[1.0], np.diagonal(distances, offset=1)])  # change vs. the previous candidate
+        novelty = novelty / max(novelty.max(), 1e-6)
+        forced = [0] + [candidates.index(t) for t in include]
+        chosen = pick_diverse(distances, novelty, k, forced=forced, min_distance=min_distance)
+        return sorted(candidates[i] for i in chosen)
+
+    def close(self):
+        with self._lock:
+            if self._clip is not None:
+                self._clip.close()
+                self._clip = None
+
+
+_samplers = OrderedDict()
+_samplers_lock = threading.Lock()
+
+
+def get_frame_sampler(video_path):
+    """
+    Shared sampler for `video_path`, cached across features and reruns. Keyed on the file's
+    identity, so a re-downloaded file gets a fresh sampler; the oldest videos are closed
+    beyond FRAME_CACHE_VIDEOS (default 4).
+    """
+    stat = os.stat(video_path)
+    key = (os.path.abspath(video_path), stat.st_size, stat.st_mtime)
+    with _samplers_lock:
+        sampler = _samplers.pop(key, None) or FrameSampler(video_path)
+        _samplers[key] = sampler
+        while len(_samplers) > int(os.getenv("FRAME_CACHE_VIDEOS", "4")):
+            _samplers.popitem(last=False)[1].close()
+    return sampler
@@ -3,13 +3,20 @@ import sys
 import json
 import time
 import shutil
+import argparse
 from datetime import datetime
 
 import yt_dlp
-from moviepy import VideoFileClip
 from openai import OpenAI
 from supabase import create_client
 
+from audio_utils import extract_audio_ffmpeg
+from media_cache import get_media_cache
+from model_pool import OPENAI_WHISPER
+from transcription import TranscriptStream
+from parallel import call_with_retry
+from pipeline import Pipeline, Stage, RunManifest, CPU, DONE, FAILED, SKIPPED, CACHED, format_timings
+
 try:
     import whisper
 except Exception:
@@ -40,6 +47,8 @@ except Exception:
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 EXPORT_DIR = os.path.join(BASE_DIR, "export")
+# The visual hook is a paid GPT-4o vision call: opt-in, with the same switch as ingest.py
+INGEST_VISUALS = os.getenv("INGEST_VISUALS", "0") == "1"
 
 
 def ensure_dir(path):
@@ -55,6 +64,10 @@ def log_step(label, ok, detail=None):
 
 
 def download_video(url, out_dir):
+    cached = get_media_cache().get(url)
+    if cached:
+        return cached
+
     ensure_dir(out_dir)
     ydl_opts = {
         "format": "bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best",
@@ -77,36 +90,29 @@ def download_video(url, out_dir):
     if not downloaded:
         raise RuntimeError("No video file downloaded.")
 
-    video_path = os.path.join(out_dir, downloaded[0])
-    return {
+    return get_media_cache().put(url, os.path.join(out_dir, downloaded[0]), {
         "title": title,
         "caption": description,
         "owner": uploader,
-        "video_path": video_path,
-    }
+    })
 
 
 def extract_audio(video_path, out_dir):
-    audio_path = os.path.join(out_dir, "audio.wav")
-    clip = VideoFileClip(video_path)
-    clip.audio.write_audiofile(audio_path, codec="pcm_s16le", ffmpeg_params=["-ac", "1", "-ar", "16000"], logger=None)
-    clip.close()
-    return audio_path
+    return extract_audio_ffmpeg(video_path, os.path.join(out_dir, "audio.wav"))
 
 
-def transcribe_audio(audio_path, model_size="base"):
+def transcribe_audio(audio_path, model_size="base", out_dir=None):
     if whisper is None:
         raise RuntimeError("openai-whisper is not installed.")
-    model = whisper.load_model(model_size)
-    result = model.transcribe(audio_path)
-    return {
-        "text": result.get("text", "").strip(),
-        "language": result.get("language"),
-    }
+    segments_path = os.path.join(out_dir, "segments.jsonl") if out_dir else None
+    stream = TranscriptStream(audio_path, model_size, backend=OPENAI_WHISPER, persist_path=segments_path)
+    return stream.result()
 
 
 def openai_chat(client, prompt, model="gpt-4o"):
-    resp = client.chat.completions.create(
+    resp = call_with_retry(
+        client.chat.completions.create,
+        provider="openai",
         model=model,
         messages=[{"role": "user", "content": prompt}],
         max_tokens=900,
@@ -230,206 +236,140 @@ def save_to_supabase(url, text, summary, metadata):
     client.table("transcripts").upsert(data, on_conflict="url").execute()
 
 
-if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python full_run_test.py <video_url>")
-        sys.exit(1)
-
-    url = sys.argv[1]
-    run_id = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+# --- 🧵 PIPELINE STAGES ---
+# Each stage writes its file into the run folder and returns what downstream stages need.
+# Transcription and scene detection are CPU-bound (process pool); the rest wait on the network.
+TEXT_STAGES = {
+    "summary": ("Summarize the transcript in 8 bullet points.\n\n", 3500, None),
+    "report": ("Create a detailed report with sections: Overview, Key Points, "
+               "Actionable Tips, Risks/Mistakes, and Final Takeaways.\n\n", 3500, "report.txt"),
+    "viral_analysis": ("Analyze why this video could go viral. Provide: Hook, "
+                       "Retention triggers, Emotional drivers, and Rewatch moments.\n\n", 3500, "viral_analysis.txt"),
+    "hooks": ("List 8 alternative hook lines for this video, each under 12 words.\n\n", 2000, "hooks.txt"),
+    "podcast": ("Write a 3-minute two-speaker podcast script based on this transcript. "
+                "Use labels HOST: and EXPERT:.\n\n", 3500, "podcast_script.txt"),
+    "skills": ("Extract a concise skill list from the transcript and then provide a "
+               "copycat plan: steps to reproduce the skill in a new context.\n\n", 3500, "skills_copycat.txt"),
+    "strategy": ("Create a content strategy for a 7-day plan based on this transcript. "
+                 "Include audience, angles, and distribution tips.\n\n", 3500, "strategy.txt"),
+    "campaign": ("Create a 3-video mini-campaign (Hook, Value, Offer) based on this transcript.\n\n", 3500, "campaign.txt"),
+    "recreate": ("Create a shot-by-shot recreation plan (5-7 shots) and a single master prompt "
+                 "to recreate this video.\n\n", 3500, "recreate.txt"),
+}
+
+
+def text_stage(name):
+    prompt, limit, filename = TEXT_STAGES[name]
+
+    def run(client, transcript, out_dir):
+        text = openai_chat(client, prompt + transcript[:limit], model="gpt-4o")
+        if not filename:
+            return text
+        path = os.path.join(out_dir, filename)
+        write_text(path, text)
+        return path
+    return run
+
+
+def transcribe_stage(audio_path, out_dir):
+    return transcribe_audio(audio_path, model_size="base", out_dir=out_dir).get("text", "")
+
+
+def scenes_stage(video_meta, out_dir):
+    return detect_scenes(video_meta["video_path"], out_dir)
+
+
+def mindmap_stage(client, transcript, out_dir):
+    dot = generate_mindmap_dot(client, transcript)
+    with open(os.path.join(out_dir, "mindmap.dot"), "w") as f:
+        f.write(dot)
+    return render_graphviz(dot, out_dir) if Source else os.path.join(out_dir, "mindmap.dot")
+
+
+def visual_hook_stage(client, video_meta, out_dir):
+    from visuals import analyze_visual_hook
+    path = os.path.join(out_dir, "visual_hook.txt")
+    write_text(path, analyze_visual_hook(video_meta["video_path"], client))
+    return path
+
+
+def save_stage(url, transcript, summary, video_meta):
+    metadata = {
+        "title": video_meta.get("title"),
+        "owner": video_meta.get("owner"),
+        "caption": video_meta.get("caption"),
+    }
+    save_to_supabase(url, transcript, summary, metadata)
+    return True
+
+
+def build_pipeline(visuals=INGEST_VISUALS):
+    stages = [
+        Stage("download", download_video, ["url", "out_dir"], outputs=["video_meta"]),
+        Stage("audio", lambda video_meta, out_dir: extract_audio(video_meta["video_path"], out_dir),
+              ["video_meta", "out_dir"], outputs=["audio_path"]),
+        Stage("transcribe", transcribe_stage, ["audio_path", "out_dir"], outputs=["transcript"], kind=CPU, params={"model_size": "base"}),
+        Stage("scenes", scenes_stage, ["video_meta", "out_dir"], kind=CPU),
+        Stage("mindmap", mindmap_stage, ["client", "transcript", "out_dir"]),
+        Stage("pdf", lambda summary, out_dir: generate_pdf(summary, out_dir), ["summary", "out_dir"]),
+        Stage("pptx", lambda summary, out_dir: generate_pptx(summary, out_dir), ["summary", "out_dir"]),
+        Stage("tts", lambda client, summary, out_dir: generate_tts(client, summary, out_dir), ["client", "summary", "out_dir"]),
+        Stage("save", save_stage, ["url", "transcript", "summary?", "video_meta"]),
+    ]
+    if visuals:
+        stages.append(Stage("visual_hook", visual_hook_stage, ["client", "video_meta", "out_dir"]))
+    stages += [Stage(name, text_stage(name), ["client", "transcript", "out_dir"], params=TEXT_STAGES[name]) for name in TEXT_STAGES]
+    return Pipeline(stages)
+
+
+def log_event(stage, event, info):
+    if event == DONE:
+        detail = info if isinstance(info, str) and len(info) < 200 else None
+        if stage.name == "transcribe":
+            detail = f"{len(info)} chars"
+        log_step(stage.name, True, detail)
+    elif event == FAILED:
+        log_step(stage.name, False, str(info))
+    elif event == SKIPPED:
+        log_step(stage.name, False, f"skipped: no {info}")
+    elif event == CACHED:
+        print(f"⏭️  {stage.name} (unchanged, reused)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run every analysis stage on one video, exporting to export/run_<id>/")
+    parser.add_argument("url", nargs="?", help="Video URL (optional with --resume)")
+    parser.add_argument("--resume", metavar="RUN_ID", help="Reuse export/run_<RUN_ID>/: only stages whose inputs changed run again")
+    parser.add_argument("--visuals", action=argparse.BooleanOptionalAction, default=INGEST_VISUALS,
+                        help="Read the visual hook with GPT-4o vision (paid; default: INGEST_VISUALS)")
+    args = parser.parse_args(argv)
+    if not args.url and not args.resume:
+        parser.error("a video URL or --resume RUN_ID is required")
+
+    run_id = args.resume or datetime.utcnow().strftime("%Y%m%d_%H%M%S")
     out_dir = os.path.join(EXPORT_DIR, f"run_{run_id}")
+    if args.resume and not os.path.exists(os.path.join(out_dir, "manifest.json")):
+        print(f"No manifest for run {run_id} in {out_dir}.")
+        return 1
     ensure_dir(out_dir)
+    manifest = RunManifest(os.path.join(out_dir, "manifest.json"), meta={"run_id": run_id, **({"url": args.url} if args.url else {})})
+    url = manifest.meta.get("url")
 
     openai_key = os.getenv("OPENAI_API_KEY")
     if not openai_key:
         print("Missing OPENAI_API_KEY.")
-        sys.exit(1)
+        return 1
 
     client = OpenAI(api_key=openai_key)
 
-    # Step 1: Download
-    try:
-        video_meta = download_video(url, out_dir)
-        log_step("Download video", True, video_meta.get("video_path"))
-    except Exception as e:
-        log_step("Download video", False, str(e))
-        sys.exit(1)
-
-    # Step 2: Extract audio
-    try:
-        audio_path = extract_audio(video_meta["video_path"], out_dir)
-        log_step("Extract audio", True, audio_path)
-    except Exception as e:
-        log_step("Extract audio", False, str(e))
-        sys.exit(1)
-
-    # Step 3: Transcribe
-    try:
-        transcription = transcribe_audio(audio_path, model_size="base")
-        transcript_text = transcription.get("text", "")
-        log_step("Transcribe audio", True, f"{len(transcript_text)} chars")
-    except Exception as e:
-        log_step("Transcribe audio", False, str(e))
-        sys.exit(1)
-
-    # Step 4: Summary + Viral analysis
-    try:
-        summary_prompt = "Summarize the transcript in 8 bullet points.\n\n" + transcript_text[:3500]
-        summary = openai_chat(client, summary_prompt, model="gpt-4o")
-        log_step("Generate summary", True)
-    except Exception as e:
-        log_step("Generate summary", False, str(e))
-        summary = None
-
-    # Step 4b: Detailed report
-    try:
-        report_prompt = (
-            "Create a detailed report with sections: Overview, Key Points, "
-            "Actionable Tips, Risks/Mistakes, and Final Takeaways.\n\n"
-            + transcript_text[:3500]
-        )
-        report = openai_chat(client, report_prompt, model="gpt-4o")
-        report_path = os.path.join(out_dir, "report.txt")
-        write_text(report_path, report)
-        log_step("Generate report", True, report_path)
-    except Exception as e:
-        log_step("Generate report", False, str(e))
-
-    # Step 5: Mind map
-    try:
-        dot = generate_mindmap_dot(client, transcript_text)
-        dot_path = os.path.join(out_dir, "mindmap.dot")
-        with open(dot_path, "w") as f:
-            f.write(dot)
-        log_step("Generate mind map DOT", True, dot_path)
-        if Source:
-            png_path = render_graphviz(dot, out_dir)
-            log_step("Render mind map PNG", True, png_path)
-    except Exception as e:
-        log_step("Generate mind map", False, str(e))
-
-    # Step 5b: Viral analysis + hooks
-    try:
-        viral_prompt = (
-            "Analyze why this video could go viral. Provide: Hook, "
-            "Retention triggers, Emotional drivers, and Rewatch moments.\n\n"
-            + transcript_text[:3500]
-        )
-        viral_analysis = openai_chat(client, viral_prompt, model="gpt-4o")
-        viral_path = os.path.join(out_dir, "viral_analysis.txt")
-        write_text(viral_path, viral_analysis)
-        log_step("Generate viral analysis", True, viral_path)
-
-        hooks_prompt = (
-            "List 8 alternative hook lines for this video, each under 12 words.\n\n"
-            + transcript_text[:2000]
-        )
-        hooks = openai_chat(client, hooks_prompt, model="gpt-4o")
-        hooks_path = os.path.join(out_dir, "hooks.txt")
-        write_text(hooks_path, hooks)
-        log_step("Generate hooks", True, hooks_path)
-    except Exception as e:
-        log_step("Generate viral analysis/hooks", False, str(e))
-
-    # Step 6: Scene detection
-    try:
-        scenes_path = detect_scenes(video_meta["video_path"], out_dir)
-        log_step("Detect scenes", True, scenes_path)
-    except Exception as e:
-        log_step("Detect scenes", False, str(e))
-
-    # Step 7: PDF and PPTX
-    if summary:
-        try:
-            pdf_path = generate_pdf(summary, out_dir)
-            log_step("Generate PDF", True, pdf_path)
-        except Exception as e:
-            log_step("Generate PDF", False, str(e))
-
-        try:
-            pptx_path = generate_pptx(summary, out_dir)
-            log_step("Generate PPTX", True, pptx_path)
-        except Exception as e:
-            log_step("Generate PPTX", False, str(e))
-
-        try:
-            tts_path = generate_tts(client, summary, out_dir)
-            log_step("Generate TTS", True, tts_path)
-        except Exception as e:
-            log_step("Generate TTS", False, str(e))
-
-    # Step 7b: Podcast script
-    try:
-        podcast_prompt = (
-            "Write a 3-minute two-speaker podcast script based on this transcript. "
-            "Use labels HOST: and EXPERT:.\n\n"
-            + transcript_text[:3500]
-        )
-        podcast = openai_chat(client, podcast_prompt, model="gpt-4o")
-        podcast_path = os.path.join(out_dir, "podcast_script.txt")
-        write_text(podcast_path, podcast)
-        log_step("Generate podcast script", True, podcast_path)
-    except Exception as e:
-        log_step("Generate podcast script", False, str(e))
-
-    # Step 7c: Skills extraction + copycat plan
-    try:
-        skills_prompt = (
-            "Extract a concise skill list from the transcript and then provide a "
-            "copycat plan: steps to reproduce the skill in a new context.\n\n"
-            + transcript_text[:3500]
-        )
-        skills = openai_chat(client, skills_prompt, model="gpt-4o")
-        skills_path = os.path.join(out_dir, "skills_copycat.txt")
-        write_text(skills_path, skills)
-        log_step("Generate skills/copycat", True, skills_path)
-    except Exception as e:
-        log_step("Generate skills/copycat", False, str(e))
-
-    # Step 7d: Strategy + campaign + recreate prompt
-    try:
-        strategy_prompt = (
-            "Create a content strategy for a 7-day plan based on this transcript. "
-            "Include audience, angles, and distribution tips.\n\n"
-            + transcript_text[:3500]
-        )
-        strategy = openai_chat(client, strategy_prompt, model="gpt-4o")
-        strategy_path = os.path.join(out_dir, "strategy.txt")
-        write_text(strategy_path, strategy)
-        log_step("Generate strategy", True, strategy_path)
-
-        campaign_prompt = (
-            "Create a 3-video mini-campaign (Hook, Value, Offer) based on this transcript.\n\n"
-            + transcript_text[:3500]
-        )
-        campaign = openai_chat(client, campaign_prompt, model="gpt-4o")
-        campaign_path = os.path.join(out_dir, "campaign.txt")
-        write_text(campaign_path, campaign)
-        log_step("Generate campaign", True, campaign_path)
-
-        recreate_prompt = (
-            "Create a shot-by-shot recreation plan (5-7 shots) and a single master prompt "
-            "to recreate this video.\n\n"
-            + transcript_text[:3500]
-        )
-        recreate = openai_chat(client, recreate_prompt, model="gpt-4o")
-        recreate_path = os.path.join(out_dir, "recreate.txt")
-        write_text(recreate_path, recreate)
-        log_step("Generate recreate plan", True, recreate_path)
-    except Exception as e:
-        log_step("Generate strategy/campaign/recreate", False, str(e))
-
-    # Step 8: Save to Supabase
-    try:
-        metadata = {
-            "title": video_meta.get("title"),
-            "owner": video_meta.get("owner"),
-            "caption": video_meta.get("caption"),
-        }
-        save_to_supabase(url, transcript_text, summary, metadata)
-        log_step("Save to Supabase", True)
-    except Exception as e:
-        log_step("Save to Supabase", False, str(e))
+    # Download, then transcription, scene detection and (with --visuals) the visual read run side by side;
+    # every transcript-based stage starts as soon as the transcript exists.
+    # Finished stages are recorded in the manifest, so a crashed run resumes where it stopped.
+    result = build_pipeline(args.visuals).run({"url": url, "out_dir": out_dir, "client": client}, on_event=log_event, manifest=manifest)
+    print("\nTimings:\n" + format_timings(result))
+    if "download" in result["errors"] or "transcribe" in result["errors"]:
+        print(f"\nResume with: python full_run_test.py --resume {run_id}")
+        return 1
 
     # Copy outputs to a stable path
     latest_dir = os.path.join(EXPORT_DIR, "latest")
@@ -439,3 +379,8 @@ if __name__ == "__main__":
 
     print(f"\nRun complete. Outputs in: {out_dir}")
     print(f"Latest outputs in: {latest_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
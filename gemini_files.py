@@ -0,0 +1,160 @@
+import os
+import re
+import time
+import sqlite3
+import threading
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor
+
+from media_cache import file_sha256
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Gemini deletes uploaded files after 48h; stop reusing a handle this long before it expires
+EXPIRY_MARGIN = float(os.getenv("GEMINI_FILE_MARGIN_MINUTES", "60")) * 60
+DEFAULT_TTL = 47 * 3600
+PROCESSING_TIMEOUT = float(os.getenv("GEMINI_FILE_TIMEOUT", "600"))
+
+SHA_NAME = re.compile(r"^[0-9a-f]{64}$")
+
+
+class GeminiFileCache:
+    """
+    Gemini File API uploads keyed by the video's content hash (SQLite), so every Gemini video
+    feature — and every session or worker — reuses one upload until shortly before it expires.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or os.getenv("GEMINI_FILE_CACHE_DB", os.path.join(BASE_DIR, ".cache", "gemini_files.sqlite3"))
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self._hashes = {}
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS files (
+                    sha256 TEXT PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    uri TEXT,
+                    mime_type TEXT,
+                    uploaded_at REAL,
+                    expires_at REAL
+                )
+            """)
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+
+    def video_hash(self, video_path):
+        """Content hash of a video; media-cache blobs are already named by it, others are hashed once per (size, mtime)."""
+        stem = os.path.splitext(os.path.basename(video_path))[0]
+        if SHA_NAME.match(stem):
+            return stem
+        st = os.stat(video_path)
+        key = (os.path.abspath(video_path), st.st_size, st.st_mtime)
+        if key not in self._hashes:
+            self._hashes[key] = file_sha256(video_path)
+        return self._hashes[key]
+
+    def _lock_for(self, sha):
+        with self._locks_guard:
+            return self._locks.setdefault(sha, threading.Lock())
+
+    def lookup(self, sha):
+        """The cached file name for a hash if it is not about to expire, else None."""
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT name, expires_at FROM files WHERE sha256 = ?", (sha,)).fetchone()
+        if row and row[1] - EXPIRY_MARGIN > time.time():
+            return row[0]
+        return None
+
+    def forget(self, sha):
+        with closing(self._connect()) as conn:
+            conn.execute("DELETE FROM files WHERE sha256 = ?", (sha,))
+
+    def _remember(self, sha, file):
+        expiration = getattr(file, "expiration_time", None)
+        expires_at = expiration.timestamp() if hasattr(expiration, "timestamp") else time.time() + DEFAULT_TTL
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO files (sha256, name, uri, mime_type, uploaded_at, expires_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (sha, file.name, getattr(file, "uri", None), getattr(file, "mime_type", None), time.time(), expires_at),
+            )
+
+    def get_file(self, video_path):
+        """
+        An ACTIVE Gemini file handle for `video_path`: the cached upload when it is still live,
+        otherwise a fresh upload. Concurrent callers for the same video share one upload.
+        """
+        import google.generativeai as genai
+
+        sha = self.video_hash(video_path)
+        with self._lock_for(sha):
+            name = self.lookup(sha)
+            if name:
+                try:
+                    return wait_until_active(genai.get_file(name))
+                except Exception:
+                    self.forget(sha)  # deleted early or failed processing: upload again
+            file = genai.upload_file(path=video_path)
+            file = wait_until_active(file)
+            self._remember(sha, file)
+            return file
+
+
+def wait_until_active(file, first_delay=0.5, max_delay=8.0, timeout=None):
+    """Poll a Gemini file until it leaves PROCESSING, backing off exponentially; raises if it FAILED."""
+    import google.generativeai as genai
+
+    deadline = time.time() + (timeout or PROCESSING_TIMEOUT)
+    delay = first_delay
+    while file.state.name == "PROCESSING":
+        if time.time() > deadline:
+            raise TimeoutError(f"Gemini is still processing {file.name}")
+        time.sleep(delay)
+        delay = min(max_delay, delay * 2)
+        file = genai.get_file(file.name)
+    if file.state.name == "FAILED":
+        raise ValueError("Gemini Video Processing Failed")
+    return file
+
+
+_cache = None
+_lock = threading.Lock()
+_uploads = ThreadPoolExecutor(max_workers=2, thread_name_prefix="gemini-upload")
+_in_flight = {}
+
+
+def get_gemini_file_cache():
+    global _cache
+    with _lock:
+        if _cache is None:
+            _cache = GeminiFileCache()
+    return _cache
+
+
+def prefetch_video_file(video_path, retry=False):
+    """
+    Start uploading/polling in a background thread; returns a Future resolving to the ACTIVE handle.
+    Repeated calls while an upload is running share its Future; once it succeeded, the next call
+    re-checks the cache so an expired handle is never handed out. A failed upload is only
+    attempted again with `retry=True` (an explicit user action), not on every rerun.
+    """
+    cache = get_gemini_file_cache()
+    key = os.path.abspath(video_path)
+    with _lock:
+        future = _in_flight.get(key)
+        failed = future is not None and future.done() and future.exception() is not None
+        if future is None or (future.done() and (not failed or retry)):
+            future = _in_flight[key] = _uploads.submit(cache.get_file, video_path)
+    return future
+
+
+def get_video_file(video_path, timeout=None):
+    """
+    The ACTIVE Gemini handle for a video, retrying a previously failed upload. Blocks the caller
+    until upload and processing finish; the app instead starts `prefetch_video_file` from the
+    button and polls the Future from a fragment, so this returns at once when it is called there.
+    """
+    return prefetch_video_file(video_path, retry=True).result(timeout)
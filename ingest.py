@@ -0,0 +1,464 @@
+import os
+import re
+import json
+import atexit
+import shutil
+import sys
+import time
+import argparse
+import threading
+import subprocess
+import multiprocessing
+from concurrent.futures import wait
+
+import yt_dlp
+import instaloader
+from dotenv import load_dotenv
+
+from audio_utils import extract_audio_ffmpeg, extract_audio_moviepy
+
+from database import DatabaseManager
+from job_queue import get_job_queue, run_worker, QUEUED, RUNNING, DONE, FAILED
+from media_cache import get_media_cache, normalize_url
+from pipeline import Pipeline, Stage
+from providers import get_client, run as run_provider, ASSEMBLYAI as ASSEMBLYAI_PROVIDER
+from transcription import TranscriptStream
+from batch_whisper import batching_enabled, get_batcher
+from longform import audio_duration, LONGFORM_MIN_SECONDS
+from profiles import resolve_profile, PROFILE_CHOICES
+from workspace import JobWorkspace, workspace_root
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+INGEST = "ingest"
+WHISPER = "whisper"
+ASSEMBLYAI = "assemblyai"
+
+# Read the visual hook during ingest, in parallel with transcription (needs OPENAI_API_KEY).
+# Off by default: it is a paid GPT-4o vision call per reel, which adds up on large batches.
+INGEST_VISUALS = os.getenv("INGEST_VISUALS", "0") == "1"
+# Jobs one worker process runs at once; their Whisper decodes are batched together
+INGEST_WORKER_JOBS = int(os.getenv("INGEST_WORKER_JOBS", "1"))
+
+
+class DownloadError(Exception):
+    """The platform refused the download (usually Instagram auth)."""
+
+
+# --- 📥 DOWNLOAD ---
+def _empty_dir(path):
+    """Remove part files left in `path` by an earlier, interrupted attempt."""
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _downloaded_file(ydl, info):
+    """The file yt-dlp actually wrote (after merging formats), or None."""
+    for download in info.get("requested_downloads") or []:
+        if download.get("filepath") and os.path.exists(download["filepath"]):
+            return download["filepath"]
+    path = ydl.prepare_filename(info)
+    return path if os.path.exists(path) else None
+
+
+def download_media(url, workspace=None):
+    """
+    Download a reel/video and return its metadata ({"title", "caption", "owner", "video_path"}).
+    Served from the media cache when possible; raises DownloadError if nothing could be downloaded.
+    """
+    media_cache = get_media_cache()
+    cached = media_cache.get(url)
+    if cached:
+        return cached
+
+    # Download into a private scratch dir; the finished file is moved into the media cache
+    workspace = workspace or JobWorkspace(prefix="dl_")
+    reel_dir = workspace.subdir("reel")
+
+    # Try yt-dlp first with HARDENED HEADERS
+    _empty_dir(reel_dir)  # a retried job reuses its workspace
+    try:
+        ydl_opts = {
+            'format': 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best',
+            'outtmpl': os.path.join(reel_dir, '%(title)s.%(ext)s'),
+            'quiet': True, 'no_warnings': True,
+            'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+            'referer': 'https://www.instagram.com/',
+            'cookiesfrombrowser': ('chrome',),  # Use logged-in Chrome session for Instagram auth
+        }
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            info = ydl.extract_info(url, download=True)
+            video_path = _downloaded_file(ydl, info)
+            if video_path:
+                return media_cache.put(url, video_path, {
+                    "title": info.get('title', 'video'),
+                    "caption": info.get('description', ''),
+                    "owner": info.get('uploader', 'Unknown')
+                })
+    except Exception:
+        pass  # fall through to Instaloader
+
+    # Fallback to Instaloader for IG specifically
+    try:
+        loader = instaloader.Instaloader()
+        if 'instagram.com/reel/' in url:
+            _empty_dir(reel_dir)
+            shortcode = url.split('/')[-2]
+            post = instaloader.Post.from_shortcode(loader.context, shortcode)
+            loader.download_post(post, target=reel_dir)
+            downloaded = sorted(f for f in os.listdir(reel_dir) if f.endswith('.mp4'))
+            if downloaded:
+                return media_cache.put(url, os.path.join(reel_dir, downloaded[0]), {
+                    "title": f"Reel {shortcode}",
+                    "caption": post.caption or "",
+                    "owner": post.owner_username
+                })
+    except Exception as e:
+        raise DownloadError(str(e)) from e
+    raise DownloadError(f"Nothing could be downloaded from {url}")
+
+
+# --- 🔊 AUDIO ---
+def extract_audio(video_file_path, workspace=None):
+    """Write 16 kHz mono PCM audio.wav into `workspace` and return its path."""
+    # Without a workspace the caller owns the returned file's directory
+    if workspace is None:
+        workspace = JobWorkspace(prefix="audio_")
+        workspace.detach()
+    audio_path = workspace.file("audio.wav")
+    try:
+        return extract_audio_ffmpeg(video_file_path, audio_path)
+    except (ImportError, OSError, RuntimeError):
+        pass  # no usable ffmpeg binary; fall back to MoviePy
+    return extract_audio_moviepy(video_file_path, audio_path)
+
+
+# --- 🎙️ TRANSCRIPTION ---
+def transcribe_assemblyai(audio_file):
+    # Upload + polling run on the shared async provider loop (pooled connections, backoff, retries)
+    transcript = run_provider(get_client(ASSEMBLYAI_PROVIDER).transcribe(audio_file))
+    return {"text": transcript.get("text") or "", "language": transcript.get("language_code"), "segments": []}
+
+
+# --- 🧵 QUEUED INGEST PIPELINE ---
+def ingest_workspace(job_id):
+    """Named workspace for a queued job, so a retry on another worker finds the same files."""
+    return JobWorkspace(name=f"ingest_{job_id}")
+
+
+def ingest_segments_path(job_id):
+    """Where a running job streams its transcript segments (read by the UI for live partial text)."""
+    return os.path.join(workspace_root(), f"ingest_{job_id}", "segments.jsonl")
+
+
+def run_ingest_job(job, queue):
+    """
+    Download, then two independent branches at once: audio -> transcribe -> save -> index (semantic
+    search embeddings), and the GPT-4o visual hook read (warms the LLM cache, so the app's Visual
+    Decoder is instant for this reel).
+    Each finished stage is checkpointed on the job, so a retried or resumed job skips straight
+    to its unfinished stages.
+    """
+    payload, cp = job["payload"], job["checkpoint"]
+    url = payload["url"]
+    workspace = ingest_workspace(job["id"])
+    workspace.detach()  # must outlive this worker if it crashes mid-job
+
+    def checkpoint(stage, progress, **data):
+        queue.heartbeat(job["id"], stage=stage, progress=progress, checkpoint=data or None)
+        cp.update(data)
+
+    def download():
+        if not os.path.exists(cp.get("reel_data", {}).get("video_path") or ""):
+            checkpoint("download", 0.05)
+            reel_data = download_media(url, workspace)
+            checkpoint("download", 0.3, reel_data=reel_data)
+        return cp["reel_data"]
+
+    def audio(reel_data):
+        if not os.path.exists(cp.get("audio_path") or ""):
+            checkpoint("audio", 0.35)
+            checkpoint("audio", 0.45, audio_path=extract_audio(reel_data["video_path"], workspace))
+        return cp["audio_path"]
+
+    def transcribe(audio_path):
+        if "transcript" not in cp:
+            checkpoint("transcribe", 0.5)
+            if payload.get("engine") == ASSEMBLYAI:
+                transcript = transcribe_assemblyai(audio_path)
+            else:
+                segments_path = workspace.file("segments.jsonl")
+                if os.path.exists(segments_path):
+                    os.remove(segments_path)  # partial output from an interrupted attempt
+                profile, details = resolve_profile(payload.get("profile"), audio_path,
+                                                   queue_depth=max(0, queue.depth([INGEST]) - 1),
+                                                   model_size=payload.get("model_size", "base"))
+                duration = audio_duration(audio_path)
+                if INGEST_WORKER_JOBS > 1 and batching_enabled() and duration is not None and duration < LONGFORM_MIN_SECONDS:
+                    # Short clips join the clips of this worker's other jobs in one batched decode
+                    # (with one job per worker there is nothing to batch with, so the plain path is used)
+                    future = get_batcher().submit(audio_path, profile.model_size, profile.compute_type,
+                                                  beam_size=profile.beam_size, cpu_threads=profile.cpu_threads)
+                    while not wait([future], timeout=5).done:
+                        queue.heartbeat(job["id"])
+                    transcript = future.result()
+                    with open(segments_path, "w") as f:
+                        f.writelines(json.dumps(segment) + "\n" for segment in transcript["segments"])
+                else:
+                    stream = TranscriptStream(audio_path, profile.model_size, compute_type=profile.compute_type,
+                                              beam_size=profile.beam_size, cpu_threads=profile.cpu_threads,
+                                              persist_path=segments_path)
+                    last_beat = time.time()
+                    for _ in stream:
+                        if time.time() - last_beat > 5:
+                            queue.heartbeat(job["id"])
+                            last_beat = time.time()
+                    transcript = stream.result()
+                transcript["profile"] = {"name": profile.name, "model_size": profile.model_size, **details}
+            checkpoint("transcribe", 0.9, transcript=transcript)
+        return cp["transcript"]
+
+    def visual_hook(reel_data):
+        if not cp.get("visual_hook"):
+            from openai import OpenAI
+            from visuals import analyze_visual_hook
+            analyze_visual_hook(reel_data["video_path"], OpenAI(api_key=os.getenv("OPENAI_API_KEY")))
+            checkpoint(None, None, visual_hook=True)
+        return True
+
+    def save(reel_data, transcript):
+        metadata = dict(reel_data)
+        if transcript.get("segments"):
+            metadata["segments"] = transcript["segments"]
+        if not cp.get("saved"):
+            checkpoint("save", 0.95)
+            db = DatabaseManager()
+            saved = db.connect() and db.save_transcript(url, transcript["text"], metadata=metadata)
+            checkpoint("save", 0.98, saved=bool(saved), transcript_id=(saved or {}).get("id"))
+        return metadata
+
+    def index(metadata, transcript):
+        # Semantic search embeddings, inside the job so a worker exiting right after cannot drop them;
+        # only chunks never embedded before hit the API
+        if cp.get("saved") and not cp.get("indexed"):
+            from vector_index import index_row
+            index_row({"id": cp.get("transcript_id"), "url": url, "text": transcript["text"], "metadata": metadata})
+            checkpoint(None, None, indexed=True)
+        return True
+
+    stages = [
+        Stage("download", download, outputs=["reel_data"]),
+        Stage("audio", audio, ["reel_data"], outputs=["audio_path"]),
+        Stage("transcribe", transcribe, ["audio_path"], outputs=["transcript"]),
+        Stage("save", save, ["reel_data", "transcript"], outputs=["metadata"]),
+    ]
+    if os.getenv("OPENAI_API_KEY"):
+        stages.append(Stage("index", index, ["metadata", "transcript"], outputs=["indexed"]))
+    if payload.get("visuals", INGEST_VISUALS) and os.getenv("OPENAI_API_KEY"):
+        stages.append(Stage("visual_hook", visual_hook, ["reel_data"]))
+    run = Pipeline(stages).run(max_threads=len(stages))
+    for name in ("download", "audio", "transcribe", "save"):
+        if name in run["errors"]:
+            raise run["errors"][name]  # indexing and the visual branch are best-effort and never fail the job
+    if "index" in run["errors"]:
+        print(f"Vector index update failed for {url}: {run['errors']['index']}")  # backfilled by sync_from_database
+
+    workspace.cleanup()
+    transcript, metadata = run["values"]["transcript"], run["values"]["metadata"]
+    duration = transcript["segments"][-1]["end"] if transcript.get("segments") else None
+    return {"url": url, "text": transcript["text"], "language": transcript.get("language"), "duration": duration,
+            "metadata": metadata, "saved": cp["saved"], "indexed": bool(cp.get("indexed")), "visual_hook": bool(cp.get("visual_hook")),
+            "profile": transcript.get("profile"), "wall": run["wall"]}
+
+
+def enqueue_ingest(url, engine=WHISPER, model_size="base", profile=None, queue=None):
+    """`profile` is a name from profiles.PROFILE_CHOICES; without one, `model_size` is used as before."""
+    queue = queue or get_job_queue()
+    return queue.enqueue(INGEST, {"url": url, "engine": engine, "model_size": model_size, "profile": profile})
+
+
+# --- 📚 BATCH INGEST ---
+URL_PATTERN = re.compile(r"https?://[^\s,;\"'<>]+")
+
+
+def parse_urls(text):
+    """Pull every http(s) URL out of pasted text or an uploaded .txt/.csv file."""
+    return URL_PATTERN.findall(text or "")
+
+
+def dedupe_urls(urls):
+    """Drop repeats by normalized URL (tracking params, short/long forms); returns (unique, duplicates)."""
+    seen, unique, duplicates = set(), [], []
+    for url in urls:
+        key = normalize_url(url)
+        if key in seen:
+            duplicates.append(url)
+        else:
+            seen.add(key)
+            unique.append(url)
+    return unique, duplicates
+
+
+def enqueue_batch(urls, engine=WHISPER, model_size="base", profile=None, queue=None):
+    """
+    Queue one ingest job per unique URL under a shared batch id.
+    Returns {"batch_id", "job_ids", "duplicates"}; workers then pipeline the items, so one
+    reel downloads while another is being transcribed.
+    """
+    queue = queue or get_job_queue()
+    unique, duplicates = dedupe_urls(urls)
+    batch_id = f"batch_{int(time.time())}_{os.urandom(3).hex()}"
+    payloads = [{"url": url, "engine": engine, "model_size": model_size, "profile": profile} for url in unique]
+    job_ids = queue.enqueue_many(INGEST, payloads, batch_id=batch_id) if payloads else []
+    return {"batch_id": batch_id, "job_ids": job_ids, "duplicates": duplicates}
+
+
+def batch_status(batch_id, queue=None):
+    """Per-item status plus aggregate counts and throughput for a batch."""
+    queue = queue or get_job_queue()
+    jobs = queue.list_jobs(batch_id=batch_id, limit=None)
+    counts = {status: 0 for status in (QUEUED, RUNNING, DONE, FAILED)}
+    items, audio_seconds = [], 0.0
+    for job in jobs:
+        counts[job["status"]] = counts.get(job["status"], 0) + 1
+        audio_seconds += job["result"].get("duration") or 0
+        items.append({
+            "id": job["id"], "url": job["payload"].get("url"), "status": job["status"],
+            "stage": job["stage"], "progress": job["progress"] or 0, "attempts": job["attempts"],
+            "error": job["error"] if job["status"] == FAILED else None,
+        })
+    finished = counts[DONE] + counts[FAILED]
+    active = counts[QUEUED] + counts[RUNNING]
+    started = min((j["created_at"] for j in jobs), default=time.time())
+    ended = time.time() if active else max((j["updated_at"] for j in jobs), default=started)
+    elapsed = max(ended - started, 1e-6)
+    return {
+        "batch_id": batch_id, "items": items, "counts": counts, "total": len(jobs),
+        "finished": finished, "complete": bool(jobs) and not active, "elapsed": elapsed,
+        "items_per_min": finished / elapsed * 60,
+        "audio_seconds": audio_seconds,
+        "realtime_factor": audio_seconds / elapsed,  # seconds of audio transcribed per wall-clock second
+    }
+
+
+def _print_batch(status, printed):
+    """Print items whose status changed since the last poll, then a one-line aggregate."""
+    for item in status["items"]:
+        key = (item["status"], item["stage"])
+        if printed.get(item["id"]) != key:
+            printed[item["id"]] = key
+            note = f" ({item['error']})" if item["error"] else ""
+            print(f"  [{item['status']:>7}] {item['stage'] or '-':<10} {item['url']}{note}")
+    c = status["counts"]
+    print(f"  -> {status['finished']}/{status['total']} finished ({c[DONE]} done, {c[FAILED]} failed, "
+          f"{c[RUNNING]} running) | {status['items_per_min']:.1f} items/min | "
+          f"{status['realtime_factor']:.1f}x realtime | {status['elapsed']:.0f}s")
+
+
+HANDLERS = {INGEST: run_ingest_job}
+
+_worker_procs = []
+_worker_lock = threading.Lock()
+
+
+def ensure_workers(count=None):
+    """
+    Keep `count` local worker processes alive (INGEST_WORKERS, default 2). They are terminated when
+    this process exits, and exit on their own if it is killed outright.
+    Set INGEST_WORKERS=0 when workers are started separately with `python ingest.py worker`.
+    """
+    count = int(os.getenv("INGEST_WORKERS", "2")) if count is None else count
+    with _worker_lock:
+        _worker_procs[:] = [p for p in _worker_procs if p.poll() is None]
+        while len(_worker_procs) < count:
+            _worker_procs.append(subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__), "worker", "--parent", str(os.getpid())], cwd=BASE_DIR))
+    return len(_worker_procs)
+
+
+@atexit.register
+def stop_workers(timeout=5):
+    """Terminate the workers started by `ensure_workers` (runs at interpreter exit)."""
+    with _worker_lock:
+        procs, _worker_procs[:] = list(_worker_procs), []
+    for p in procs:
+        if p.poll() is None:
+            p.terminate()
+    for p in procs:
+        try:
+            p.wait(timeout)
+        except subprocess.TimeoutExpired:
+            p.kill()
+
+
+def _exit_with_parent(parent_pid, interval=2.0):
+    # The app was killed without running atexit (SIGKILL, crash): don't outlive it.
+    # Jobs still running here go stale and are picked up by the next worker.
+    while True:
+        time.sleep(interval)
+        if os.getppid() != parent_pid:
+            os._exit(0)
+
+
+def _worker_main(parent_pid=None):
+    if parent_pid:
+        threading.Thread(target=_exit_with_parent, args=(parent_pid,), name="parent-watch", daemon=True).start()
+    run_worker(HANDLERS, concurrency=INGEST_WORKER_JOBS)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Transcribe Reels ingest pipeline")
+    sub = parser.add_subparsers(dest="command", required=True)
+    worker = sub.add_parser("worker", help="Run queue workers until interrupted")
+    worker.add_argument("--processes", type=int, default=1, help="Number of worker processes")
+    worker.add_argument("--parent", type=int, default=None, help=argparse.SUPPRESS)  # set by ensure_workers
+    batch = sub.add_parser("batch", help="Ingest a list of URLs (file of URLs, or '-' for stdin)")
+    batch.add_argument("source", help="Text/CSV file containing URLs, or '-' to read stdin")
+    batch.add_argument("--workers", type=int, default=int(os.getenv("INGEST_WORKERS", "2")),
+                       help="Worker processes to run for this batch (0 = rely on already running workers)")
+    batch.add_argument("--engine", choices=[WHISPER, ASSEMBLYAI], default=WHISPER)
+    batch.add_argument("--model-size", default="base", help="Used with --profile custom (the default)")
+    batch.add_argument("--profile", choices=PROFILE_CHOICES, default=None,
+                       help="Transcription profile; auto picks one per reel from its length, speech and queue depth")
+    batch.add_argument("--poll", type=float, default=2.0, help="Seconds between status updates")
+    args = parser.parse_args(argv)
+
+    load_dotenv(os.path.join(BASE_DIR, ".env"))
+
+    if args.command == "worker":
+        if args.processes <= 1:
+            _worker_main(args.parent)
+            return
+        procs = [multiprocessing.Process(target=_worker_main) for _ in range(args.processes)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+    elif args.command == "batch":
+        text = sys.stdin.read() if args.source == "-" else open(args.source, encoding="utf-8").read()
+        submitted = enqueue_batch(parse_urls(text), engine=args.engine, model_size=args.model_size, profile=args.profile)
+        print(f"📚 {submitted['batch_id']}: {len(submitted['job_ids'])} URLs queued, "
+              f"{len(submitted['duplicates'])} duplicates skipped")
+        if not submitted["job_ids"]:
+            return
+        procs = [multiprocessing.Process(target=_worker_main, daemon=True) for _ in range(args.workers)]
+        for p in procs:
+            p.start()
+        printed = {}
+        try:
+            while True:
+                status = batch_status(submitted["batch_id"])
+                _print_batch(status, printed)
+                if status["complete"]:
+                    break
+                time.sleep(args.poll)
+        finally:
+            for p in procs:
+                p.terminate()
+        if status["counts"][FAILED]:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+JSON_FIELDS = ("payload", "checkpoint", "result")
+
+
+class JobQueue:
+    """
+    Local SQLite-backed job queue, so ingestion runs without external services.
+    Workers claim jobs atomically, record per-stage checkpoints while they run, and
+    a job whose worker stops heartbeating is handed to the next worker to resume.
+    """
+
+    def __init__(self, db_path=None, stale_after=None, max_attempts=None):
+        self.db_path = db_path or os.getenv("JOB_QUEUE_DB", os.path.join(BASE_DIR, ".cache", "jobs.sqlite3"))
+        self.stale_after = stale_after or float(os.getenv("JOB_STALE_SECONDS", "600"))
+        self.max_attempts = max_attempts or int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    batch_id TEXT,
+                    payload TEXT,
+                    status TEXT NOT NULL,
+                    stage TEXT,
+                    progress REAL DEFAULT 0,
+                    checkpoint TEXT,
+                    result TEXT,
+                    error TEXT,
+                    worker TEXT,
+                    attempts INTEGER DEFAULT 0,
+                    created_at REAL,
+                    updated_at REAL,
+                    heartbeat_at REAL
+                )
+            """)
+            self._ensure_column(conn, "batch_id", "TEXT")  # queues created before batches existed
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_batch ON jobs(batch_id)")
+
+    def _ensure_column(self, conn, name, decl):
+        if name not in [row[1] for row in conn.execute("PRAGMA table_info(jobs)")]:
+            conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {decl}")
+
+    def _connect(self):
+        # Autocommit; claim() opens its own write transaction
+        return sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+
+    def _row_to_job(self, cursor, row):
+        job = {col[0]: value for col, value in zip(cursor.description, row)}
+        for field in JSON_FIELDS:
+            job[field] = json.loads(job[field]) if job.get(field) else {}
+        return job
+
+    def enqueue(self, kind, payload=None, batch_id=None):
+        return self.enqueue_many(kind, [payload or {}], batch_id=batch_id)[0]
+
+    def enqueue_many(self, kind, payloads, batch_id=None):
+        """Insert one job per payload in a single transaction; returns the job ids in order."""
+        now = time.time()
+        rows = [(uuid.uuid4().hex[:12], kind, batch_id, json.dumps(p or {}), QUEUED, "{}", now + i * 1e-6, now) for i, p in enumerate(payloads)]
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN")
+            conn.executemany(
+                "INSERT INTO jobs (id, kind, batch_id, payload, status, checkpoint, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.execute("COMMIT")
+        return [row[0] for row in rows]
+
+    def get(self, job_id):
+        with closing(self._connect()) as conn:
+            cur = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
+            row = cur.fetchone()
+            return self._row_to_job(cur, row) if row else None
+
+    def list_jobs(self, status=None, limit=50, batch_id=None):
+        """Most recent jobs first; batch listings come back in submission order. `limit=None` returns all."""
+        clauses, args = [], []
+        if status:
+            clauses.append("status = ?")
+            args.append(status)
+        if batch_id:
+            clauses.append("batch_id = ?")
+            args.append(batch_id)
+        query = "SELECT * FROM jobs" + (" WHERE " + " AND ".join(clauses) if clauses else "")
+        query += " ORDER BY created_at " + ("ASC" if batch_id else "DESC") + " LIMIT ?"
+        args.append(-1 if limit is None else limit)
+        with closing(self._connect()) as conn:
+            cur = conn.execute(query, args)
+            return [self._row_to_job(cur, row) for row in cur.fetchall()]
+
+    def depth(self, kinds=None):
+        """Jobs waiting or running right now: how far behind the workers are."""
+        query, args = "SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)", [QUEUED, RUNNING]
+        if kinds:
+            query += f" AND kind IN ({','.join('?' * len(kinds))})"
+            args += list(kinds)
+        with closing(self._connect()) as conn:
+            return conn.execute(query, args).fetchone()[0]
+
+    def claim(self, worker_id, kinds=None):
+        """
+        Atomically take the oldest queued job (or a running job whose worker went silent).
+        A silent job that has used all its attempts is failed instead: it most likely kills its worker.
+        """
+        now = time.time()
+        kind_filter, kind_args = "", []
+        if kinds:
+            kind_filter = f" AND kind IN ({','.join('?' * len(kinds))})"
+            kind_args = list(kinds)
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, error = COALESCE(error, ?), updated_at = ? "
+                    "WHERE status = ? AND heartbeat_at < ? AND attempts >= ?" + kind_filter,
+                    [FAILED, "Worker stopped responding on every attempt", now, RUNNING, now - self.stale_after,
+                     self.max_attempts] + kind_args,
+                )
+                row = conn.execute(
+                    "SELECT id FROM jobs WHERE (status = ? OR (status = ? AND heartbeat_at < ? AND attempts < ?))"
+                    + kind_filter + " ORDER BY created_at LIMIT 1",
+                    [QUEUED, RUNNING, now - self.stale_after, self.max_attempts] + kind_args,
+                ).fetchone()
+                if not row:
+                    conn.execute("COMMIT")
+                    return None
+                conn.execute(
+                    "UPDATE jobs SET status = ?, worker = ?, attempts = attempts + 1, heartbeat_at = ?, updated_at = ? WHERE id = ?",
+                    (RUNNING, worker_id, now, now, row[0]),
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return self.get(row[0])
+
+    def heartbeat(self, job_id, stage=None, progress=None, checkpoint=None):
+        """Record liveness, and optionally the current stage, progress (0-1) and checkpoint keys to merge."""
+        now = time.time()
+        with closing(self._connect()) as conn:
+            # Write-locked read-merge-write: a job's parallel stages checkpoint concurrently
+            conn.execute("BEGIN IMMEDIATE")
+            if checkpoint:
+                row = conn.execute("SELECT checkpoint FROM jobs WHERE id = ?", (job_id,)).fetchone()
+                merged = json.loads(row[0]) if row and row[0] else {}
+                merged.update(checkpoint)
+                conn.execute("UPDATE jobs SET checkpoint = ? WHERE id = ?", (json.dumps(merged), job_id))
+            conn.execute(
+                "UPDATE jobs SET stage = COALESCE(?, stage), progress = COALESCE(?, progress), heartbeat_at = ?, updated_at = ? WHERE id = ?",
+                (stage, progress, now, now, job_id),
+            )
+            conn.execute("COMMIT")
+
+    def complete(self, job_id, result=None):
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, stage = ?, progress = 1, result = ?, error = NULL, updated_at = ? WHERE id = ?",
+                (DONE, DONE, json.dumps(result or {}), now, job_id),
+            )
+
+    def fail(self, job_id, error, retry=True):
+        """Mark a job failed, or put it back in the queue (keeping its checkpoint) while attempts remain."""
+        job = self.get(job_id)
+        status = QUEUED if retry and job and job["attempts"] < self.max_attempts else FAILED
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+                (status, str(error), time.time(), job_id),
+            )
+        return status
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _run_job(handlers, job, queue):
+    try:
+        queue.complete(job["id"], handlers[job["kind"]](job, queue))
+    except Exception as e:
+        queue.fail(job["id"], f"{type(e).__name__}: {e}")
+
+
+def run_worker(handlers, queue=None, worker_id=None, poll_interval=1.0, max_jobs=None, concurrency=1):
+    """
+    Claim and run jobs forever (or until `max_jobs` have run).
+    `handlers` maps job kind -> fn(job, queue) returning a JSON-serializable result.
+    With `concurrency` > 1 up to that many jobs run at once on threads of this process,
+    e.g. so their Whisper decodes can share a batch (see batch_whisper.WhisperBatcher).
+    """
+    queue = queue or JobQueue()
+    worker_id = worker_id or default_worker_id()
+    processed = 0
+    if concurrency <= 1:
+        while max_jobs is None or processed < max_jobs:
+            job = queue.claim(worker_id, kinds=list(handlers))
+            if not job:
+                time.sleep(poll_interval)
+                continue
+            _run_job(handlers, job, queue)
+            processed += 1
+        return processed
+
+    running = set()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="job") as pool:
+        while max_jobs is None or processed < max_jobs:
+            running = {f for f in running if not f.done()}
+            if len(running) >= concurrency:
+                wait(running, return_when=FIRST_COMPLETED)
+                continue
+            job = queue.claim(worker_id, kinds=list(handlers))
+            if not job:
+                time.sleep(poll_interval)
+                continue
+            running.add(pool.submit(_run_job, handlers, job, queue))
+            processed += 1
+    return processed
+
+
+_queue = None
+
+
+def get_job_queue():
+    global _queue
+    if _queue is None:
+        _queue = JobQueue()
+    return _queue
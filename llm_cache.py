@@ -0,0 +1,144 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from contextlib import closing
+
+from parallel import call_with_retry
+from payload_stats import record as record_payload
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def cache_key(model, template, version, inputs, params=None):
+    """
+    Content address for a completion: model, sampling params, prompt template + version and
+    a hash of everything sent (messages, images). Bump a template's version when its wording changes.
+    """
+    payload = json.dumps(
+        {"model": model, "template": template, "version": version, "params": params or {}, "inputs": inputs},
+        sort_keys=True, default=lambda o: hashlib.sha256(bytes(o)).hexdigest() if isinstance(o, (bytes, bytearray)) else repr(o),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CompletionCache:
+    """
+    Persistent LLM response cache (SQLite). Entries expire after LLM_CACHE_TTL_DAYS (default 30)
+    and the least recently used are dropped beyond LLM_CACHE_MAX_MB (default 200).
+    Hit/miss counters are kept on disk so the hit rate covers every session and worker.
+    """
+
+    def __init__(self, db_path=None, ttl_days=None, max_mb=None):
+        self.db_path = db_path or os.getenv("LLM_CACHE_DB", os.path.join(BASE_DIR, ".cache", "llm_cache.sqlite3"))
+        self.ttl = (ttl_days or float(os.getenv("LLM_CACHE_TTL_DAYS", "30"))) * 86400
+        self.max_bytes = (max_mb or float(os.getenv("LLM_CACHE_MAX_MB", "200"))) * 1024 * 1024
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    model TEXT,
+                    template TEXT,
+                    response TEXT,
+                    size INTEGER,
+                    created_at REAL,
+                    last_access REAL,
+                    hits INTEGER DEFAULT 0
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_access ON entries(last_access)")
+            conn.execute("CREATE TABLE IF NOT EXISTS counters (template TEXT PRIMARY KEY, hits INTEGER DEFAULT 0, misses INTEGER DEFAULT 0)")
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+
+    def _count(self, conn, template, field):
+        conn.execute(f"INSERT INTO counters (template, {field}) VALUES (?, 1) "
+                     f"ON CONFLICT(template) DO UPDATE SET {field} = {field} + 1", (template,))
+
+    def get(self, key, template=""):
+        now = time.time()
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT response, created_at FROM entries WHERE key = ?", (key,)).fetchone()
+            if row and now - row[1] > self.ttl:
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                row = None
+            if row:
+                conn.execute("UPDATE entries SET last_access = ?, hits = hits + 1 WHERE key = ?", (now, key))
+            self._count(conn, template, "hits" if row else "misses")
+        return row[0] if row else None
+
+    def put(self, key, response, model="", template=""):
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, model, template, response, size, created_at, last_access) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, model, template, response, len(response.encode("utf-8")), now, now),
+            )
+            self._evict(conn)
+
+    def _evict(self, conn):
+        conn.execute("DELETE FROM entries WHERE created_at < ?", (time.time() - self.ttl,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY last_access").fetchall():
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self):
+        with closing(self._connect()) as conn:
+            conn.execute("DELETE FROM entries")
+            conn.execute("DELETE FROM counters")
+
+    def stats(self):
+        with closing(self._connect()) as conn:
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+            per_template = {t: {"hits": h, "misses": m} for t, h, m in conn.execute("SELECT template, hits, misses FROM counters")}
+        hits = sum(c["hits"] for c in per_template.values())
+        misses = sum(c["misses"] for c in per_template.values())
+        return {
+            "entries": entries, "size_mb": size / (1024 * 1024), "hits": hits, "misses": misses,
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0, "templates": per_template,
+        }
+
+
+def cached_call(compute, model, template, inputs, version=1, params=None, refresh=False):
+    """Return the cached text for this (model, template@version, params, inputs), else `compute()` and store it."""
+    cache = get_llm_cache()
+    key = cache_key(model, template, version, inputs, params)
+    if not refresh:
+        hit = cache.get(key, template)
+        if hit is not None:
+            return hit
+    text = compute()
+    if text:
+        cache.put(key, text, model, template)
+    return text
+
+
+def cached_chat(client, model, messages, template, version=1, refresh=False, **params):
+    """OpenAI chat completion through the cache; returns the message content."""
+    def compute():
+        record_payload(template, messages)  # only requests that actually go out
+        resp = call_with_retry(client.chat.completions.create, provider="openai", model=model, messages=messages, **params)
+        return resp.choices[0].message.content
+    return cached_call(compute, model, template, messages, version=version, params=params, refresh=refresh)
+
+
+_cache = None
+_lock = threading.Lock()
+
+
+def get_llm_cache():
+    global _cache
+    with _lock:
+        if _cache is None:
+            _cache = CompletionCache()
+    return _cache
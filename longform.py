@@ -0,0 +1,209 @@
+import os
+import re
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from audio_utils import load_audio, probe_duration, WHISPER_SAMPLE_RATE
+
+# Audio at least this long is split at silences and decoded by several processes
+LONGFORM_MIN_SECONDS = float(os.getenv("LONGFORM_MIN_SECONDS", "600"))
+LONGFORM_WORKERS = int(os.getenv("LONGFORM_WORKERS", "0"))  # 0 = cpu_count // 2
+CHUNK_SECONDS = float(os.getenv("LONGFORM_CHUNK_SECONDS", "90"))
+CHUNK_OVERLAP = float(os.getenv("LONGFORM_OVERLAP_SECONDS", "2"))
+
+FRAME_MS = 30
+MIN_SILENCE = 0.5  # shorter pauses stay inside a speech region
+MIN_SPEECH = 0.25
+PAD = 0.2          # kept around each region so word onsets aren't clipped
+
+
+# --- 🔇 VOICE ACTIVITY ---
+def _silero_regions(audio, sample_rate):
+    from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+    options = VadOptions(min_silence_duration_ms=int(MIN_SILENCE * 1000), speech_pad_ms=int(PAD * 1000))
+    return [(r["start"] / sample_rate, r["end"] / sample_rate) for r in get_speech_timestamps(audio, options)]
+
+
+def _energy_regions(audio, sample_rate):
+    import numpy as np
+
+    hop = int(sample_rate * FRAME_MS / 1000)
+    n = len(audio) // hop
+    if n == 0:
+        return []
+    frames = audio[:n * hop].reshape(n, hop)
+    db = 10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-10)
+    # Adaptive threshold: 12 dB above the noise floor, never below -50 dBFS
+    threshold = max(np.percentile(db, 10) + 12, -50)
+    voiced = db > threshold
+
+    regions, start = [], None
+    for i, v in enumerate(np.append(voiced, False)):
+        if v and start is None:
+            start = i
+        elif not v and start is not None:
+            regions.append([start * FRAME_MS / 1000, i * FRAME_MS / 1000])
+            start = None
+
+    merged = []
+    for region in regions:
+        if merged and region[0] - merged[-1][1] < MIN_SILENCE:
+            merged[-1][1] = region[1]
+        else:
+            merged.append(region)
+    duration = len(audio) / sample_rate
+    return [(max(0.0, s - PAD), min(duration, e + PAD)) for s, e in merged if e - s >= MIN_SPEECH]
+
+
+def speech_regions(audio, sample_rate=WHISPER_SAMPLE_RATE):
+    """
+    (start, end) seconds of speech. Uses Silero VAD when faster-whisper is installed,
+    otherwise an energy detector with an adaptive noise floor.
+    """
+    try:
+        return _silero_regions(audio, sample_rate)
+    except ImportError:
+        return _energy_regions(audio, sample_rate)
+
+
+def plan_chunks(regions, duration, target=CHUNK_SECONDS, overlap=CHUNK_OVERLAP):
+    """
+    Group speech regions into chunks of about `target` seconds, cutting in silences.
+    A region longer than `target` (continuous talking) is hard-cut into overlapping pieces.
+    """
+    chunks = []
+    for start, end in regions or ([(0.0, duration)] if duration > 0 else []):
+        if chunks and end - chunks[-1][0] <= target:
+            chunks[-1][1] = end
+            continue
+        while end - start > target:
+            chunks.append([start, start + target])
+            start += target - overlap
+        chunks.append([start, end])
+    return [(round(s, 3), round(e, 3)) for s, e in chunks]
+
+
+# --- 🧩 MERGE ---
+def _normalize(text):
+    return re.sub(r"[^\w ]", "", text.lower()).strip()
+
+
+def merge_chunk(emitted, previous, current, prev_chunk, chunk):
+    """
+    Join the segments of two neighbouring chunks. Both sides of the boundary are trimmed at the
+    middle of the gap (or of the overlap, after a hard cut): a segment belongs to whichever chunk
+    its midpoint falls in. A repeated phrase straddling the cut is dropped once.
+    Returns (final segments of `previous`, kept segments of `current`).
+    """
+    cut = (prev_chunk[1] + chunk[0]) / 2
+    mid = lambda s: (s["start"] + s["end"]) / 2
+    final = [s for s in previous if mid(s) < cut]
+    kept = [s for s in current if mid(s) >= cut]
+    last = final[-1] if final else (emitted[-1] if emitted else None)
+    if last and kept and kept[0]["start"] < last["end"] + 0.5:
+        a, b = _normalize(last["text"]), _normalize(kept[0]["text"])
+        if b and b in a:
+            kept = kept[1:]
+        elif a and a in b and final:
+            final = final[:-1]
+            kept[0] = dict(kept[0], start=last["start"])
+    return final, kept
+
+
+# --- 🧵 PARALLEL DECODE ---
+def _init_worker(cpu_threads):
+    # Read by model_pool when the worker loads its model
+    os.environ["WHISPER_CPU_THREADS"] = str(cpu_threads)
+    try:
+        import torch
+        torch.set_num_threads(cpu_threads)
+    except ImportError:
+        pass
+
+
+def _decode_chunk(audio, offset, model_size, backend, compute_type, beam_size, cpu_threads=0):
+    from transcription import TranscriptStream
+
+    result = TranscriptStream(audio, model_size, backend=backend, compute_type=compute_type, beam_size=beam_size,
+                              long_form=False, cpu_threads=cpu_threads).result()
+    segments = [{"start": round(s["start"] + offset, 2), "end": round(s["end"] + offset, 2), "text": s["text"]}
+                for s in result["segments"] if s["text"]]
+    return segments, result["language"]
+
+
+def default_workers(cpu_budget=None):
+    """LONGFORM_WORKERS, else half the thread budget (default: every core), so each worker gets at least 2 threads."""
+    return LONGFORM_WORKERS or max(1, (cpu_budget or os.cpu_count() or 2) // 2)
+
+
+def can_fork_workers():
+    # Daemonic processes (e.g. `ingest.py batch` workers) may not have children
+    return not multiprocessing.current_process().daemon
+
+
+def audio_duration(audio, sample_rate=WHISPER_SAMPLE_RATE):
+    """Seconds of audio for an array, a WAV file (read from the header) or other media (ffprobe); None if unknown without decoding."""
+    if not isinstance(audio, str):
+        return len(audio) / sample_rate
+    if audio.lower().endswith(".wav"):
+        import wave
+        try:
+            with wave.open(audio) as w:
+                return w.getnframes() / w.getframerate()
+        except (wave.Error, EOFError, OSError):
+            pass
+    return probe_duration(audio)
+
+
+def transcribe_long(audio, model_size="base", backend=None, compute_type="int8", beam_size=5, workers=None,
+                    info=None, cpu_threads=0):
+    """
+    Yield segments of a long recording in order: the audio is split at VAD silences into
+    ~CHUNK_SECONDS chunks, decoded by `workers` processes (each with its share of the
+    `cpu_threads` budget, default every core, and its own loaded model), shifted back to absolute
+    timestamps and de-duplicated where chunks meet. `info`, if given, receives "language",
+    "chunks" and "speech_seconds".
+    """
+    sample_rate = WHISPER_SAMPLE_RATE
+    if isinstance(audio, str):
+        audio = load_audio(audio)
+    duration = len(audio) / sample_rate
+    regions = speech_regions(audio, sample_rate)
+    chunks = plan_chunks(regions, duration)
+    info = info if info is not None else {}
+    info.update(chunks=len(chunks), speech_seconds=round(sum(e - s for s, e in regions), 1))
+
+    budget = cpu_threads or os.cpu_count() or 1
+    workers = max(1, min(workers or default_workers(budget), budget, len(chunks)))
+    if workers > 1 and not can_fork_workers():
+        workers = 1
+    threads_each = max(1, budget // workers)
+    jobs = [(audio[int(s * sample_rate):int(e * sample_rate)], s, model_size, backend, compute_type, beam_size,
+             threads_each if (cpu_threads or workers > 1) else 0) for s, e in chunks]
+
+    pool = None
+    if workers > 1:
+        # spawn, not fork: callers (ingest pipelines, the app) are multithreaded and may hold a
+        # loaded model / OpenMP pool, and forking such a process can deadlock the child
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                   initializer=_init_worker, initargs=(threads_each,))
+    try:
+        futures = [pool.submit(_decode_chunk, *job) for job in jobs] if pool else None
+        emitted, previous, prev_chunk = [], [], None
+        for i, chunk in enumerate(chunks):
+            segments, language = futures[i].result() if pool else _decode_chunk(*jobs[i])
+            if prev_chunk is None:
+                previous = segments
+            else:
+                final, previous = merge_chunk(emitted, previous, segments, prev_chunk, chunk)
+                emitted.extend(final)
+                yield from final
+            prev_chunk = chunk
+            if "language" not in info and language:
+                info["language"] = language
+        emitted.extend(previous)
+        yield from previous
+    finally:
+        if pool:
+            pool.shutdown(cancel_futures=True)
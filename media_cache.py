@@ -0,0 +1,154 @@
+import os
+import re
+import json
+import time
+import shutil
+import sqlite3
+import hashlib
+import threading
+from urllib.parse import urlparse, parse_qsl, urlencode
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Query params that never change which media a URL points at
+TRACKING_PARAMS = {"igsh", "igshid", "si", "feature", "ref", "ref_src", "fbclid", "gclid", "img_index"}
+
+INSTAGRAM_RE = re.compile(r"instagram\.com/(?:[\w.]+/)?(?:reel|reels|p|tv)/([\w-]+)")
+YOUTUBE_RE = re.compile(r"(?:youtube\.com/(?:watch\?(?:.*&)?v=|shorts/|embed/)|youtu\.be/)([\w-]{11})")
+TIKTOK_RE = re.compile(r"tiktok\.com/@[\w.]+/video/(\d+)")
+
+
+def normalize_url(url):
+    """Canonical cache key for a media URL: platform id when we know it, otherwise a cleaned URL."""
+    url = (url or "").strip()
+    for prefix, pattern in (("instagram", INSTAGRAM_RE), ("youtube", YOUTUBE_RE), ("tiktok", TIKTOK_RE)):
+        m = pattern.search(url)
+        if m:
+            return f"{prefix}:{m.group(1)}"
+
+    parsed = urlparse(url if "://" in url else f"https://{url}")
+    host = parsed.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    query = [(k, v) for k, v in parse_qsl(parsed.query) if k.lower() not in TRACKING_PARAMS and not k.lower().startswith("utm_")]
+    path = parsed.path.rstrip("/") or "/"
+    return f"{host}{path}" + (f"?{urlencode(sorted(query))}" if query else "")
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class MediaCache:
+    """
+    Persistent on-disk cache of downloaded media.
+    Entries are keyed by normalized URL and stored as content-addressed blobs
+    (blobs/<sha[:2]>/<sha>.<ext>), so two URLs for the same video share one file.
+    Least-recently-used entries are evicted once the cache grows past `max_bytes`.
+    """
+
+    def __init__(self, root=None, max_bytes=None):
+        self.root = root or os.getenv("MEDIA_CACHE_DIR", os.path.join(BASE_DIR, ".cache", "media"))
+        self.max_bytes = max_bytes or int(os.getenv("MEDIA_CACHE_MAX_MB", "5000")) * 1024 * 1024
+        self.blob_dir = os.path.join(self.root, "blobs")
+        self.db_path = os.path.join(self.root, "index.sqlite3")
+        self._lock = threading.Lock()
+        os.makedirs(self.blob_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    url TEXT,
+                    sha256 TEXT,
+                    path TEXT,
+                    size INTEGER,
+                    meta TEXT,
+                    created_at REAL,
+                    last_access REAL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_access ON entries(last_access)")
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def get(self, url):
+        """Cached metadata (with a valid `video_path`) for `url`, or None on a miss."""
+        key = normalize_url(url)
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT path, meta FROM entries WHERE key = ?", (key,)).fetchone()
+            if not row:
+                return None
+            path, meta = row
+            if not os.path.exists(path):
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+        data = json.loads(meta or "{}")
+        data["video_path"] = path
+        return data
+
+    def put(self, url, file_path, meta=None):
+        """Move a freshly downloaded file into the cache and return its metadata with the cached `video_path`."""
+        key = normalize_url(url)
+        sha = file_sha256(file_path)
+        ext = os.path.splitext(file_path)[1].lower() or ".mp4"
+        blob_path = os.path.join(self.blob_dir, sha[:2], sha + ext)
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        if os.path.exists(blob_path):
+            os.remove(file_path)  # identical content already cached under another URL
+        else:
+            shutil.move(file_path, blob_path)
+
+        data = dict(meta or {})
+        data.pop("video_path", None)
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, url, sha256, path, size, meta, created_at, last_access) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, url, sha, blob_path, os.path.getsize(blob_path), json.dumps(data), now, now),
+            )
+            self._evict(conn, keep=key)
+        data["video_path"] = blob_path
+        return data
+
+    def _evict(self, conn, keep):
+        # Size is counted per blob, not per entry, because entries can share a blob
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT sha256, size FROM entries)").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, sha, path, size in conn.execute("SELECT key, sha256, path, size FROM entries WHERE key != ? ORDER BY last_access", (keep,)).fetchall():
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            still_used = conn.execute("SELECT 1 FROM entries WHERE sha256 = ? LIMIT 1", (sha,)).fetchone()
+            if still_used:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def stats(self):
+        with self._connect() as conn:
+            entries, blobs, size = conn.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT sha256), (SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT sha256, size FROM entries)) FROM entries"
+            ).fetchone()
+        return {"entries": entries, "blobs": blobs, "bytes": size, "max_bytes": self.max_bytes}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_media_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = MediaCache()
+        return _cache
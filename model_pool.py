@@ -0,0 +1,195 @@
+import os
+import threading
+from collections import OrderedDict
+
+try:
+    from faster_whisper import WhisperModel
+except ImportError:
+    WhisperModel = None
+
+try:
+    import whisper
+except ImportError:
+    whisper = None
+
+FASTER_WHISPER = "faster-whisper"
+OPENAI_WHISPER = "openai-whisper"
+
+# Approximate resident memory (MB) of one loaded model at float16 precision.
+# Only used for budget accounting, so rough numbers are fine.
+MODEL_MEMORY_MB = {
+    "tiny": 150,
+    "base": 300,
+    "small": 1000,
+    "medium": 2600,
+    "large": 5200,
+}
+COMPUTE_TYPE_SCALE = {
+    "int8": 0.5,
+    "int8_float32": 0.55,
+    "int8_float16": 0.6,
+    "float16": 1.0,
+    "float32": 2.0,
+}
+
+
+def default_backend():
+    """Fastest installed Whisper backend, or None if neither is installed."""
+    if WhisperModel is not None:
+        return FASTER_WHISPER
+    if whisper is not None:
+        return OPENAI_WHISPER
+    return None
+
+
+def estimate_model_mb(model_size, compute_type="int8"):
+    base = MODEL_MEMORY_MB.get(model_size.split(".")[0].split("-")[0], MODEL_MEMORY_MB["large"])
+    return int(base * COMPUTE_TYPE_SCALE.get(compute_type, 1.0))
+
+
+def _load_model(backend, model_size, compute_type, cpu_threads=0):
+    if backend == FASTER_WHISPER:
+        if WhisperModel is None:
+            raise RuntimeError("faster-whisper is not installed.")
+        cpu_threads = cpu_threads or int(os.getenv("WHISPER_CPU_THREADS", "0"))
+        return WhisperModel(model_size, device="cpu", compute_type=compute_type, cpu_threads=cpu_threads)
+    if backend == OPENAI_WHISPER:
+        if whisper is None:
+            raise RuntimeError("openai-whisper is not installed.")
+        return whisper.load_model(model_size)
+    raise ValueError(f"Unknown Whisper backend: {backend}")
+
+
+class WhisperModelPool:
+    """
+    Process-wide registry of loaded Whisper models keyed by (backend, model_size, compute_type, cpu_threads).
+    cpu_threads=0 means WHISPER_CPU_THREADS; profiles that pin a thread count get their own instance.
+    Models are loaded once and reused; least-recently-used models are evicted when the
+    estimated footprint exceeds `max_memory_mb`. The most recently requested model is never evicted.
+    """
+
+    def __init__(self, max_memory_mb=None):
+        self.max_memory_mb = max_memory_mb or int(os.getenv("WHISPER_POOL_MAX_MB", "4000"))
+        self._models = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._warming = set()
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+
+    def _key(self, model_size, backend, compute_type, cpu_threads=0):
+        backend = backend or default_backend()
+        if backend is None:
+            raise RuntimeError("No Whisper backend installed. Run `pip install faster-whisper` or `pip install openai-whisper`.")
+        if backend == OPENAI_WHISPER:
+            compute_type = "float32"  # openai-whisper has no quantized CPU mode
+            cpu_threads = 0  # torch threads are process-wide, not per model
+        return (backend, model_size, compute_type, cpu_threads)
+
+    def get(self, model_size="base", backend=None, compute_type="int8", cpu_threads=0):
+        key = self._key(model_size, backend, compute_type, cpu_threads)
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                self.hits += 1
+                return self._models[key]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # Load outside the pool lock so other sizes stay available; the per-key
+        # lock stops two sessions loading the same model at once.
+        with key_lock:
+            with self._lock:
+                if key in self._models:
+                    self._models.move_to_end(key)
+                    self.hits += 1
+                    return self._models[key]
+            model = _load_model(*key)
+            with self._lock:
+                self._models[key] = model
+                self.loads += 1
+                self._key_locks.pop(key, None)
+                self._evict()
+        return model
+
+    def _evict(self):
+        while len(self._models) > 1 and self.memory_mb() > self.max_memory_mb:
+            self._models.popitem(last=False)
+            self.evictions += 1
+
+    def memory_mb(self):
+        return sum(estimate_model_mb(size, ct) for _, size, ct, _ in self._models)
+
+    def is_loaded(self, model_size, backend=None, compute_type="int8", cpu_threads=0):
+        return self._key(model_size, backend, compute_type, cpu_threads) in self._models
+
+    def warm_up(self, model_sizes, backend=None, compute_type="int8", background=True):
+        """Preload models so the first transcription doesn't pay the load cost. Safe to call on every rerun."""
+        keys = []
+        with self._lock:
+            for size in model_sizes:
+                size = size.strip()
+                if not size:
+                    continue
+                key = self._key(size, backend, compute_type)
+                if key in self._models or key in self._warming:
+                    continue
+                self._warming.add(key)
+                keys.append(key)
+        if not keys:
+            return None
+
+        def _run():
+            for key in keys:
+                b, size, ct, _ = key
+                try:
+                    self.get(size, backend=b, compute_type=ct)
+                except Exception as e:
+                    print(f"Whisper warm-up failed for {size}: {e}")
+                finally:
+                    with self._lock:
+                        self._warming.discard(key)
+
+        if not background:
+            _run()
+            return None
+        thread = threading.Thread(target=_run, name="whisper-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "loaded": [f"{b}:{s}:{ct}" + (f":{t}t" if t else "") for b, s, ct, t in self._models],
+                "memory_mb": self.memory_mb(),
+                "max_memory_mb": self.max_memory_mb,
+                "hits": self.hits,
+                "loads": self.loads,
+                "evictions": self.evictions,
+            }
+
+
+# Module globals survive Streamlit reruns (only the app script is re-executed),
+# so one pool is shared by every session in the process.
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_model_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = WhisperModelPool()
+        return _pool
+
+
+def warm_up_from_env():
+    """Warm the sizes listed in WHISPER_WARMUP_MODELS (comma separated, default 'small')."""
+    sizes = os.getenv("WHISPER_WARMUP_MODELS", "small").split(",")
+    if default_backend() is None:
+        return None
+    return get_model_pool().warm_up(sizes)
@@ -0,0 +1,111 @@
+import os
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Max in-flight requests per provider, shared by every job in the process
+PROVIDER_LIMITS = {
+    "openai": int(os.getenv("OPENAI_MAX_CONCURRENCY", "8")),
+    "gemini": int(os.getenv("GEMINI_MAX_CONCURRENCY", "4")),
+    "assemblyai": int(os.getenv("ASSEMBLYAI_MAX_CONCURRENCY", "4")),
+    "github": int(os.getenv("GITHUB_MAX_CONCURRENCY", "2")),
+}
+DEFAULT_LIMIT = 4
+MAX_RETRIES = int(os.getenv("API_MAX_RETRIES", "4"))
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+RETRYABLE_ERRORS = {
+    "RateLimitError", "APITimeoutError", "APIConnectionError", "InternalServerError",
+    "ResourceExhausted", "ServiceUnavailable", "DeadlineExceeded", "TooManyRequests",
+    "Timeout", "ConnectTimeout", "ReadTimeout", "ConnectionError",
+}
+
+_slots = {}
+_slots_lock = threading.Lock()
+
+
+def provider_slot(provider):
+    """Semaphore bounding concurrent calls to `provider` across all threads."""
+    with _slots_lock:
+        if provider not in _slots:
+            _slots[provider] = threading.BoundedSemaphore(PROVIDER_LIMITS.get(provider, DEFAULT_LIMIT))
+        return _slots[provider]
+
+
+def _status_code(exc):
+    status = getattr(exc, "status_code", None) or getattr(exc, "code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_retryable(exc):
+    status = _status_code(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    return type(exc).__name__ in RETRYABLE_ERRORS
+
+
+def retry_delay(exc, attempt, base=1.0, cap=30.0):
+    """Honour a Retry-After header when the provider sends one, otherwise exponential backoff with jitter."""
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    retry_after = headers.get("retry-after") or headers.get("Retry-After")
+    if retry_after:
+        try:
+            return min(cap, float(retry_after))
+        except ValueError:
+            pass
+    return min(cap, base * (2 ** attempt)) * random.uniform(0.5, 1.0)
+
+
+def call_with_retry(fn, *args, provider="openai", max_retries=None, **kwargs):
+    """Call `fn(*args, **kwargs)` inside the provider's concurrency slot, retrying rate limits and 5xx errors."""
+    max_retries = MAX_RETRIES if max_retries is None else max_retries
+    for attempt in range(max_retries + 1):
+        with provider_slot(provider):
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                if attempt >= max_retries or not is_retryable(e):
+                    raise
+                delay = retry_delay(e, attempt)
+        # Sleep outside the slot so waiting retries don't block other calls
+        time.sleep(delay)
+
+
+def map_ordered(fn, items, max_workers=None, provider=None, return_exceptions=False):
+    """
+    Run `fn(item)` for every item on a thread pool and return the results in input order.
+    With `return_exceptions=True` failures are returned in place instead of raised.
+    """
+    items = list(items)
+    if not items:
+        return []
+    if max_workers is None:
+        max_workers = PROVIDER_LIMITS.get(provider, DEFAULT_LIMIT)
+    max_workers = max(1, min(max_workers, len(items)))
+    if max_workers == 1:
+        return [_call(fn, item, return_exceptions) for item in items]
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(fn, item) for item in items]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                if not return_exceptions:
+                    for f in futures:
+                        f.cancel()
+                    raise
+                results.append(e)
+        return results
+
+
+def _call(fn, item, return_exceptions):
+    try:
+        return fn(item)
+    except Exception as e:
+        if not return_exceptions:
+            raise
+        return e
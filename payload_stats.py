@@ -0,0 +1,42 @@
+import json
+import threading
+
+_stats = {}
+_lock = threading.Lock()
+
+
+def measure(messages):
+    """(images, image_bytes, request_bytes) of chat messages; image bytes are the decoded size of inline data URLs."""
+    images = image_bytes = 0
+    for message in messages:
+        content = message.get("content")
+        if not isinstance(content, list):
+            continue
+        for part in content:
+            url = (part.get("image_url") or {}).get("url", "") if isinstance(part, dict) else ""
+            if url.startswith("data:"):
+                images += 1
+                image_bytes += len(url.partition(",")[2]) * 3 // 4
+    return images, image_bytes, len(json.dumps(messages, default=str).encode("utf-8"))
+
+
+def record(feature, messages):
+    """Count one outgoing vision request for `feature`; requests without images are ignored. Returns its size in bytes."""
+    images, image_bytes, request_bytes = measure(messages)
+    if images:
+        with _lock:
+            s = _stats.setdefault(feature, {"requests": 0, "images": 0, "image_bytes": 0, "request_bytes": 0})
+            s["requests"] += 1
+            s["images"] += images
+            s["image_bytes"] += image_bytes
+            s["request_bytes"] += request_bytes
+    return request_bytes
+
+
+def payload_stats():
+    """Totals for this process plus a per-feature breakdown, e.g. for the sidebar."""
+    with _lock:
+        features = {name: dict(s) for name, s in _stats.items()}
+    totals = {key: sum(s[key] for s in features.values()) for key in ("requests", "images", "image_bytes", "request_bytes")}
+    totals["bytes_per_request"] = totals["request_bytes"] / totals["requests"] if totals["requests"] else 0
+    return {**totals, "features": features}
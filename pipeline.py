@@ -0,0 +1,284 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import tempfile
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from media_cache import file_sha256
+
+# Where a stage runs
+CPU = "cpu"        # process pool: GIL-bound work (Whisper on CPU, scene detection)
+THREAD = "thread"  # thread pool: blocking I/O (SDK calls, downloads, ffmpeg subprocesses)
+ASYNC = "async"    # coroutine on the pipeline's event loop (async provider clients)
+
+STARTED, DONE, FAILED, SKIPPED, CACHED = "started", "done", "failed", "skipped", "cached"
+
+_MISSING = object()  # value of an output whose producing stage failed or was skipped
+
+
+class Stage:
+    """
+    One node of a pipeline. `fn` is called with its `inputs` as keyword arguments and returns
+    its single output, or a dict/tuple when it declares several `outputs` (default: the stage name).
+    An input written as "name?" is optional: it is None when its producer failed instead of
+    skipping this stage. CPU stages run in a spawned process pool, so `fn` must be importable at
+    module level (no lambdas or closures) and its inputs must pickle; THREAD and ASYNC stages may
+    be any callable.
+    `params` (prompt text, model size, ...) is part of the stage's identity in a run manifest:
+    change it and the stage is recomputed on resume.
+    """
+
+    def __init__(self, name, fn, inputs=(), outputs=None, kind=THREAD, params=None):
+        self.name = name
+        self.fn = fn
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs) if outputs else (name,)
+        self.kind = kind
+        self.params = params
+
+    def input_names(self):
+        return [i.rstrip("?") for i in self.inputs]
+
+    def __repr__(self):
+        return f"Stage({self.name!r}, {self.kind}, {self.input_names()} -> {list(self.outputs)})"
+
+
+class Pipeline:
+    """
+    DAG executor: every stage starts as soon as its inputs exist, so independent branches
+    (e.g. transcription and visual analysis after a download) overlap and a run takes as long
+    as its longest branch rather than the sum of its stages. A failed stage skips only the
+    stages that depend on it.
+    """
+
+    def __init__(self, stages):
+        self.stages = list(stages)
+        self.producers = {}
+        for stage in self.stages:
+            for key in stage.outputs:
+                if key in self.producers:
+                    raise ValueError(f"{key!r} is produced by both {self.producers[key].name!r} and {stage.name!r}")
+                self.producers[key] = stage
+        self._check_acyclic()
+
+    def _check_acyclic(self):
+        state = {}
+
+        def visit(stage, path):
+            if state.get(stage.name) == DONE:
+                return
+            if state.get(stage.name) == STARTED:
+                raise ValueError("Pipeline has a cycle: " + " -> ".join(path + [stage.name]))
+            state[stage.name] = STARTED
+            for key in stage.input_names():
+                if key in self.producers:
+                    visit(self.producers[key], path + [stage.name])
+            state[stage.name] = DONE
+
+        for stage in self.stages:
+            visit(stage, [])
+
+    def run(self, inputs=None, max_processes=None, max_threads=8, on_event=None, manifest=None):
+        """
+        Execute the DAG. `inputs` supplies the values no stage produces; `on_event(stage, event, info)`
+        is called (from the run's loop thread) as stages start, finish, fail, are skipped or are
+        reused from `manifest` (a RunManifest: stages whose inputs are unchanged are not run again).
+        Returns {"values", "errors", "skipped", "cached", "timings", "wall", "busy"}; timings are
+        (start, end) seconds from the start of the run.
+        """
+        inputs = dict(inputs or {})
+        missing = {k for s in self.stages for k in s.input_names() if k not in self.producers and k not in inputs}
+        if missing:
+            raise ValueError(f"Pipeline inputs not provided: {sorted(missing)}")
+        needs_processes = any(s.kind == CPU for s in self.stages)
+        with ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix="stage") as threads:
+            # spawn, not fork: the stage threads are already running downloads, ffmpeg and SDK calls
+            # when the first CPU stage starts, and forking while they hold locks can deadlock the child
+            processes = None
+            if needs_processes:
+                processes = ProcessPoolExecutor(max_workers=max_processes, mp_context=multiprocessing.get_context("spawn"))
+            try:
+                return asyncio.run(self._run(inputs, threads, processes, on_event, manifest))
+            finally:
+                if processes:
+                    processes.shutdown()
+
+    async def _run(self, inputs, threads, processes, on_event, manifest):
+        loop = asyncio.get_running_loop()
+        t0 = time.perf_counter()
+        values = {key: loop.create_future() for key in self.producers}
+        for key, value in inputs.items():
+            values.setdefault(key, loop.create_future()).set_result(value)
+        errors, skipped, cached, timings = {}, [], [], {}
+
+        def emit(stage, event, info=None):
+            if on_event:
+                on_event(stage, event, info)
+
+        def finish(stage, result):
+            if result is not _MISSING and len(stage.outputs) > 1:
+                result = dict(result) if isinstance(result, dict) else dict(zip(stage.outputs, result))
+            for key in stage.outputs:
+                if result is _MISSING:
+                    values[key].set_result(_MISSING)
+                else:
+                    values[key].set_result(result[key] if len(stage.outputs) > 1 else result)
+
+        async def run_stage(stage):
+            kwargs = {}
+            for name in stage.inputs:
+                key = name.rstrip("?")
+                value = await values[key]
+                if value is _MISSING and not name.endswith("?"):
+                    skipped.append(stage.name)
+                    emit(stage, SKIPPED, key)
+                    return finish(stage, _MISSING)
+                kwargs[key] = None if value is _MISSING else value
+
+            if manifest is not None:
+                input_hash = await loop.run_in_executor(threads, stage_hash, stage, kwargs)
+                hit = manifest.lookup(stage.name, input_hash)
+                if hit is not None:
+                    cached.append(stage.name)
+                    emit(stage, CACHED, hit)
+                    return finish(stage, hit)
+
+            start = time.perf_counter()
+            emit(stage, STARTED)
+            try:
+                if stage.kind == ASYNC:
+                    result = await stage.fn(**kwargs)
+                elif stage.kind == CPU:
+                    result = await loop.run_in_executor(processes, _call, stage.fn, kwargs)
+                else:
+                    result = await loop.run_in_executor(threads, _call, stage.fn, kwargs)
+            except Exception as e:
+                errors[stage.name] = e
+                timings[stage.name] = (start - t0, time.perf_counter() - t0)
+                emit(stage, FAILED, e)
+                return finish(stage, _MISSING)
+            timings[stage.name] = (start - t0, time.perf_counter() - t0)
+            if manifest is not None:
+                manifest.record(stage.name, input_hash, result, timings[stage.name][1] - timings[stage.name][0])
+            emit(stage, DONE, result)
+            finish(stage, result)
+
+        await asyncio.gather(*(run_stage(s) for s in self.stages))
+        produced = {k: f.result() for k, f in values.items() if f.done() and f.result() is not _MISSING}
+        return {
+            "values": produced,
+            "errors": errors,
+            "skipped": skipped,
+            "cached": cached,
+            "timings": timings,
+            "wall": time.perf_counter() - t0,
+            "busy": sum(end - start for start, end in timings.values()),
+        }
+
+
+def _call(fn, kwargs):
+    return fn(**kwargs)
+
+
+# --- 📒 RUN MANIFEST ---
+_digests = {}
+
+
+def fingerprint(value):
+    """
+    Content identity of a stage input: existing files hash by content (so an edited audio file
+    invalidates its dependents), containers recurse, and objects without a stable value (API
+    clients) count by type only.
+    """
+    if isinstance(value, str) and os.path.isfile(value):
+        stat = os.stat(value)
+        key = (os.path.abspath(value), stat.st_size, stat.st_mtime)
+        if key not in _digests:
+            _digests[key] = file_sha256(value)
+        return "file:" + _digests[key]
+    if isinstance(value, dict):
+        return {str(k): fingerprint(v) for k, v in sorted(value.items(), key=lambda kv: str(kv[0]))}
+    if isinstance(value, (list, tuple)):
+        return [fingerprint(v) for v in value]
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return "object:" + type(value).__name__
+
+
+def stage_hash(stage, kwargs):
+    payload = {"stage": stage.name, "params": fingerprint(stage.params), "inputs": fingerprint(kwargs)}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _files_in(value):
+    if isinstance(value, str):
+        return [value] if len(value) < 4096 and os.path.isabs(value) and os.path.isfile(value) else []
+    if isinstance(value, dict):
+        return [f for v in value.values() for f in _files_in(v)]
+    if isinstance(value, (list, tuple)):
+        return [f for v in value for f in _files_in(v)]
+    return []
+
+
+class RunManifest:
+    """
+    make-style record of a pipeline run (manifest.json in the run folder): for every finished stage,
+    the hash of its inputs and params, its JSON output and the files it points at. On resume a stage
+    is reused when its input hash matches and its files still exist; anything downstream of a
+    changed input hashes differently and is recomputed.
+    """
+
+    def __init__(self, path, meta=None):
+        self.path = path
+        self.data = {"meta": meta or {}, "stages": {}}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.data = json.load(f)
+            self.data["meta"].update(meta or {})
+        self.save()
+
+    @property
+    def meta(self):
+        return self.data["meta"]
+
+    def lookup(self, name, input_hash):
+        """The recorded output of `name` if its inputs are unchanged and its files still exist, else None."""
+        entry = self.data["stages"].get(name)
+        if not entry or entry["input_hash"] != input_hash:
+            return None
+        if not all(os.path.exists(f) for f in entry["files"]):
+            return None
+        return entry["output"]
+
+    def record(self, name, input_hash, output, duration):
+        try:
+            json.dumps(output)
+        except (TypeError, ValueError):
+            return  # not persistable: the stage simply runs again next time
+        self.data["stages"][name] = {"input_hash": input_hash, "output": output, "files": _files_in(output),
+                                     "duration": round(duration, 3), "finished_at": time.time()}
+        self.save()
+
+    def save(self):
+        # Write-then-rename, so a crash mid-write never loses the stages already recorded
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)), prefix=".manifest_")
+        with os.fdopen(fd, "w") as f:
+            json.dump(self.data, f, indent=2)
+        os.replace(tmp, self.path)
+
+
+def format_timings(result):
+    """Per-stage timeline plus wall time vs. the time the stages would take back to back."""
+    lines = []
+    for name, (start, end) in sorted(result["timings"].items(), key=lambda kv: kv[1][0]):
+        status = "failed" if name in result["errors"] else "ok"
+        lines.append(f"  {name:<22} {start:>7.1f}s -> {end:>7.1f}s  ({end - start:>6.1f}s, {status})")
+    for name in result.get("cached", []):
+        lines.append(f"  {name:<22} reused from manifest")
+    lines.append(f"  wall {result['wall']:.1f}s vs {result['busy']:.1f}s sequential "
+                 f"({result['busy'] / max(result['wall'], 1e-9):.1f}x overlap)")
+    return "\n".join(lines)
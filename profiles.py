@@ -0,0 +1,93 @@
+import os
+from collections import namedtuple
+
+from audio_utils import load_audio, WHISPER_SAMPLE_RATE
+from longform import speech_regions, audio_duration
+
+CPU_COUNT = os.cpu_count() or 4
+
+TranscriptionProfile = namedtuple("TranscriptionProfile", "name model_size beam_size compute_type cpu_threads")
+
+PROFILES = {
+    # Greedy decode on a small model with few threads, so several jobs run side by side
+    "realtime": TranscriptionProfile("realtime", "base", 1, "int8", min(2, CPU_COUNT)),
+    # The previous default (small, beam 5, WHISPER_CPU_THREADS), so the warmed-up model is reused
+    "balanced": TranscriptionProfile("balanced", "small", 5, "int8", 0),
+    "accurate": TranscriptionProfile("accurate", "medium", 5, "int8_float32", CPU_COUNT),
+}
+AUTO = "auto"
+CUSTOM = "custom"
+PROFILE_CHOICES = [AUTO, *PROFILES, CUSTOM]
+DEFAULT_PROFILE = "balanced"  # same cost as the old `small` default; auto can pick the heavier `accurate`
+TIERS = ["accurate", "balanced", "realtime"]  # slowest to fastest
+
+# Auto mode: seconds of speech each tier is used up to, and waiting jobs per step towards realtime
+AUTO_ACCURATE_SPEECH = float(os.getenv("AUTO_ACCURATE_SPEECH_SECONDS", "120"))
+AUTO_BALANCED_SPEECH = float(os.getenv("AUTO_BALANCED_SPEECH_SECONDS", "1200"))
+AUTO_QUEUE_STEP = int(os.getenv("AUTO_QUEUE_STEP", "3"))
+# Seconds of audio auto mode runs VAD on, spread over a few windows, so a long file is never decoded twice
+AUTO_SAMPLE_SECONDS = float(os.getenv("AUTO_SPEECH_SAMPLE_SECONDS", "240"))
+AUTO_SAMPLE_WINDOWS = 4
+
+
+def custom_profile(model_size="base"):
+    """The old behaviour: a hand-picked model size with beam 5, int8 and WHISPER_CPU_THREADS."""
+    return TranscriptionProfile(CUSTOM, model_size, 5, "int8", 0)
+
+
+def speech_ratio(audio, sample_rate=WHISPER_SAMPLE_RATE):
+    """Fraction of the audio that voice activity detection marks as speech."""
+    duration = len(audio) / sample_rate
+    if duration <= 0:
+        return 0.0
+    return min(1.0, sum(end - start for start, end in speech_regions(audio, sample_rate)) / duration)
+
+
+def sampled_speech_ratio(audio, duration):
+    """
+    speech_ratio over AUTO_SAMPLE_WINDOWS evenly spaced windows (AUTO_SAMPLE_SECONDS in total) of a
+    path or 16 kHz array; a path is only decoded inside those windows.
+    """
+    def window(start, seconds):
+        if isinstance(audio, str):
+            return load_audio(audio, start=start, max_seconds=seconds)
+        return audio[int(start * WHISPER_SAMPLE_RATE):int((start + seconds) * WHISPER_SAMPLE_RATE)]
+
+    if duration <= AUTO_SAMPLE_SECONDS:
+        return speech_ratio(window(0, None if isinstance(audio, str) else duration))
+    seconds = AUTO_SAMPLE_SECONDS / AUTO_SAMPLE_WINDOWS
+    step = (duration - seconds) / (AUTO_SAMPLE_WINDOWS - 1)
+    return sum(speech_ratio(window(i * step, seconds)) for i in range(AUTO_SAMPLE_WINDOWS)) / AUTO_SAMPLE_WINDOWS
+
+
+def choose_profile(duration, ratio=1.0, queue_depth=0):
+    """
+    Auto mode: the tier follows the amount of speech (short reels get `accurate`, hour-long talks
+    `realtime`), then drops one step per AUTO_QUEUE_STEP jobs waiting behind this one, so a busy
+    queue trades accuracy for throughput instead of growing.
+    """
+    speech = duration * ratio
+    tier = 0 if speech <= AUTO_ACCURATE_SPEECH else 1 if speech <= AUTO_BALANCED_SPEECH else 2
+    tier += queue_depth // max(1, AUTO_QUEUE_STEP)
+    return PROFILES[TIERS[min(tier, len(TIERS) - 1)]]
+
+
+def resolve_profile(name, audio=None, queue_depth=0, model_size="base"):
+    """
+    Settings for a transcription: a named profile, `custom` (just `model_size`), or `auto`, which
+    measures `audio` (a path or 16 kHz array) from its header and a bounded VAD sample. Returns
+    (profile, details) where details records what auto mode saw, for logging and job results.
+    """
+    if name == AUTO:
+        duration = audio_duration(audio)
+        if duration is None:
+            audio = load_audio(audio)  # no header to read: decode once, as before
+            duration = len(audio) / WHISPER_SAMPLE_RATE
+        ratio = sampled_speech_ratio(audio, duration)
+        details = {"duration": round(duration, 1), "speech_ratio": round(ratio, 2), "queue_depth": queue_depth}
+        return choose_profile(duration, ratio, queue_depth), details
+    if name in PROFILES:
+        return PROFILES[name], {}
+    if name in (None, CUSTOM):
+        return custom_profile(model_size), {}
+    raise ValueError(f"Unknown transcription profile: {name}")
@@ -0,0 +1,211 @@
+import os
+import json
+import random
+import hashlib
+import asyncio
+import threading
+
+import httpx
+
+from parallel import PROVIDER_LIMITS, DEFAULT_LIMIT, MAX_RETRIES, RETRYABLE_STATUS, retry_delay
+
+OPENAI = "openai"
+ASSEMBLYAI = "assemblyai"
+GITHUB = "github"
+
+TIMEOUT = float(os.getenv("PROVIDER_TIMEOUT", "60"))
+
+
+class ProviderError(Exception):
+    def __init__(self, provider, status_code, message, response=None):
+        super().__init__(f"{provider} HTTP {status_code}: {message}")
+        self.provider = provider
+        self.status_code = status_code
+        self.response = response
+
+
+class ProviderClient:
+    """
+    Async HTTP client for one provider: a pooled keep-alive connection pool sized to the
+    provider's concurrency limit, a semaphore bounding in-flight requests, per-request
+    timeouts, and retry with backoff (honouring Retry-After) on 429/5xx and network errors.
+    """
+
+    name = None
+    base_url = ""
+
+    def __init__(self, transport=None, limit=None, timeout=None, max_retries=None):
+        self.limit = limit or PROVIDER_LIMITS.get(self.name, DEFAULT_LIMIT)
+        self.max_retries = MAX_RETRIES if max_retries is None else max_retries
+        self._semaphore = asyncio.Semaphore(self.limit)
+        self.http = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers=self.headers(),
+            timeout=httpx.Timeout(timeout or TIMEOUT, connect=10.0),
+            limits=httpx.Limits(max_connections=self.limit, max_keepalive_connections=self.limit, keepalive_expiry=60),
+            transport=transport,
+        )
+
+    def headers(self):
+        return {}
+
+    async def request(self, method, path, **kwargs):
+        """Send a request and return the httpx.Response; raises ProviderError on a final non-2xx."""
+        for attempt in range(self.max_retries + 1):
+            async with self._semaphore:
+                try:
+                    resp = await self.http.request(method, path, **kwargs)
+                    error = None if resp.status_code < 400 else ProviderError(self.name, resp.status_code, resp.text[:300], resp)
+                except (httpx.TimeoutException, httpx.NetworkError) as e:
+                    resp, error = None, e
+            if error is None:
+                return resp
+            retryable = resp is None or resp.status_code in RETRYABLE_STATUS
+            if attempt >= self.max_retries or not retryable:
+                raise error
+            # Back off outside the semaphore so other requests keep flowing
+            await asyncio.sleep(retry_delay(error, attempt))
+
+    async def json(self, method, path, **kwargs):
+        return (await self.request(method, path, **kwargs)).json()
+
+    async def aclose(self):
+        await self.http.aclose()
+
+
+class OpenAIClient(ProviderClient):
+    name = OPENAI
+    base_url = "https://api.openai.com/v1"
+
+    def headers(self):
+        return {"Authorization": f"Bearer {os.getenv('OPENAI_API_KEY', '')}"}
+
+    async def embeddings(self, model, inputs):
+        data = await self.json("POST", "/embeddings", json={"model": model, "input": inputs})
+        return [d["embedding"] for d in sorted(data["data"], key=lambda d: d["index"])]
+
+
+class AssemblyAIClient(ProviderClient):
+    name = ASSEMBLYAI
+    base_url = "https://api.assemblyai.com/v2"
+
+    def headers(self):
+        return {"authorization": os.getenv("ASSEMBLYAI_API_KEY", "")}
+
+    async def transcribe(self, audio_file, poll_interval=1.0, max_interval=10.0, **config):
+        """Upload, submit and poll (with backoff, never blocking a thread) until the transcript is done."""
+        with open(audio_file, "rb") as f:
+            upload = await self.json("POST", "/upload", content=f.read())
+        body = {"audio_url": upload["upload_url"], "speaker_labels": True, "speech_models": ["universal-2"],
+                "language_detection": True, **config}
+        job = await self.json("POST", "/transcript", json=body)
+        interval = poll_interval
+        while job["status"] not in ("completed", "error"):
+            await asyncio.sleep(interval)
+            interval = min(max_interval, interval * 1.5)
+            job = await self.json("GET", f"/transcript/{job['id']}")
+        if job["status"] == "error":
+            raise ProviderError(self.name, 200, job.get("error") or "transcription failed")
+        return job
+
+
+class GitHubClient(ProviderClient):
+    name = GITHUB
+    base_url = "https://api.github.com"
+
+    def headers(self):
+        headers = {"Accept": "application/vnd.github.v3+json", "User-Agent": "ViralEngine/1.0"}
+        if os.getenv("GITHUB_TOKEN"):
+            headers["Authorization"] = f"Bearer {os.getenv('GITHUB_TOKEN')}"
+        return headers
+
+    async def search_repositories(self, query, per_page=6):
+        data = await self.json("GET", "/search/repositories", params={"q": query, "sort": "stars", "order": "desc", "per_page": per_page})
+        return data.get("items", [])
+
+
+CLIENTS = {OPENAI: OpenAIClient, ASSEMBLYAI: AssemblyAIClient, GITHUB: GitHubClient}
+
+
+# --- 🧪 FAKE PROVIDER (tests / offline runs) ---
+def _fake_vector(text, dim=8):
+    # Seeded from sha256, not hash(): hash() is salted per process (PYTHONHASHSEED)
+    rng = random.Random(int(hashlib.sha256(str(text).encode("utf-8")).hexdigest()[:8], 16))
+    return [rng.uniform(-1, 1) for _ in range(dim)]
+
+
+def fake_transport(fail_first=0, latency=0.0, handlers=None):
+    """
+    Local stand-in for every provider API: deterministic canned responses, optional latency,
+    and `fail_first` 429s (with Retry-After: 0) to exercise the retry path.
+    `handlers` maps a path suffix to fn(request) -> httpx.Response to override a route.
+    Enabled process-wide with PROVIDERS_FAKE=1.
+    """
+    state = {"failures": 0}
+
+    async def handle(request):
+        if latency:
+            await asyncio.sleep(latency * random.uniform(0.5, 1.5))
+        if state["failures"] < fail_first:
+            state["failures"] += 1
+            return httpx.Response(429, headers={"Retry-After": "0"}, text="rate limited")
+        path = request.url.path
+        for suffix, handler in (handlers or {}).items():
+            if path.endswith(suffix):
+                return handler(request)
+        body = json.loads(request.content) if request.content and request.headers.get("content-type") == "application/json" else {}
+        if path.endswith("/embeddings"):
+            inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+            vectors = [_fake_vector(t) for t in inputs]
+            return httpx.Response(200, json={"data": [{"index": i, "embedding": v} for i, v in enumerate(vectors)]})
+        if path.endswith("/upload"):
+            return httpx.Response(200, json={"upload_url": "https://fake.local/audio"})
+        if path.endswith("/transcript"):
+            return httpx.Response(200, json={"id": "fake", "status": "queued"})
+        if "/transcript/" in path:
+            return httpx.Response(200, json={"id": "fake", "status": "completed", "text": "fake transcript", "language_code": "en", "words": []})
+        if path.endswith("/search/repositories"):
+            q = request.url.params.get("q", "")
+            return httpx.Response(200, json={"items": [{"full_name": f"fake/{q}", "description": "fake repo", "stargazers_count": 1,
+                                                        "html_url": "https://github.com/fake", "clone_url": "https://github.com/fake.git"}]})
+        return httpx.Response(404, text=f"fake provider has no route for {path}")
+
+    return httpx.MockTransport(handle)
+
+
+# --- 🔁 SHARED EVENT LOOP ---
+# One long-lived loop in a daemon thread owns every client, so connection pools and keep-alive
+# survive across Streamlit reruns and sync callers can submit coroutines from any thread.
+_loop = None
+_clients = {}
+_lock = threading.Lock()
+_clients_lock = threading.Lock()
+
+
+def _get_loop():
+    global _loop
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="provider-loop", daemon=True).start()
+    return _loop
+
+
+def get_client(name, transport=None):
+    """The shared client for a provider; its coroutines must be awaited on the provider loop (see `run`)."""
+    with _clients_lock:
+        if name not in _clients:
+            if transport is None and os.getenv("PROVIDERS_FAKE") == "1":
+                transport = fake_transport()
+            _clients[name] = CLIENTS[name](transport=transport)
+        return _clients[name]
+
+
+def run(coro, timeout=None):
+    """Run a coroutine on the shared provider loop from synchronous code and return its result."""
+    return asyncio.run_coroutine_threadsafe(coro, _get_loop()).result(timeout)
+
+
+async def gather_ordered(coros, return_exceptions=False):
+    """Await many provider calls at once; results come back in input order."""
+    return await asyncio.gather(*coros, return_exceptions=return_exceptions)
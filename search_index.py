@@ -0,0 +1,190 @@
+import os
+import re
+import hashlib
+import sqlite3
+import threading
+from contextlib import closing
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+HIGHLIGHT_OPEN = "\u0002"
+HIGHLIGHT_CLOSE = "\u0003"
+
+# "exact phrase", prefix*, or a bare word
+QUERY_TOKEN = re.compile(r'"([^"]+)"|(\S+)')
+
+
+def build_match_query(query):
+    """
+    Turn what a user types into an FTS5 MATCH expression: "quoted phrases" stay phrases,
+    a trailing * makes a prefix query, and every other word is quoted so punctuation
+    (e.g. a pasted URL) can never break the syntax. Terms are ANDed.
+    """
+    terms = []
+    for phrase, word in QUERY_TOKEN.findall(query or ""):
+        if phrase:
+            terms.append('"' + phrase.replace('"', "") + '"')
+            continue
+        prefix = word.endswith("*")
+        word = word.rstrip("*").replace('"', "")
+        if word:
+            terms.append(f'"{word}"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+
+def text_hash(title, text):
+    return hashlib.sha256(f"{title}\0{text}".encode("utf-8")).hexdigest()
+
+
+class TranscriptIndex:
+    """
+    Local SQLite FTS5 mirror of the Supabase `transcripts` table for ranked full-text search.
+    BM25 ranking (title weighted above body), phrase and prefix queries, highlighted snippets.
+    Kept current by `DatabaseManager.save_transcript`; `sync_from_database` backfills it.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or os.getenv("SEARCH_INDEX_DB", os.path.join(BASE_DIR, ".cache", "search.sqlite3"))
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS docs (
+                    rowid INTEGER PRIMARY KEY,
+                    url TEXT UNIQUE NOT NULL,
+                    remote_id TEXT,
+                    created_at TEXT,
+                    hash TEXT
+                )
+            """)
+            # Prefix indexes keep `word*` queries as fast as whole-word ones
+            conn.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS docs_fts USING fts5(
+                    title, text, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+                )
+            """)
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+
+    def _upsert(self, conn, url, text, title, remote_id, created_at):
+        digest = text_hash(title or "", text or "")
+        row = conn.execute("SELECT rowid, hash FROM docs WHERE url = ?", (url,)).fetchone()
+        if row and row[1] == digest:
+            if remote_id is not None:
+                conn.execute("UPDATE docs SET remote_id = ? WHERE rowid = ?", (str(remote_id), row[0]))
+            return False
+        if row:
+            rowid = row[0]
+            conn.execute("UPDATE docs SET remote_id = COALESCE(?, remote_id), created_at = COALESCE(?, created_at), hash = ? WHERE rowid = ?",
+                         (None if remote_id is None else str(remote_id), created_at, digest, rowid))
+            conn.execute("DELETE FROM docs_fts WHERE rowid = ?", (rowid,))
+        else:
+            rowid = conn.execute("INSERT INTO docs (url, remote_id, created_at, hash) VALUES (?, ?, ?, ?)",
+                                 (url, None if remote_id is None else str(remote_id), created_at, digest)).lastrowid
+        conn.execute("INSERT INTO docs_fts (rowid, title, text) VALUES (?, ?, ?)", (rowid, title or "", text or ""))
+        return True
+
+    def upsert(self, url, text, title="", remote_id=None, created_at=None):
+        """Index (or re-index) one transcript. Unchanged title+text is skipped; returns True if indexed."""
+        return self.upsert_many([{"url": url, "text": text, "title": title, "id": remote_id, "created_at": created_at}]) == 1
+
+    def upsert_many(self, rows):
+        """Index many {"url", "text", "title", "id", "created_at"} rows in one transaction; returns how many changed."""
+        changed = 0
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN")
+            for r in rows:
+                changed += self._upsert(conn, r["url"], r.get("text"), r.get("title"), r.get("id"), r.get("created_at"))
+            conn.execute("COMMIT")
+        return changed
+
+    def delete(self, url):
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT rowid FROM docs WHERE url = ?", (url,)).fetchone()
+            if row:
+                conn.execute("DELETE FROM docs_fts WHERE rowid = ?", row)
+                conn.execute("DELETE FROM docs WHERE rowid = ?", row)
+
+    def count(self):
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def search(self, query, limit=20, offset=0, snippet_tokens=16):
+        """
+        Ranked hits as {"url", "id", "title", "created_at", "score", "snippet"}, best first.
+        Matches in `snippet` are wrapped in HIGHLIGHT_OPEN/HIGHLIGHT_CLOSE (see `highlight`).
+        """
+        match = build_match_query(query)
+        if not match:
+            return []
+        sql = f"""
+            SELECT d.url, d.remote_id, docs_fts.title, d.created_at, bm25(docs_fts, 4.0, 1.0) AS score,
+                   snippet(docs_fts, 1, '{HIGHLIGHT_OPEN}', '{HIGHLIGHT_CLOSE}', '…', ?)
+            FROM docs_fts JOIN docs d ON d.rowid = docs_fts.rowid
+            WHERE docs_fts MATCH ?
+            ORDER BY score LIMIT ? OFFSET ?
+        """
+        with closing(self._connect()) as conn:
+            try:
+                rows = conn.execute(sql, (snippet_tokens, match, limit, offset)).fetchall()
+            except sqlite3.OperationalError:
+                return []  # query the tokenizer reduced to nothing, e.g. only punctuation
+        return [
+            {"url": url, "id": remote_id, "title": title, "created_at": created_at, "score": -score, "snippet": snippet}
+            for url, remote_id, title, created_at, score, snippet in rows
+        ]
+
+    def rebuild(self):
+        """Rebuild FTS b-trees after large backfills; also merges segments for faster queries."""
+        with closing(self._connect()) as conn:
+            conn.execute("INSERT INTO docs_fts (docs_fts) VALUES ('optimize')")
+
+
+def highlight(snippet, open_tag="**", close_tag="**"):
+    """Render a search snippet's match markers, e.g. as Markdown bold or <mark> tags."""
+    return (snippet or "").replace(HIGHLIGHT_OPEN, open_tag).replace(HIGHLIGHT_CLOSE, close_tag)
+
+
+def index_row(row, index=None):
+    """Index a Supabase transcripts row (title comes from metadata)."""
+    index = index or get_search_index()
+    title = (row.get("metadata") or {}).get("title") or row.get("title") or ""
+    return index.upsert(row["url"], row.get("text") or "", title, row.get("id"), row.get("created_at"))
+
+
+def sync_from_database(db_manager, index=None, page_size=500):
+    """Backfill/refresh the index from Supabase page by page; unchanged rows are skipped. Returns rows changed."""
+    index = index or get_search_index()
+    changed, cursor = 0, None
+    while True:
+        rows, cursor = db_manager.list_transcripts(limit=page_size, cursor=cursor, columns="id, url, text, created_at, title:metadata->>title")
+        changed += index.upsert_many(rows)
+        if not cursor:
+            break
+    if changed:
+        index.rebuild()
+    return changed
+
+
+_index = None
+_sync_started = False
+_lock = threading.Lock()
+
+
+def get_search_index():
+    global _index
+    with _lock:
+        if _index is None:
+            _index = TranscriptIndex()
+    return _index
+
+
+def ensure_search_index(db_manager):
+    """Start one background sync per process so a fresh install is searchable without blocking the UI."""
+    global _sync_started
+    with _lock:
+        if _sync_started or not db_manager.supabase:
+            return
+        _sync_started = True
+    threading.Thread(target=sync_from_database, args=(db_manager,), daemon=True).start()
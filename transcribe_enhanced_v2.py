@@ -21,20 +21,16 @@ logging.getLogger('google.auth').setLevel(logging.CRITICAL)
 logging.getLogger('google.oauth2').setLevel(logging.CRITICAL)
 
 # Now import with warnings suppressed
-from moviepy import VideoFileClip
 import streamlit as st
 
 # ENABLE WIDE MODE (Must be first Streamlit command)
 st.set_page_config(page_title="Viral Engine v2", layout="wide", initial_sidebar_state="expanded")
 
-import instaloader
-import yt_dlp
 import base64
-import assemblyai as aai
 from dotenv import load_dotenv
 import json
+import math
 import io
-import requests
 
 # Import Google Gemini with maximum warning suppression
 with warnings.catch_warnings():
@@ -47,6 +43,7 @@ logging.getLogger('google.auth').disabled = True
 logging.getLogger('google.oauth2').disabled = True
 
 from PIL import Image
+import numpy as np
 try:
     import whisper
 except ImportError:
@@ -54,6 +51,26 @@ except ImportError:
     whisper = None # Handle missing whisper gracefully
 
 from database import DatabaseManager
+from media_cache import get_media_cache
+from search_index import get_search_index, ensure_search_index, highlight
+from vector_index import find_reels, ensure_vector_index
+from llm_cache import cached_chat, cached_call, get_llm_cache
+import httpx
+from concurrent.futures import TimeoutError as FuturesTimeout
+from providers import get_client, run as run_provider, GITHUB, ProviderError
+from gemini_files import get_video_file, get_gemini_file_cache, prefetch_video_file
+from artifacts import get_artifact_store, source_key, VIRAL_ANALYSIS, MIND_MAP, VISUAL_DEEP_DIVE, VISUAL_TIMELINE, RECREATION_SCRIPT, CAMPAIGN, STORYBOARD, PODCAST, PDF, AUDIO_TRANSCRIPT
+from workspace import JobWorkspace, cleanup_stale_workspaces
+from parallel import call_with_retry, map_ordered
+from frames import get_frame_sampler, VISION_TOKEN_BUDGET, VISION_ENCODING, LOW_DETAIL_ENCODING, encode_image, image_part, to_base64
+from payload_stats import record as record_payload, payload_stats
+from visuals import analyze_visual_hook
+from audio_utils import join_pcm, export_pcm
+from model_pool import warm_up_from_env
+from profiles import PROFILE_CHOICES, CUSTOM, DEFAULT_PROFILE
+from transcription import format_timestamp, load_segments
+from job_queue import get_job_queue, RUNNING, DONE, FAILED
+from ingest import download_media, DownloadError, enqueue_ingest, enqueue_batch, batch_status, parse_urls, ensure_workers, ingest_segments_path, WHISPER, ASSEMBLYAI
 
 # Load environment variables
 env_path = "/Users/jaydengle/Transcribe-Reels/.env"
@@ -62,158 +79,50 @@ load_dotenv(dotenv_path=env_path)
 # Ensure external tools (ffmpeg) are found
 os.environ["PATH"] += os.pathsep + "/opt/homebrew/bin" + os.pathsep + "/usr/local/bin"
 
-# Set AssemblyAI API key
-aai.settings.api_key = os.getenv("ASSEMBLYAI_API_KEY")
-
 # Set Google Gemini API key
 genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
 
 # Initialize Database
 db_manager = DatabaseManager()
 db_connected = db_manager.connect()
+search_index = get_search_index()
+if db_connected:
+    ensure_search_index(db_manager)  # backfills the local full-text index once per process
+    ensure_vector_index(db_manager)  # embeds transcripts not yet in the semantic index
 
 if not db_connected:
     st.warning("Could not connect to Supabase. Transcripts will not be saved.")
 
-# Function to download Instagram Reel & Extract Metadata
-def download_reel(url):
-    # Try yt-dlp first with HARDENED HEADERS
-    try:
-        if not os.path.exists('reel'): os.makedirs('reel')
-        for f in os.listdir('reel'): 
-            try: os.remove(os.path.join('reel', f))
-            except: pass
+# Persistent download cache shared by every feature that needs the video file
+media_cache = get_media_cache()
 
-        ydl_opts = {
-            'format': 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best',
-            'outtmpl': 'reel/%(title)s.%(ext)s',
-            'quiet': True, 'no_warnings': True,
-            'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'referer': 'https://www.instagram.com/',
-            'cookiesfrombrowser': ('chrome',),  # Use logged-in Chrome session for Instagram auth
-        }
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=True)
-            # Find any video file (mp4, mkv, webm)
-            video_exts = ['.mp4', '.mkv', '.webm', '.mov']
-            downloaded = [f for f in os.listdir('reel') if any(f.endswith(ext) for ext in video_exts)]
-            if downloaded:
-                return {
-                    "title": info.get('title', 'video'),
-                    "caption": info.get('description', ''),
-                    "owner": info.get('uploader', 'Unknown'),
-                    "video_path": os.path.join('reel', downloaded[0])
-                }
+# Remove scratch dirs left behind by crashed runs
+cleanup_stale_workspaces()
 
-    except Exception as e:
-        # Silently fallback without scary errors
-        pass
+# Preload the default Whisper model in the background (no-op once loaded)
+warm_up_from_env()
 
+# Start the local ingest workers (kept alive across reruns)
+ensure_workers()
 
-    # Fallback to Instaloader for IG specifically
+# Function to download Instagram Reel & Extract Metadata
+def download_reel(url, workspace=None):
     try:
-        loader = instaloader.Instaloader()
-        if 'instagram.com/reel/' in url:
-            shortcode = url.split('/')[-2]
-            post = instaloader.Post.from_shortcode(loader.context, shortcode)
-            loader.download_post(post, target='reel')
-            downloaded = [f for f in os.listdir('reel') if f.endswith('.mp4')]
-            if downloaded:
-                return {
-                    "title": f"Reel {shortcode}",
-                    "caption": post.caption or "",
-                    "owner": post.owner_username,
-                    "video_path": os.path.join('reel', downloaded[0])
-                }
-    except Exception as e:
+        return download_media(url, workspace=workspace)
+    except DownloadError as e:
         st.error(f"Instagram blocked this download. Make sure you're logged into Instagram in Chrome and try again. (Detail: {e})")
-    return None
-
-# Function to analyze video visuals using GPT-4o (Vision)
-import base64
-def analyze_visual_frames(video_path):
-    clip = VideoFileClip(video_path)
-    duration = clip.duration
-    
-    # Extract frames at critical points (Hook, Mid, End)
-    timestamps = [0, min(3, duration), min(10, duration), min(duration-2, duration)]
-    unique_timestamps = sorted(list(set(timestamps)))
-    
-    frames_base64 = []
-    for t in unique_timestamps:
-        frame_path = f"temp_frame_{t}.jpg"
-        clip.save_frame(frame_path, t=t)
-        
-        with open(frame_path, "rb") as image_file:
-            encoded_string = base64.b64encode(image_file.read()).decode('utf-8')
-            frames_base64.append(encoded_string)
-        
-        if os.path.exists(frame_path):
-            os.remove(frame_path) # Cleanup
-            
-    clip.close()
-    return frames_base64
-
-# Function to convert video to audio
-def convert_video_to_audio(video_file_path):
-    clip = VideoFileClip(video_file_path)
-    clip.audio.write_audiofile("audio.wav", codec='pcm_s16le', ffmpeg_params=["-ac", "1", "-ar", "16000"]) 
-    clip.close()
-    return "audio.wav"
-
-# --- 🎙️ TRANSCRIPTION (FASTER-WHISPER) ---
-def transcribe_with_whisper(audio_file, model_size="base"):
-    try:
-        from faster_whisper import WhisperModel
-        use_fast = True
-    except ImportError:
-        use_fast = False
-
-    # Run on CPU with INT8 by default. GPU requires CUDA/ctranslate2 setup.
-    # On Mac/MPS, faster-whisper runs on CPU but is still 4x faster than original.
-    if use_fast:
-        try:
-            model = WhisperModel(model_size, device="cpu", compute_type="int8")
-
-            st.info(f"🎙️ Transcribing with Faster-Whisper ({model_size})...")
-            segments, info = model.transcribe(audio_file, beam_size=5, condition_on_previous_text=True)
-
-            # Gather segments generator
-            full_text = ""
-            for segment in segments:
-                full_text += segment.text + " "
-
-            return {"text": full_text.strip(), "language": info.language}
-        except Exception as e:
-            st.error(f"Transcription Failed: {e}")
-            return None
-
-    # Fallback to OpenAI Whisper if faster-whisper isn't installed
-    if whisper is None:
-        st.error("OpenAI Whisper not installed. Please run `pip install openai-whisper`")
-        return None
-
-    try:
-        st.info(f"🎙️ Transcribing with OpenAI Whisper ({model_size})...")
-        model = whisper.load_model(model_size)
-        result = model.transcribe(audio_file)
-        return {"text": result.get("text", "").strip(), "language": result.get("language")}
-    except Exception as e:
-        st.error(f"Transcription Failed: {e}")
         return None
 
 # --- 🧠 GEMINI SKILL EXTRACTION ---
-def extract_skills_gemini(frames):
-    """Extract technical skills/actions from video frames using Gemini Flash Latest."""
+def extract_skills_gemini(frames=None, video_path=None):
+    """
+    Extract technical skills/actions using Gemini Flash Latest: from the whole video when a local
+    file is available (reusing its cached Gemini upload), otherwise from timeline frames.
+    """
     try:
         # Use gemini-flash-latest for stable access
         model = genai.GenerativeModel('gemini-flash-latest')
-        
-        # Convert base64 frames to PIL Images for Gemini
-        images = []
-        for f in frames[:10]: # Limit to 10 frames for cost/speed
-            img_data = base64.b64decode(f)
-            images.append(Image.open(io.BytesIO(img_data)))
+        frames = list((frames or [])[:10]) # Limit to 10 frames for cost/speed
         
         prompt = """
         You are a Technical Skill Analyst. Analyze this sequence of frames from a video.
@@ -225,9 +134,18 @@ def extract_skills_gemini(frames):
         
         Format the output clearly as a step-by-step technical guide.
         """
-        
-        response = model.generate_content([prompt] + images)
-        return response.text
+
+        if video_path:
+            video_hash = get_gemini_file_cache().video_hash(video_path)
+            return cached_call(lambda: model.generate_content([get_video_file(video_path), prompt]).text,
+                               model="gemini-flash-latest", template="skills_from_video", inputs=[prompt, video_hash])
+
+        def generate():
+            # Convert base64 frames to PIL Images for Gemini
+            images = [Image.open(io.BytesIO(base64.b64decode(f))) for f in frames]
+            return model.generate_content([prompt] + images).text
+
+        return cached_call(generate, model="gemini-flash-latest", template="skills_from_frames", inputs=[prompt] + frames)
     except Exception as e:
         return f"Gemini Extraction failed: {e}"
 
@@ -260,12 +178,9 @@ def generate_image_pollinations(prompt):
         return None
 
 # --- 🎙️ EDUCATIONAL PODCAST GENERATOR (NotebookLM-Style) ---
-def generate_educational_podcast(transcript_text, analysis_text, openai_client):
+def generate_educational_podcast(transcript_text, analysis_text, openai_client, workspace=None):
     """Generates a 3-minute dual-speaker educational podcast using GPT + OpenAI TTS."""
     try:
-        from pydub import AudioSegment
-        import tempfile
-
         # Step 1: Generate the dialogue script (topic + skills focus)
         script_prompt = f"""
 You are a podcast script writer for a super chill, conversational deep-dive podcast — think two friends who really know their stuff just riffing and teaching each other.
@@ -309,11 +224,12 @@ SKILL/TOPIC CONTEXT: {analysis_text[:800]}
 
         # Step 2: Parse lines and generate TTS per speaker
         lines = [l.strip() for l in script.split('\n') if l.strip() and ':' in l]
-        base_dir = "/Users/jaydengle/Transcribe-Reels"
-        clips = []
-        silence = AudioSegment.silent(duration=500)  # natural pause between turns
-
-        for i, line in enumerate(lines):
+        if workspace is None:
+            workspace = JobWorkspace(prefix="podcast_")
+            workspace.detach()  # the returned mp3 lives here
+        base_dir = workspace.path
+        turns = []
+        for line in lines:
             if line.startswith("HOST:"):
                 voice = "nova"   # warm, natural female voice
                 text = line[5:].strip()
@@ -322,33 +238,30 @@ SKILL/TOPIC CONTEXT: {analysis_text[:800]}
                 text = line[7:].strip()
             else:
                 continue
-            if not text:
-                continue
+            if text:
+                turns.append((voice, text))
 
-            tts_resp = openai_client.audio.speech.create(
+        if not turns:
+            return None
+
+        # Raw PCM keeps every clip in memory with no per-clip mp3 decode
+        def synthesize(turn):
+            voice, text = turn
+            tts_resp = call_with_retry(
+                openai_client.audio.speech.create,
+                provider="openai",
                 model="tts-1-hd",  # higher quality, more natural
                 voice=voice,
-                input=text
+                input=text,
+                response_format="pcm"
             )
-            tmp_path = os.path.join(base_dir, f"_tmp_clip_{i}.mp3")
-            tts_resp.stream_to_file(tmp_path)
-            clips.append(AudioSegment.from_mp3(tmp_path) + silence)
+            return tts_resp.content
 
-        if not clips:
-            return None
-
-        # Step 3: Stitch and save
-        podcast = clips[0]
-        for c in clips[1:]:
-            podcast += c
+        clips = map_ordered(synthesize, turns, provider="openai")
 
+        # Step 3: Stitch (one join, 500ms natural pause between turns) and encode once
         out_path = os.path.join(base_dir, "educational_podcast.mp3")
-        podcast.export(out_path, format="mp3")
-
-        # Cleanup temp clips
-        for i in range(len(lines)):
-            p = os.path.join(base_dir, f"_tmp_clip_{i}.mp3")
-            if os.path.exists(p): os.remove(p)
+        export_pcm(join_pcm(clips, gap_ms=500), out_path, format="mp3")
 
         return out_path
     except Exception as e:
@@ -357,7 +270,9 @@ SKILL/TOPIC CONTEXT: {analysis_text[:800]}
 def reverse_engineer_image(image_bytes, openai_client):
     """Sends an image to GPT-4o Vision to identify the tool/technique and provide replication steps."""
     try:
-        b64 = base64.b64encode(image_bytes).decode('utf-8')
+        # Screenshots can be multi-MB PNGs: recompress, keeping up to GPT-4o's 2048px so small text stays legible
+        screenshot_encoding = VISION_ENCODING._replace(max_edge=2048)
+        b64 = to_base64(encode_image(np.asarray(Image.open(io.BytesIO(image_bytes)).convert("RGB")), screenshot_encoding))
         prompt_content = [
             {
                 "type": "text",
@@ -385,14 +300,9 @@ Free / Paid / Freemium — specify pricing tier if known.
 ## 🔍 GitHub Search Terms
 Provide 2-3 search terms to find related repos on GitHub (e.g. 'kling-ai comfyui workflow')."""
             },
-            {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{b64}"}}
+            image_part(b64, screenshot_encoding)
         ]
-        resp = openai_client.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "user", "content": prompt_content}],
-            max_tokens=800
-        )
-        return resp.choices[0].message.content
+        return cached_chat(openai_client, "gpt-4o", [{"role": "user", "content": prompt_content}], template="reverse_engineer", max_tokens=800)
     except Exception as e:
         return f"ERROR: {e}"
 
@@ -400,12 +310,8 @@ Provide 2-3 search terms to find related repos on GitHub (e.g. 'kling-ai comfyui
 def search_github_for_skill(query):
     """Searches GitHub for repos related to a tool/skill and returns the top results."""
     try:
-        url = f"https://api.github.com/search/repositories?q={requests.utils.quote(query)}&sort=stars&order=desc&per_page=6"
-        headers = {"Accept": "application/vnd.github.v3+json", "User-Agent": "ViralEngine/1.0"}
-        resp = requests.get(url, headers=headers, timeout=10)
-        if resp.status_code != 200:
-            return []
-        items = resp.json().get('items', [])
+        # Pooled keep-alive client; 403/422 come back as ProviderError and land in the except below
+        items = run_provider(get_client(GITHUB).search_repositories(query, per_page=6))
         return [{
             "name": r["full_name"],
             "description": r.get("description", "No description"),
@@ -417,14 +323,11 @@ def search_github_for_skill(query):
         return []
 
 # --- 🎥 KLING AI STORYBOARD GENERATOR (Scene Detection + Dense 2s Sampling) ---
-def generate_kling_storyboard(video_path, openai_client):
+def generate_kling_storyboard(video_path, openai_client, max_in_flight=None):
     """Analyzes video using PySceneDetect (real shot boundaries) + dense 2s sampling for maximum accuracy."""
     try:
-        from moviepy import VideoFileClip
-
-        base_dir = "/Users/jaydengle/Transcribe-Reels"
-        clip = VideoFileClip(video_path)
-        duration = clip.duration
+        sampler = get_frame_sampler(video_path)
+        duration = sampler.duration
 
         # ── METHOD 1: PySceneDetect — find real shot/cut boundaries ──
         scene_timestamps = []
@@ -444,38 +347,22 @@ def generate_kling_storyboard(video_path, openai_client):
             st.warning(f"⚠️ Scene detection skipped (using time sampling): {sd_e}")
             scene_timestamps = []  # fallback to dense sampling below
 
-        # ── METHOD 2: Dense 2-second sampling (catches subtle changes) ──
-        dense_timestamps = list(range(0, int(duration), 2))
-
-        # ── MERGE: combine both, deduplicate, sort ──
-        all_ts = sorted(set(int(t) for t in scene_timestamps + dense_timestamps))
-        # Cap at 24 frames to keep cost manageable
-        if len(all_ts) > 24:
-            # Smart downsample: keep scene boundaries + spread the rest
-            scene_set = set(int(t) for t in scene_timestamps)
-            kept = list(scene_set)
-            remaining = [t for t in all_ts if t not in scene_set]
-            step = max(1, len(remaining) // (24 - len(kept)))
-            kept += remaining[::step]
-            all_ts = sorted(set(kept))[:24]
-
-        # ── EXTRACT FRAMES ──
-        shots = []
-        for t in all_ts:
-            if t >= duration: continue
-            frame_path = os.path.join(base_dir, f"_kling_frame_{t}.jpg")
-            clip.save_frame(frame_path, t=t)
-            with open(frame_path, "rb") as f:
-                b64 = base64.b64encode(f.read()).decode('utf-8')
-            shots.append({"t": t, "path": frame_path, "b64": b64})
-        clip.close()
-
-        # ── GPT-4o VISION: write Kling prompt per shot ──
-        storyboard = []
-        for i, shot in enumerate(shots):
-            next_t = shots[i+1]["t"] if i+1 < len(shots) else int(duration)
-            duration_s = max(1, next_t - shot["t"])
-            is_cut = shot["t"] in [int(t) for t in scene_timestamps]
+        # ── METHOD 2: Dense 0.5s candidates scored by perceptual change (catches subtle changes) ──
+        # Scene cuts are kept first; near-duplicate frames are dropped and the rest ranked by how
+        # much they add, capped at 24 frames and the vision token budget
+        all_ts = sampler.select(24, token_budget=VISION_TOKEN_BUDGET, include=scene_timestamps, step=0.5)
+
+        # ── EXTRACT FRAMES ── (shared sampler: one forward pass, nothing written to disk)
+        shots = sampler.frames([t for t in all_ts if t < duration])
+
+        # ── GPT-4o VISION: write Kling prompt per shot (fanned out in parallel) ──
+        cut_set = set(round(t, 2) for t in scene_timestamps)
+
+        def write_shot_prompt(i):
+            shot = shots[i]
+            next_t = shots[i+1]["t"] if i+1 < len(shots) else duration
+            duration_s = max(1, round(next_t - shot["t"]))
+            is_cut = shot["t"] in cut_set
 
             prompt_content = [
                 {
@@ -496,27 +383,28 @@ Film language to use:
 
 Output ONLY the prompt text. No labels, no explanation."""
                 },
-                {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{shot['b64']}"}}
+                image_part(shot)
             ]
-            resp = openai_client.chat.completions.create(
+            messages = [{"role": "user", "content": prompt_content}]
+            record_payload("storyboard_shot", messages)
+            resp = call_with_retry(
+                openai_client.chat.completions.create,
+                provider="openai",
                 model="gpt-4o",
-                messages=[{"role": "user", "content": prompt_content}],
+                messages=messages,
                 max_tokens=220
             )
             kling_prompt = resp.choices[0].message.content.strip()
-            storyboard.append({
+            return {
                 "shot": i + 1,
                 "timestamp": shot["t"],
                 "duration": min(duration_s, 10),
                 "prompt": kling_prompt,
                 "is_scene_cut": is_cut
-            })
+            }
 
-        # Cleanup temp frames
-        for shot in shots:
-            if os.path.exists(shot["path"]): os.remove(shot["path"])
-
-        return storyboard
+        # Results come back in shot order regardless of which call finishes first
+        return map_ordered(write_shot_prompt, range(len(shots)), max_workers=max_in_flight, provider="openai")
     except Exception as e:
         return f"ERROR: {e}"
 
@@ -527,20 +415,10 @@ def generate_kling_storyboard_gemini(video_path):
     Bypasses local frame extraction and GPT-4o costs.
     """
     try:
-        import time
-        
-        # 1. Upload Video to Gemini File API
-        print(f"Uploading {video_path} to Gemini...")
-        video_file = genai.upload_file(path=video_path)
-        
-        # 2. Wait for processing
-        while video_file.state.name == "PROCESSING":
-            time.sleep(2)
-            video_file = genai.get_file(video_file.name)
-            
-        if video_file.state.name == "FAILED":
-            raise ValueError("Gemini Video Processing Failed")
-            
+        # 1-2. Uploaded once per video (by content hash) and reused until near expiry;
+        # the app starts the upload with start_gemini_task, so the handle is usually ready here
+        video_file = get_video_file(video_path)
+
         # 3. Prompt for JSON Storyboard
         # Use gemini-flash-latest alias for best availability
         model = genai.GenerativeModel('gemini-flash-latest')
@@ -581,42 +459,55 @@ def generate_kling_storyboard_gemini(video_path):
         return str(e)
 
 # --- 📚 VIDEO-TO-PDF HOW-TO GUIDE ---
-def generate_how_to_pdf(video_path, transcript_text, openai_client):
+def generate_how_to_pdf(video_path, transcript_text, openai_client, workspace=None):
     """Reads each video frame section with GPT-4o Vision and builds a step-by-step PDF how-to guide."""
     try:
         from fpdf import FPDF
-        from moviepy import VideoFileClip
 
-        base_dir = "/Users/jaydengle/Transcribe-Reels"
-        clip = VideoFileClip(video_path)
-        duration = clip.duration
+        if workspace is None:
+            workspace = JobWorkspace(prefix="pdf_")
+            workspace.detach()  # the returned PDF lives here
+        base_dir = workspace.path
+        sampler = get_frame_sampler(video_path)
+        duration = sampler.duration
         
-        # Extract frames every 4 seconds (max 20 sections)
-        interval = max(4, int(duration / 15))
-        frame_data = []
-        
-        for t in range(0, int(duration), interval):
-            if len(frame_data) >= 18: break
-            frame_path = os.path.join(base_dir, f"_pdf_frame_{t}.jpg")
-            clip.save_frame(frame_path, t=t)
-            with open(frame_path, "rb") as f:
-                b64 = base64.b64encode(f.read()).decode('utf-8')
-            frame_data.append({"t": t, "path": frame_path, "b64": b64})
-        clip.close()
-
-        # Send all frames to GPT-4o Vision for per-section analysis
-        step_descriptions = []
-        for i, fd in enumerate(frame_data):
+        # Up to 18 sections at the most distinct moments (one per step, not one per 4s), kept in memory as JPEG bytes
+        frame_data = sampler.frames(sampler.select(18, token_budget=VISION_TOKEN_BUDGET))
+
+        # Per-section GPT-4o Vision analysis
+        def describe_section(i):
+            fd = frame_data[i]
             prompt_content = [
                 {"type": "text", "text": f"You are creating a step-by-step how-to guide. This is frame {i+1} at timestamp {fd['t']}s of the video.\n\nDescribe EXACTLY what is happening here as a practical guide step. Be specific about:\n- What action is being performed\n- Body position, technique, or tool being used\n- Key detail a beginner would need to know\n\nFormat: Start with 'Step {i+1}:' then 2-3 sentences max.\n\nVideo transcript context: {transcript_text[:300]}"},
-                {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{fd['b64']}"}}
+                image_part(fd)
             ]
-            resp = openai_client.chat.completions.create(
+            messages = [{"role": "user", "content": prompt_content}]
+            record_payload("pdf_section", messages)
+            resp = call_with_retry(
+                openai_client.chat.completions.create,
+                provider="openai",
                 model="gpt-4o",
-                messages=[{"role": "user", "content": prompt_content}],
+                messages=messages,
                 max_tokens=150
             )
-            step_descriptions.append(resp.choices[0].message.content.strip())
+            return resp.choices[0].message.content.strip()
+
+        # Pro tips only need the transcript, so they don't wait for the sections
+        def write_pro_tips():
+            tips_prompt = f"Based on this video transcript, write 5 concise pro tips a beginner should know. Transcript: {transcript_text[:600]}"
+            tips_resp = call_with_retry(
+                openai_client.chat.completions.create,
+                provider="openai",
+                model="gpt-4o",
+                messages=[{"role": "user", "content": tips_prompt}],
+                max_tokens=300
+            )
+            return tips_resp.choices[0].message.content
+
+        # Dispatch every section call plus the tips call at once; results come back in order
+        tasks = [lambda i=i: describe_section(i) for i in range(len(frame_data))] + [write_pro_tips]
+        results = map_ordered(lambda task: task(), tasks, provider="openai")
+        step_descriptions, pro_tips = results[:-1], results[-1]
 
         # Build the PDF
         pdf = FPDF()
@@ -664,7 +555,7 @@ def generate_how_to_pdf(video_path, transcript_text, openai_client):
             
             # Embed frame
             try:
-                pdf.image(fd["path"], x=img_x, y=img_y, w=img_w, h=img_h)
+                pdf.image(io.BytesIO(fd["data"]), x=img_x, y=img_y, w=img_w, h=img_h)
             except: pass
 
             # Step text
@@ -688,63 +579,189 @@ def generate_how_to_pdf(video_path, transcript_text, openai_client):
         pdf.cell(0, 10, "Pro Tips & Summary", ln=True)
         pdf.set_font("Helvetica", "", 10)
         pdf.set_text_color(50, 50, 50)
-        tips_prompt = f"Based on this video transcript, write 5 concise pro tips a beginner should know. Transcript: {transcript_text[:600]}"
-        tips_resp = openai_client.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "user", "content": tips_prompt}],
-            max_tokens=300
-        )
-        pdf.multi_cell(0, 7, tips_resp.choices[0].message.content)
+        pdf.multi_cell(0, 7, pro_tips)
 
         # Save PDF
         out_path = os.path.join(base_dir, "how_to_guide.pdf")
         pdf.output(out_path)
 
-        # Cleanup frames
-        for fd in frame_data:
-            if os.path.exists(fd["path"]): os.remove(fd["path"])
-
         return out_path
     except Exception as e:
         return f"ERROR: {e}"
 
-# Function to transcribe utilizing AssemblyAI (API)
-def transcribe_with_assemblyai(audio_file):
-    transcriber = aai.Transcriber()
-    config = aai.TranscriptionConfig(
-        speaker_labels=True,
-        speech_models=["universal-2"],
-        language_detection=True
-    )
-    with open(audio_file, "rb") as f:
-        transcript = transcriber.transcribe(f, config)
-    return transcript
-
 # NEW: Detailed Visual Timeline Extractor
-def generate_visual_timeline(video_path, interval=3):
-    clip = VideoFileClip(video_path)
-    duration = clip.duration
-    frames_base64 = []
-    timestamps = []
+def generate_visual_timeline(video_path, interval=3, max_frames=20, encoding=LOW_DETAIL_ENCODING):
+    sampler = get_frame_sampler(video_path)
     
-    # Extract frame every 'interval' seconds
-    for t in range(0, int(duration), interval):
-        if t > 60: break # Limit to first 60s to save tokens/time for now
-        
-        frame_path = f"temp_timeline_{t}.jpg"
-        clip.save_frame(frame_path, t=t)
-        
-        with open(frame_path, "rb") as image_file:
-            encoded_string = base64.b64encode(image_file.read()).decode('utf-8')
-            frames_base64.append(encoded_string)
-            timestamps.append(t)
-        
-        if os.path.exists(frame_path): os.remove(frame_path)
-            
-    clip.close()
-    return frames_base64, timestamps
+    # About one frame per 'interval' seconds, spent on the moments that change most (shot-aware, within the token budget)
+    k = min(max_frames, max(1, math.ceil(sampler.duration / interval)))
+    # Low detail by default: many frames read together for the story flow, 85 tokens each
+    timestamps = sampler.select(k, token_budget=VISION_TOKEN_BUDGET, encoding=encoding)
+    return sampler.frames(timestamps, encoding), timestamps
+
+# --- 🧠 SEMANTIC SEARCH ---
+@st.cache_data(ttl=300, show_spinner=False)
+def search_reels_cached(query, k=8):
+    """find_reels, cached per query: the sidebar reruns constantly and each search is an embeddings call. Errors are not cached."""
+    return find_reels(query, k=k)
+
+# --- 🧵 BACKGROUND INGEST STATUS ---
+INGEST_STAGES = {
+    "download": ("📥", "Downloading video from server..."),
+    "audio": ("🔍", "Extracting audio track..."),
+    "transcribe": ("🎙️", "Running AI transcription model..."),
+    "save": ("💾", "Saving to database..."),
+}
+
+def render_ingest_jobs():
+    """Polls this session's queued ingest jobs; a finished job opens as the preview source."""
+    job_ids = st.session_state.get('ingest_jobs', [])
+    if not job_ids:
+        return
+    queue = get_job_queue()
+    for job_id in list(job_ids):
+        job = queue.get(job_id)
+        if not job:
+            job_ids.remove(job_id)
+            continue
+        if job['status'] == DONE:
+            job_ids.remove(job_id)
+            result = job['result']
+            st.session_state['preview_source'] = {
+                'url': result['url'], 'text': result['text'], 'metadata': result['metadata'],
+                'title': "New Source", 'category': "Inbox", 'summary': ""
+            }
+            st.toast("✅ Source added successfully!", icon="✅")
+            st.balloons()
+            st.rerun()
+        elif job['status'] == FAILED:
+            st.markdown(f"""
+            <div class="progress-status-card" style="border-color: #EA4335;">
+                <div style="font-size: 18px; font-weight: 600; color: #EA4335;">Failed to Load Source</div>
+                <div style="color: #9AA0A6; margin-top: 8px;">{job.get('error') or 'Please check the URL and try again'}</div>
+            </div>
+            """, unsafe_allow_html=True)
+            if st.button("Dismiss", key=f"dismiss_{job_id}"):
+                job_ids.remove(job_id)
+                st.rerun()
+        else:
+            icon, label = INGEST_STAGES.get(job['stage'], ("⏳", "Queued..."))
+            st.markdown(f"""
+            <div class="progress-step active">
+                <span style="font-size: 18px; margin-right: 12px;">{icon}</span>
+                <span><strong>{label}</strong></span>
+            </div>
+            """, unsafe_allow_html=True)
+            st.progress(job['progress'] or 0.0)
+            # Live partial transcript streamed by the worker
+            segments = load_segments(ingest_segments_path(job_id)) if job['stage'] == "transcribe" else []
+            if segments:
+                st.caption("…" + " ".join(s['text'] for s in segments[-6:]))
+
+def render_ingest_batches():
+    """Aggregate progress, throughput and per-item status for this session's batches."""
+    for batch_id in list(st.session_state.get('ingest_batches', [])):
+        status = batch_status(batch_id)
+        counts = status['counts']
+        st.progress(status['finished'] / max(status['total'], 1))
+        st.caption(
+            f"📚 {status['finished']}/{status['total']} · ✅ {counts[DONE]} · ❌ {counts[FAILED]} · "
+            f"⏳ {counts[RUNNING]} running · {status['items_per_min']:.1f}/min · {status['realtime_factor']:.1f}x realtime"
+        )
+        with st.expander("Batch items", expanded=False):
+            for item in status['items']:
+                icon = {DONE: "✅", FAILED: "❌"}.get(item['status']) or INGEST_STAGES.get(item['stage'], ("⏳",))[0]
+                st.caption(f"{icon} {item['url']}" + (f" — {item['error']}" if item['error'] else ""))
+        if status['complete'] and st.button("Clear", key=f"clear_{batch_id}"):
+            st.session_state['ingest_batches'].remove(batch_id)
+            st.rerun()
+
+# Re-poll every 2s without rerunning the whole script (st.fragment, Streamlit >= 1.37 as pinned in requirements.txt)
+if hasattr(st, "fragment"):
+    render_ingest_jobs = st.fragment(run_every=2)(render_ingest_jobs)
+    render_ingest_batches = st.fragment(run_every=2)(render_ingest_batches)
+
+# --- 🗄️ GENERATED ARTIFACTS (persisted per source) ---
+artifact_store = get_artifact_store()
+
+# session_state key -> artifact type
+SESSION_ARTIFACTS = {
+    'viral_analysis': VIRAL_ANALYSIS,
+    'viral_map': MIND_MAP,
+    'visual_deep_dive': VISUAL_DEEP_DIVE,
+    'visual_timeline': VISUAL_TIMELINE,
+    'recreation_script': RECREATION_SCRIPT,
+    'campaign_result': CAMPAIGN,
+    'kling_storyboard': STORYBOARD,
+}
+
+def restore_artifacts(source):
+    """When the active source changes, swap in the outputs previously generated for it."""
+    key = source_key(source)
+    if st.session_state.get('artifact_source') == key:
+        return
+    st.session_state['artifact_source'] = key
+    for state_key, kind in SESSION_ARTIFACTS.items():
+        value = artifact_store.load(key, kind)
+        if value is None:
+            st.session_state.pop(state_key, None)
+        else:
+            st.session_state[state_key] = value
+
+def save_artifact(source, state_key, value):
+    """Show `value` now and keep it for the next time this source is opened."""
+    st.session_state[state_key] = value
+    kind = SESSION_ARTIFACTS[state_key]
+    if isinstance(value, str):
+        artifact_store.put_text(source_key(source), kind, value, ext=".dot" if kind == MIND_MAP else ".md")
+    else:
+        artifact_store.put_json(source_key(source), kind, value)
+
+# --- ⏳ GEMINI UPLOADS (polled, never awaited on the script thread) ---
+def start_gemini_task(task, video_path, source=None):
+    """Start the video's Gemini upload in the background; `render_gemini_task` runs `task` once the file is ACTIVE."""
+    prefetch_video_file(video_path, retry=True)
+    st.session_state.setdefault('gemini_tasks', {})[task] = {'video_path': video_path, 'source': source}
+
+def _run_gemini_task(task, video_path, source):
+    """Prompt Gemini with the (now ACTIVE) upload; returns an error message or None."""
+    if task == 'kling_storyboard':
+        with st.spinner("🎥 Analyzing video structure..."):
+            result = generate_kling_storyboard_gemini(video_path)
+        if not isinstance(result, list):
+            return f"Analysis Failed: {result}"
+        save_artifact(source, 'kling_storyboard', result)
+        st.toast(f"🎥 Storyboard ready — {len(result)} shots!")
+    elif task == 'extracted_skills':
+        with st.spinner("Gemini analyzing skills..."):
+            st.session_state['extracted_skills'] = extract_skills_gemini(video_path=video_path)
+    return None
 
-# Initialize OpenAI
+def render_gemini_task(task):
+    """Shows the state of a pending Gemini upload; runs its prompt once processing has finished."""
+    tasks = st.session_state.get('gemini_tasks', {})
+    pending = tasks.get(task)
+    if not pending:
+        return
+    future = prefetch_video_file(pending['video_path'])
+    if not future.done():
+        st.caption("⏳ Uploading video to Gemini and waiting for it to be processed...")
+        return
+    if 'error' not in pending:
+        if future.exception() is not None:
+            pending['error'] = f"Gemini upload failed: {future.exception()}"
+        else:
+            pending['error'] = _run_gemini_task(task, pending['video_path'], pending['source'])
+        if not pending['error']:
+            del tasks[task]
+            st.rerun()
+    st.error(pending['error'])
+    if st.button("Dismiss", key=f"dismiss_gemini_{task}"):
+        del tasks[task]
+        st.rerun()
+
+if hasattr(st, "fragment"):
+    render_gemini_task = st.fragment(run_every=2)(render_gemini_task)
 
 # Initialize OpenAI
 openai_api_key = os.getenv("OPENAI_API_KEY")
@@ -1018,8 +1035,17 @@ st.markdown("""
 st.sidebar.header("SYSTEM CONFIG")
 transcription_engine = st.sidebar.selectbox("ENGINE CORE", ["OpenAI Whisper (Local - Better Quality)", "AssemblyAI (Cloud)"])
 model_size = "base"
+transcription_profile = None
 if transcription_engine == "OpenAI Whisper (Local - Better Quality)":
-    model_size = st.sidebar.selectbox("MODEL SIZE", ["tiny", "base", "small", "medium", "large"], index=2)
+    transcription_profile = st.sidebar.selectbox("PROFILE", PROFILE_CHOICES, index=PROFILE_CHOICES.index(DEFAULT_PROFILE), format_func=str.upper,
+                                                 help="AUTO picks realtime/balanced/accurate per reel from its length, speech and the queue")
+    if transcription_profile == CUSTOM:
+        model_size = st.sidebar.selectbox("MODEL SIZE", ["tiny", "base", "small", "medium", "large"], index=2)
+llm_stats = get_llm_cache().stats()
+st.sidebar.caption(f"LLM CACHE: {llm_stats['hits']} hits / {llm_stats['misses']} misses ({llm_stats['hit_rate']:.0%}) · {llm_stats['entries']} saved")
+vision_stats = payload_stats()
+if vision_stats['requests']:
+    st.sidebar.caption(f"VISION PAYLOAD: {vision_stats['images']} images in {vision_stats['requests']} requests · {vision_stats['bytes_per_request'] / 1024:.0f} KB/request")
 
 # --- LEFT: NOTEBOOKLM SOURCE PANEL (Refined) ---
 with st.sidebar:
@@ -1037,103 +1063,28 @@ with st.sidebar:
         url = st.text_input("URL", placeholder="Paste Link...", label_visibility="collapsed")
         if st.button("➕ Add Source", use_container_width=True):
              if url:
-                # Enhanced Progress Tracking
+                # Ingestion runs on the background workers; this run only enqueues the job
                 if 'preview_reel' in st.session_state: del st.session_state['preview_reel']
-
-                # Create progress container
-                progress_container = st.container()
-                with progress_container:
-                    st.markdown("""
-                    <div class="progress-status-card">
-                        <div style="font-size: 20px; margin-bottom: 16px;">🚀 Processing Your Video</div>
-                        <div style="color: #9AA0A6; font-size: 14px;">This usually takes 30-60 seconds</div>
-                    </div>
-                    """, unsafe_allow_html=True)
-
-                    progress_bar = st.progress(0)
-                    status_text = st.empty()
-
-                    # Step 1: Download
-                    status_text.markdown("""
-                    <div class="progress-step active">
-                        <span style="font-size: 18px; margin-right: 12px;">📥</span>
-                        <span><strong>Downloading video from server...</strong></span>
-                    </div>
-                    """, unsafe_allow_html=True)
-                    progress_bar.progress(10)
-
-                    reel_data = download_reel(url)
-
-                    if reel_data:
-                        progress_bar.progress(30)
-                        video_path = reel_data["video_path"]
-
-                        # Step 2: Extract Audio
-                        status_text.markdown("""
-                        <div class="progress-step active">
-                            <span style="font-size: 18px; margin-right: 12px;">🔍</span>
-                            <span><strong>Extracting audio track...</strong></span>
-                        </div>
-                        """, unsafe_allow_html=True)
-                        progress_bar.progress(40)
-
-                        audio_file = convert_video_to_audio(video_path)
-
-                        # Step 3: Transcribe
-                        status_text.markdown("""
-                        <div class="progress-step active">
-                            <span style="font-size: 18px; margin-right: 12px;">🎙️</span>
-                            <span><strong>Running AI transcription model...</strong></span>
-                        </div>
-                        """, unsafe_allow_html=True)
-                        progress_bar.progress(50)
-
-                        if transcription_engine == "OpenAI Whisper (Local - Better Quality)":
-                            result = transcribe_with_whisper(audio_file, model_size)
-                            transcript_text = result["text"] if result else ""
-                        else:
-                            result = transcribe_with_assemblyai(audio_file)
-                            transcript_text = result.text if result else ""
-
-                        progress_bar.progress(90)
-
-                        # Step 4: Complete
-                        status_text.markdown("""
-                        <div class="progress-step complete">
-                            <span style="font-size: 18px; margin-right: 12px;">✅</span>
-                            <span><strong>Complete! Saving to database...</strong></span>
-                        </div>
-                        """, unsafe_allow_html=True)
-                        progress_bar.progress(100)
-
-                        # Simple Auto-Title
-                        st.session_state['preview_source'] = {
-                            'url': url, 'text': transcript_text, 'metadata': reel_data,
-                            'title': "New Source", 'category': "Inbox", 'summary': ""
-                        }
-                        db_manager.save_transcript(url, transcript_text, metadata=reel_data)
-
-                        # Success message
-                        st.markdown("""
-                        <div class="progress-status-card" style="border-color: #34A853;">
-                            <div style="font-size: 48px; margin-bottom: 12px;">🎉</div>
-                            <div style="font-size: 18px; font-weight: 600; color: #34A853;">Source Added Successfully!</div>
-                        </div>
-                        """, unsafe_allow_html=True)
-
-                        st.toast("✅ Source added successfully!", icon="✅")
-                        st.balloons()
-                        st.rerun()
-                    else:
-                        progress_bar.progress(0)
-                        st.markdown("""
-                        <div class="progress-status-card" style="border-color: #EA4335;">
-                            <div style="font-size: 48px; margin-bottom: 12px;">❌</div>
-                            <div style="font-size: 18px; font-weight: 600; color: #EA4335;">Failed to Load Source</div>
-                            <div style="color: #9AA0A6; margin-top: 8px;">Please check the URL and try again</div>
-                        </div>
-                        """, unsafe_allow_html=True)
-                        st.toast("❌ Failed to download video", icon="❌")
+                engine = WHISPER if transcription_engine == "OpenAI Whisper (Local - Better Quality)" else ASSEMBLYAI
+                job_id = enqueue_ingest(url, engine=engine, model_size=model_size, profile=transcription_profile)
+                st.session_state.setdefault('ingest_jobs', []).append(job_id)
+                st.toast("🚀 Queued — processing in the background.", icon="🚀")
+
+        render_ingest_jobs()
+
+        with st.expander("📚 Batch Add"):
+            batch_text = st.text_area("URLs", placeholder="One link per line...", label_visibility="collapsed")
+            batch_file = st.file_uploader("Or upload a .txt / .csv of links", type=["txt", "csv"])
+            if st.button("Queue Batch", use_container_width=True):
+                urls = parse_urls(batch_text) + (parse_urls(batch_file.getvalue().decode("utf-8", "ignore")) if batch_file else [])
+                if urls:
+                    engine = WHISPER if transcription_engine == "OpenAI Whisper (Local - Better Quality)" else ASSEMBLYAI
+                    submitted = enqueue_batch(urls, engine=engine, model_size=model_size, profile=transcription_profile)
+                    st.session_state.setdefault('ingest_batches', []).append(submitted['batch_id'])
+                    st.toast(f"🚀 {len(submitted['job_ids'])} queued, {len(submitted['duplicates'])} duplicates skipped.")
+                else:
+                    st.warning("No links found.")
+            render_ingest_batches()
 
     st.markdown("---")
     
@@ -1142,33 +1093,70 @@ with st.sidebar:
     
     st.caption("Select all sources")
     
-    # Source List
-    all_sources = db_manager.get_all_transcripts()
-    if not all_sources:
-        st.info("No sources yet.")
+    # Source List — one page of titles per rerun; the full row is only fetched for the open source
+    SOURCES_PAGE_SIZE = 25
+    if st.session_state.get('source_search') != search_q:
+        st.session_state['source_search'] = search_q
+        st.session_state['source_pages'] = [None]  # keyset cursor of every page visited so far
+    pages = st.session_state.setdefault('source_pages', [None])
+    if search_q and search_index.count():
+        # Ranked full-text hits (BM25) with highlighted snippets from the local index
+        hits = search_index.search(search_q, limit=SOURCES_PAGE_SIZE)
+        page_sources, next_cursor = [h for h in hits if h['id']], None
+    else:
+        page_sources, next_cursor = db_manager.list_transcripts(limit=SOURCES_PAGE_SIZE, cursor=pages[-1], search=search_q or None)
+    if not page_sources and len(pages) == 1:
+        st.info("No matching sources." if search_q else "No sources yet.")
         selected_source = None
     else:
-        # Filter by search
-        filtered_sources = [s for s in all_sources if search_q.lower() in s.get('metadata', {}).get('title', s['url']).lower()] if search_q else all_sources
-        
         # Auto-select the most recent source if none selected
-        if not st.session_state.get('selected_source_id') and filtered_sources:
-            st.session_state['selected_source_id'] = filtered_sources[0]['id']
+        if not st.session_state.get('selected_source_id') and page_sources:
+            st.session_state['selected_source_id'] = page_sources[0]['id']
 
-        for s in filtered_sources:
-            title = s.get('metadata', {}).get('title', s['url'][:20])
-            is_active = (st.session_state.get('selected_source_id') == s['id'])
+        for s in page_sources:
+            title = s.get('title') or s['url'][:20]
+            is_active = (str(st.session_state.get('selected_source_id')) == str(s['id']))
             
             # Simple button row
             if st.button(f"📄 {title}", key=f"src_{s['id']}", use_container_width=True, type="primary" if is_active else "secondary"):
                 st.session_state['selected_source_id'] = s['id']
                 st.rerun()
+            if s.get('snippet'):
+                st.caption(highlight(s['snippet']))
+
+        p_prev, p_label, p_next = st.columns([1, 2, 1])
+        if len(pages) > 1 and p_prev.button("◀", key="src_prev"):
+            pages.pop()
+            st.rerun()
+        p_label.caption(f"Page {len(pages)}")
+        if next_cursor and p_next.button("▶", key="src_next"):
+            pages.append(next_cursor)
+            st.rerun()
         
         if st.session_state.get('selected_source_id'):
-            selected_source = next((s for s in all_sources if s['id'] == st.session_state['selected_source_id']), None)
+            selected_source = db_manager.get_transcript(st.session_state['selected_source_id'])
         else:
             selected_source = None
 
+    # 3. Semantic search: matches meaning, not just words
+    with st.expander("🧠 Find reels about..."):
+        about_q = st.text_input("Topic", placeholder="e.g. morning routines for founders", label_visibility="collapsed")
+        if about_q and openai_api_key:
+            try:
+                about_hits = search_reels_cached(about_q, k=8)
+            except (ProviderError, httpx.HTTPError, FuturesTimeout, TimeoutError) as e:
+                st.warning(f"Semantic search is unavailable right now: {e}")
+                about_hits = []
+            for hit in about_hits:
+                label = hit['title'] or hit['url'][:30]
+                if hit['id'] and st.button(f"🎯 {label}", key=f"about_{hit['id']}", use_container_width=True):
+                    st.session_state['selected_source_id'] = hit['id']
+                    st.rerun()
+                at = f"[{format_timestamp(hit['start'])}] " if hit['start'] is not None else ""
+                st.caption(f"{hit['score']:.2f} · {at}{hit['text'][:160]}…")
+        elif about_q:
+            st.caption("Needs OPENAI_API_KEY for embeddings.")
+
 # --- 3-PANEL LAYOUT: CENTER & RIGHT ---
 # "Studio" (Right) is narrower than Center
 col_center, col_studio = st.columns([2.5, 1])
@@ -1185,6 +1173,8 @@ with col_center: # Center Workspace (Chat/Guide)
     selected_source = active_source
 
     if selected_source:
+        restore_artifacts(selected_source)
+
         # --- ⚡ Live Intelligence Bar ---
         with st.container():
             m1, m2, m3, m4 = st.columns(4)
@@ -1225,13 +1215,10 @@ with col_center: # Center Workspace (Chat/Guide)
                  meta = selected_source.get('metadata', {})
                  media_path = meta.get('video_path') or meta.get('audio_path')
                  
-                 # Path resolution
+                 # Path resolution (cache lookup only, never downloads on render)
                  if not media_path or not os.path.exists(media_path):
-                      base_dir = "/Users/jaydengle/Transcribe-Reels"
-                      reel_dir = os.path.join(base_dir, 'reel')
-                      if os.path.exists(reel_dir):
-                          possible = [os.path.join(reel_dir, f) for f in os.listdir(reel_dir) if f.endswith(('.mp4', '.mov'))]
-                          if possible: media_path = possible[0]
+                      cached = media_cache.get(selected_source.get('url'))
+                      if cached: media_path = cached["video_path"]
                  
                  if media_path:
                      st.video(media_path)
@@ -1301,17 +1288,22 @@ with col_center: # Center Workspace (Chat/Guide)
             
             with txt_col:
                 edited_text = st.text_area("Edit Transcript", value=t_text, height=400)
+
+                t_segments = selected_source.get('metadata', {}).get('segments')
+                if t_segments:
+                    with st.expander(f"⏱️ Timestamped Segments ({len(t_segments)})"):
+                        st.markdown("  \n".join(f"`{format_timestamp(s['start'])}` {s['text']}" for s in t_segments))
             
             with aud_col:
                 st.markdown("**🎧 Audio Transcript**")
                 st.caption("Listen to the transcript read aloud")
                 
-                audio_transcript_path = "/Users/jaydengle/Transcribe-Reels/audio_transcript.mp3"
+                audio_transcript_path = artifact_store.load(source_key(selected_source), AUDIO_TRANSCRIPT)
                 
-                if os.path.exists(audio_transcript_path):
+                if audio_transcript_path:
                     st.audio(audio_transcript_path)
                     if st.button("🔄 Re-generate Audio", key="regen_audio_transcript"):
-                        os.remove(audio_transcript_path)
+                        artifact_store.delete(source_key(selected_source), AUDIO_TRANSCRIPT)
                         st.rerun()
                 else:
                     if openai_client and t_text:
@@ -1323,7 +1315,9 @@ with col_center: # Center Workspace (Chat/Guide)
                                         voice="alloy",
                                         input=t_text[:4096]  # TTS limit
                                     )
-                                    tts_resp.stream_to_file(audio_transcript_path)
+                                    with JobWorkspace(prefix="tts_") as tts_job:
+                                        tts_resp.stream_to_file(tts_job.file("audio_transcript.mp3"))
+                                        artifact_store.put_file(source_key(selected_source), AUDIO_TRANSCRIPT, tts_job.file("audio_transcript.mp3"))
                                     st.success("🎧 Audio ready!")
                                     st.rerun()
                                 except Exception as e:
@@ -1358,10 +1352,9 @@ with col_center: # Center Workspace (Chat/Guide)
 
                             {selected_source.get('text')}
                             """
-                            resp = openai_client.chat.completions.create(model="gpt-4", messages=[{"role": "system", "content": sys_prompt}, {"role": "user", "content": usr_prompt}])
+                            new_analysis = cached_chat(openai_client, "gpt-4", [{"role": "system", "content": sys_prompt}, {"role": "user", "content": usr_prompt}], template="viral_structure", refresh=True)
                             # Update Session State AND Database
-                            new_analysis = resp.choices[0].message.content
-                            st.session_state['viral_analysis'] = new_analysis
+                            save_artifact(selected_source, 'viral_analysis', new_analysis)
                             st.toast("✅ Viral analysis complete!", icon="✅")
                             # Optional: Update DB here if we had an update function
 
@@ -1376,9 +1369,9 @@ with col_center: # Center Workspace (Chat/Guide)
                              TRANSCRIPT: {selected_source.get('text')}
                              OUTPUT ONLY THE DOT CODE. BEGIN with 'digraph'.
                              """
-                             resp = openai_client.chat.completions.create(model="gpt-4", messages=[{"role": "system", "content": "You are a Graphviz Generator. Output DOT code only."}, {"role": "user", "content": dot_prompt}])
-                             dot_code = resp.choices[0].message.content.replace("```dot", "").replace("```", "").strip()
-                             st.session_state['viral_map'] = dot_code
+                             dot_raw = cached_chat(openai_client, "gpt-4", [{"role": "system", "content": "You are a Graphviz Generator. Output DOT code only."}, {"role": "user", "content": dot_prompt}], template="viral_mind_map")
+                             dot_code = dot_raw.replace("```dot", "").replace("```", "").strip()
+                             save_artifact(selected_source, 'viral_map', dot_code)
                              st.toast("✅ Mind map generated!", icon="✅")
                             
                 # B. Visual Analysis Trigger
@@ -1393,20 +1386,9 @@ with col_center: # Center Workspace (Chat/Guide)
                          if re_download: video_path = re_download["video_path"]
                     
                     if video_path and os.path.exists(video_path) and openai_client:
-                        with st.spinner("👁️ Decoding Visual Patterns (0s, 3s, 10s)..."):
+                        with st.spinner("👁️ Decoding Visual Patterns (hook + key shots)..."):
                             try:
-                                frames = analyze_visual_frames(video_path)
-                                prompt_messages = [
-                                    {
-                                        "role": "user",
-                                        "content": [
-                                            {"type": "text", "text": f"These are frames from a specific Reel (0s, 3s, 10s, End). Analyze the VISUAL HOOK. What happens in the first 3 seconds visually? How does the camera move? What text is overlayed? Explain why the VISUALS made this viral."},
-                                            *map(lambda x: {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{x}"}}, frames)
-                                        ],
-                                    }
-                                ]
-                                resp = openai_client.chat.completions.create(model="gpt-4o", messages=prompt_messages, max_tokens=600)
-                                st.session_state['visual_deep_dive'] = resp.choices[0].message.content
+                                save_artifact(selected_source, 'visual_deep_dive', analyze_visual_hook(video_path, openai_client))
                             except Exception as e:
                                 st.error(f"Visual Analysis Error: {e}")
 
@@ -1445,7 +1427,7 @@ with col_center: # Center Workspace (Chat/Guide)
                          progress_bar.progress(40)
 
                          # Analyze with GPT-4o
-                         prompt_content = [{"type": "text", "text": "Analyze this sequence of frames from a video (every 5 seconds). Describe exactly what is happening visually in each shot to explain the storytelling flow."}]
+                         prompt_content = [{"type": "text", "text": "Analyze this sequence of key frames from a video (one per visual change, timestamps given). Describe exactly what is happening visually in each shot to explain the storytelling flow."}]
 
                          # Step 3: Processing frames
                          status_text.markdown("""
@@ -1457,13 +1439,13 @@ with col_center: # Center Workspace (Chat/Guide)
                          progress_bar.progress(60)
 
                          for i, f in enumerate(frames):
-                             prompt_content.append({"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{f}"}})
+                             prompt_content.append(image_part(f))
                              prompt_content.append({"type": "text", "text": f"Frame at {stamps[i]}s"})
 
                          progress_bar.progress(80)
 
                          # Step 4: Final analysis
-                         resp = openai_client.chat.completions.create(model="gpt-4o", messages=[{"role": "user", "content": prompt_content}], max_tokens=1000)
+                         timeline_analysis = cached_chat(openai_client, "gpt-4o", [{"role": "user", "content": prompt_content}], template="visual_timeline", max_tokens=1000)
 
                          status_text.markdown("""
                          <div class="progress-step complete">
@@ -1473,11 +1455,12 @@ with col_center: # Center Workspace (Chat/Guide)
                          """, unsafe_allow_html=True)
                          progress_bar.progress(100)
 
-                         st.session_state['visual_timeline'] = {
-                             "analysis": resp.choices[0].message.content,
-                             "frames": frames,
+                         save_artifact(selected_source, 'visual_timeline', {
+                             "analysis": timeline_analysis,
+                             "frames": [f["b64"] for f in frames],
+                             "mime": frames[0]["mime"] if frames else "image/jpeg",
                              "timestamps": stamps
-                         }
+                         })
 
                          st.toast("✅ Visual timeline generated!", icon="✅")
 
@@ -1488,8 +1471,7 @@ with col_center: # Center Workspace (Chat/Guide)
                      if openai_client and 'viral_analysis' in st.session_state:
                          with st.spinner("Compiling Skill..."):
                              skill_prompt = f"Create a reusable SKILL.md instruction file based on this analysis:\n{st.session_state['viral_analysis']}"
-                             resp = openai_client.chat.completions.create(model="gpt-4", messages=[{"role": "user", "content": skill_prompt}])
-                             skill_content = resp.choices[0].message.content
+                             skill_content = cached_chat(openai_client, "gpt-4", [{"role": "user", "content": skill_prompt}], template="skill_md")
 
                              # Save file
                              safe_title = "".join(x for x in selected_source.get('metadata', {}).get('title', 'skill') if x.isalnum())
@@ -1503,8 +1485,7 @@ with col_center: # Center Workspace (Chat/Guide)
                          with st.spinner("Writing Script..."):
                              sys_prompt = "You are a Master Scriptwriter. Recreate this format for a new topic."
                              usr_prompt = f"Rewrite this video structure for a generic Personal Brand regarding 'Growth':\n{selected_source.get('text')}"
-                             resp = openai_client.chat.completions.create(model="gpt-4", messages=[{"role": "system", "content": sys_prompt}, {"role": "user", "content": usr_prompt}])
-                             st.session_state['recreation_script'] = resp.choices[0].message.content
+                             save_artifact(selected_source, 'recreation_script', cached_chat(openai_client, "gpt-4", [{"role": "system", "content": sys_prompt}, {"role": "user", "content": usr_prompt}], template="copycat_script"))
                              st.toast("✅ Copycat script generated!", icon="✅")
 
             with col2:
@@ -1537,7 +1518,7 @@ with col_center: # Center Workspace (Chat/Guide)
                     cols = st.columns(3)
                     for i, f in enumerate(frames):
                         with cols[i % 3]:
-                            st.image(f"data:image/jpeg;base64,{f}", caption=f"{stamps[i]}s", use_container_width=True)
+                            st.image(f"data:{data.get('mime', 'image/jpeg')};base64,{f}", caption=f"{stamps[i]}s", use_container_width=True)
                     st.divider()
 
                 if 'visual_deep_dive' in st.session_state:
@@ -1548,7 +1529,7 @@ with col_center: # Center Workspace (Chat/Guide)
                 # 2. Text Analysis Output (Use Stored Summary if available, or session state)
                 summary = selected_source.get('summary')
                 if summary: 
-                    st.session_state['viral_analysis'] = summary # Sync DB to Session
+                    st.session_state.setdefault('viral_analysis', summary) # Sync DB to Session (a saved re-analysis wins)
                 
                 if 'viral_analysis' in st.session_state:
                     st.info("✅ Text Structure Analysis")
@@ -1575,8 +1556,7 @@ with col_center: # Center Workspace (Chat/Guide)
                         with st.spinner(f"Engineering Campaign..."):
                              sys_prom = "You are a World-Class Marketing Strategist."
                              usr_prom = f"Take the VIRAL STRUCTURE of this transcript: '{selected_source.get('text')}' and create a 3-video mini-campaign for '{product_name}' (Hook, Value, Offer)."
-                             resp = openai_client.chat.completions.create(model="gpt-4", messages=[{"role": "system", "content": sys_prom}, {"role": "user", "content": usr_prom}])
-                             st.session_state['campaign_result'] = resp.choices[0].message.content
+                             save_artifact(selected_source, 'campaign_result', cached_chat(openai_client, "gpt-4", [{"role": "system", "content": sys_prom}, {"role": "user", "content": usr_prom}], template="campaign"))
              
              with c_col2:
                  if 'campaign_result' in st.session_state:
@@ -1626,38 +1606,32 @@ with col_center: # Center Workspace (Chat/Guide)
                     meta = selected_source.get('metadata', {})
                     v_path = meta.get('video_path')
                     
-                    # Auto-find video if path broken
+                    # Auto-fetch if path broken (served from the media cache when available)
                     if not v_path or not os.path.exists(v_path):
-                        reel_dir = "/Users/jaydengle/Transcribe-Reels/reel"
-                        if os.path.exists(reel_dir):
-                            possible = [os.path.join(reel_dir, f) for f in os.listdir(reel_dir)
-                                        if f.endswith(('.mp4', '.mkv', '.webm', '.mov'))]
-                            if possible: v_path = possible[0]
+                        re_download = download_reel(selected_source.get('url'))
+                        if re_download: v_path = re_download["video_path"]
 
                     if not v_path or not os.path.exists(v_path):
                         st.error("❌ No video file found. Please RE-ANALYZE the URL to download the video.")
+                    elif "Gemini" in sb_engine:
+                        # Upload + processing are polled by render_gemini_task below, not awaited in this run
+                        start_gemini_task('kling_storyboard', v_path, selected_source)
+                    elif not openai_client:
+                        st.error("❌ OpenAI API Key Missing.")
                     else:
                         with st.spinner("🎥 Analyzing video structure..."):
                             try:
-                                result = []
-                                if "Gemini" in sb_engine:
-                                    # Use new Gemini Native function
-                                    result = generate_kling_storyboard_gemini(v_path)
-                                else:
-                                    # Use legacy GPT-4o function (requires key)
-                                    if not openai_client:
-                                        st.error("❌ OpenAI API Key Missing.")
-                                    else:
-                                        result = generate_kling_storyboard(v_path, openai_client)
-
+                                # Use legacy GPT-4o function (requires key)
+                                result = generate_kling_storyboard(v_path, openai_client)
                                 if isinstance(result, list):
-                                    st.session_state['kling_storyboard'] = result
+                                    save_artifact(selected_source, 'kling_storyboard', result)
                                     st.success(f"🎥 Storyboard ready — {len(result)} shots!")
                                     st.rerun()
                                 else:
                                     st.error(f"Analysis Failed: {result}")
                             except Exception as e:
                                 st.error(f"Critical Error: {e}")
+                render_gemini_task('kling_storyboard')
 
                 # Display storyboard if generated
                 if 'kling_storyboard' in st.session_state:
@@ -1689,11 +1663,8 @@ with col_center: # Center Workspace (Chat/Guide)
                     v_path = meta.get('video_path')
                     
                     if not v_path or not os.path.exists(v_path):
-                        reel_dir = "/Users/jaydengle/Transcribe-Reels/reel"
-                        if os.path.exists(reel_dir):
-                            possible = [os.path.join(reel_dir, f) for f in os.listdir(reel_dir)
-                                        if f.endswith(('.mp4', '.mkv', '.webm', '.mov'))]
-                            if possible: v_path = possible[0]
+                        re_download = download_reel(selected_source.get('url'))
+                        if re_download: v_path = re_download["video_path"]
                     
                     if not openai_client:
                         st.error("❌ OpenAI API Key Missing. Please check your .env or sidebar settings.")
@@ -1703,22 +1674,22 @@ with col_center: # Center Workspace (Chat/Guide)
                         with st.spinner("📄 GPT-4o Vision reading every frame... (~60s)"):
                             try:
                                 t_text = selected_source.get('text', '')
-                                result = generate_how_to_pdf(v_path, t_text, openai_client)
+                                pdf_job = JobWorkspace(prefix="pdf_")
+                                result = generate_how_to_pdf(v_path, t_text, openai_client, workspace=pdf_job)
                                 if result and not result.startswith("ERROR"):
-                                    with open(result, 'rb') as fp:
-                                        st.download_button(
-                                            label="⬇️ Download How-To PDF",
-                                            data=fp.read(),
-                                            file_name="how_to_guide.pdf",
-                                            mime="application/pdf",
-                                            key="dl_pdf"
-                                        )
-                                    st.success("📄 PDF Ready! Click above to download.")
+                                    artifact_store.put_file(source_key(selected_source), PDF, result)
+                                    pdf_job.cleanup()
+                                    st.success("📄 PDF Ready! Download it below.")
                                 else:
                                     st.error(f"PDF Analysis Failed: {result}")
                             except Exception as e:
                                 st.error(f"Critical Error: {e}")
 
+                pdf_path = artifact_store.load(source_key(selected_source), PDF)
+                if pdf_path:
+                    with open(pdf_path, "rb") as fp:
+                        st.download_button(label="⬇️ Download How-To PDF", data=fp.read(), file_name="how_to_guide.pdf", mime="application/pdf", key="dl_pdf")
+
                 if st.button("📊 Create Slide Deck (PPTX)", use_container_width=True):
                      if openai_client:
                          with st.spinner("Compiling Deck..."):
@@ -1734,8 +1705,8 @@ with col_center: # Center Workspace (Chat/Guide)
                                 full_context = f"Transcript:\n{selected_source.get('text')}\n\n"
                                 instruction = "Create a powerful 7-slide presentation outline based on this text. Return a JSON list of objects only."
                                 ppt_prompt = f"{instruction} \n\nCONTEXT:\n{full_context}"
-                                response = openai_client.chat.completions.create(model="gpt-4", response_format={ "type": "json_object" }, messages=[{"role": "user", "content": ppt_prompt}])
-                                slides_data = json.loads(response.choices[0].message.content)
+                                slides_json = cached_chat(openai_client, "gpt-4", [{"role": "user", "content": ppt_prompt}], template="slide_deck", response_format={ "type": "json_object" })
+                                slides_data = json.loads(slides_json)
                                 
                                 # 2. Build PPTX (Basic Implementation for Stability)
                                 prs = Presentation()
@@ -1858,15 +1829,20 @@ with col_center: # Center Workspace (Chat/Guide)
             st.markdown("**🧠 Extract Skills from Current Video (Gemini)**")
             s_col1, s_col2 = st.columns([1, 2])
             with s_col1:
-                st.info("Uses Gemini frame analysis to identify technical skills demonstrated in the loaded video.")
+                st.info("Uses Gemini (the uploaded video, or Visual Timeline frames) to identify technical skills demonstrated in the loaded video.")
                 if st.button("🧠 Extract Exact Skills", use_container_width=True):
-                    if 'visual_timeline' in st.session_state:
+                    skill_video = selected_source.get('metadata', {}).get('video_path')
+                    if skill_video and os.path.exists(skill_video):
+                        # Reuses the Gemini upload made for the storyboard (or starts it); polled below
+                        start_gemini_task('extracted_skills', skill_video)
+                    elif 'visual_timeline' in st.session_state:
                         frames = st.session_state['visual_timeline']['frames']
                         with st.spinner("Gemini analyzing skills..."):
                             skills_text = extract_skills_gemini(frames)
                             st.session_state['extracted_skills'] = skills_text
                     else:
                         st.warning("Please generate a Visual Timeline in Tab 2 first so I have frames to analyze!")
+                render_gemini_task('extracted_skills')
             
             with s_col2:
                 if 'extracted_skills' in st.session_state:
@@ -1924,8 +1900,13 @@ with col_studio:
             st.markdown('<div class="studio-card">Main View</div>', unsafe_allow_html=True) # Placeholder
         with r1c2:
             if st.button("🔊 Audio", use_container_width=True):
-                 st.toast("Generating Audio Overview...")
-                 # Trigger Audio Gen
+                 # Serves this source's stored podcast; generating one is not wired to the Studio yet
+                 podcast_path = artifact_store.load(source_key(selected_source), PODCAST)
+                 if podcast_path:
+                     st.audio(podcast_path)
+                 else:
+                     st.toast("Generating Audio Overview...")
+                     # Trigger Audio Gen
 
         # Row 2
         r2c1, r2c2 = st.columns(2)
@@ -0,0 +1,115 @@
+import json
+
+from model_pool import get_model_pool, default_backend, FASTER_WHISPER, OPENAI_WHISPER
+from longform import transcribe_long, audio_duration, LONGFORM_MIN_SECONDS
+
+
+def format_timestamp(seconds):
+    seconds = int(seconds or 0)
+    return f"{seconds // 60:02d}:{seconds % 60:02d}"
+
+
+class TranscriptStream:
+    """
+    Iterate over timestamped segments ({"start", "end", "text"}) as Whisper decodes them.
+    faster-whisper yields segments lazily, so the first ones arrive within seconds;
+    openai-whisper only returns at the end, so its segments are replayed afterwards.
+    If `persist_path` is set, each segment is appended to it as a JSON line the moment it arrives.
+    `audio_file` may also be a 16 kHz float32 NumPy array (see `audio_utils.load_audio`).
+    Audio of LONGFORM_MIN_SECONDS or more is chunked at silences and decoded by `workers`
+    processes (see `longform.transcribe_long`); `long_form=True/False` forces it on or off.
+    `cpu_threads` is the decode's thread budget (0: WHISPER_CPU_THREADS, or every core when long-form
+    workers split it between them).
+    """
+
+    def __init__(self, audio_file, model_size="base", backend=None, compute_type="int8", beam_size=5, persist_path=None,
+                 long_form=None, workers=None, cpu_threads=0):
+        self.audio_file = audio_file
+        self.model_size = model_size
+        self.backend = backend or default_backend()
+        self.compute_type = compute_type
+        self.beam_size = beam_size
+        self.persist_path = persist_path
+        self.long_form = long_form
+        self.workers = workers
+        self.cpu_threads = cpu_threads
+        self.language = None
+        self.segments = []
+        self.done = False
+        self._iter = None
+
+    @property
+    def text(self):
+        return " ".join(s["text"] for s in self.segments).strip()
+
+    def _use_long_form(self):
+        if self.long_form is not None:
+            return self.long_form
+        duration = audio_duration(self.audio_file)
+        return duration is not None and duration >= LONGFORM_MIN_SECONDS
+
+    def _decode(self):
+        if self._use_long_form():
+            info = {}
+            for segment in transcribe_long(self.audio_file, self.model_size, backend=self.backend,
+                                           compute_type=self.compute_type, beam_size=self.beam_size,
+                                           workers=self.workers, info=info, cpu_threads=self.cpu_threads):
+                self.language = self.language or info.get("language")
+                yield segment
+            return
+        model = get_model_pool().get(self.model_size, backend=self.backend, compute_type=self.compute_type,
+                                     cpu_threads=self.cpu_threads)
+        if self.backend == FASTER_WHISPER:
+            segments, info = model.transcribe(self.audio_file, beam_size=self.beam_size, condition_on_previous_text=True)
+            self.language = info.language
+            for seg in segments:
+                yield {"start": round(seg.start, 2), "end": round(seg.end, 2), "text": seg.text.strip()}
+        elif self.backend == OPENAI_WHISPER:
+            result = model.transcribe(self.audio_file)
+            self.language = result.get("language")
+            for seg in result.get("segments", []):
+                yield {"start": round(seg["start"], 2), "end": round(seg["end"], 2), "text": seg["text"].strip()}
+        else:
+            raise RuntimeError("No Whisper backend installed. Run `pip install faster-whisper` or `pip install openai-whisper`.")
+
+    def __iter__(self):
+        if self._iter is None:
+            self._iter = self._run()
+        return self._iter
+
+    def _run(self):
+        out = open(self.persist_path, "a") if self.persist_path else None
+        try:
+            for segment in self._decode():
+                self.segments.append(segment)
+                if out:
+                    out.write(json.dumps(segment) + "\n")
+                    out.flush()
+                yield segment
+            self.done = True
+        finally:
+            if out:
+                out.close()
+
+    def result(self):
+        """Drain any remaining segments and return {"text", "language", "segments"}."""
+        if not self.done:
+            for _ in self:
+                pass
+        return {"text": self.text, "language": self.language, "segments": self.segments}
+
+
+def load_segments(path):
+    """Segments previously persisted by a TranscriptStream (partial if the run was interrupted)."""
+    segments = []
+    try:
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    segments.append(json.loads(line))
+    except FileNotFoundError:
+        pass
+    except json.JSONDecodeError:
+        pass  # last line was cut off mid-write
+    return segments
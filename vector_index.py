@@ -0,0 +1,266 @@
+import os
+import re
+import json
+import hashlib
+import sqlite3
+import threading
+from contextlib import closing
+
+import numpy as np
+
+from providers import get_client, run as run_provider, gather_ordered, OPENAI
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+EMBED_BATCH = int(os.getenv("EMBEDDING_BATCH", "128"))
+CHUNK_CHARS = 800
+
+
+# --- ✂️ CHUNKING ---
+def chunk_transcript(text, segments=None, max_chars=CHUNK_CHARS):
+    """
+    Split a transcript into ~max_chars chunks of {"text", "start", "end"}.
+    Whisper segments are grouped whole, so each chunk maps back to a time in the reel;
+    without segments the text is split on sentence boundaries (start/end are None).
+    """
+    pieces = [(s.get("text", "").strip(), s.get("start"), s.get("end")) for s in (segments or [])]
+    if not any(p[0] for p in pieces):
+        pieces = [(s, None, None) for s in re.split(r"(?<=[.!?])\s+", text or "")]
+    chunks, current, start, end = [], [], None, None
+    for piece, p_start, p_end in pieces:
+        if not piece:
+            continue
+        if current and sum(len(c) + 1 for c in current) + len(piece) > max_chars:
+            chunks.append({"text": " ".join(current), "start": start, "end": end})
+            current, start = [], None
+        current.append(piece)
+        start = p_start if start is None else start
+        end = p_end
+    if current:
+        chunks.append({"text": " ".join(current), "start": start, "end": end})
+    return chunks
+
+
+def chunk_hash(text, model=EMBEDDING_MODEL):
+    return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+
+def embed_texts(texts, model=EMBEDDING_MODEL):
+    """
+    Embed texts with the OpenAI embeddings API in batches of EMBEDDING_BATCH, all batches in flight
+    at once on the shared async client; returns an (n, dim) float32 array.
+    """
+    client = get_client(OPENAI)
+    batches = [texts[i:i + EMBED_BATCH] for i in range(0, len(texts), EMBED_BATCH)]
+    results = run_provider(gather_ordered([client.embeddings(model, batch) for batch in batches]))
+    return np.asarray([v for batch in results for v in batch], dtype=np.float32)
+
+
+# --- 🧠 VECTOR INDEX ---
+class VectorIndex:
+    """
+    Semantic search over transcript chunks. Unit-normalized embeddings are appended to a
+    float16 matrix on disk (memory-mapped for search); SQLite maps matrix rows to chunks.
+    Vectors are keyed by a hash of model + chunk text, so unchanged text is never re-embedded.
+    """
+
+    def __init__(self, root=None, model=EMBEDDING_MODEL, embed_fn=None):
+        self.model = model
+        self.root = root or os.getenv("VECTOR_INDEX_DIR", os.path.join(BASE_DIR, ".cache", "vectors"))
+        self.dir = os.path.join(self.root, re.sub(r"[^A-Za-z0-9_.-]", "_", model))
+        os.makedirs(self.dir, exist_ok=True)
+        self.matrix_path = os.path.join(self.dir, "vectors.f16")
+        self.db_path = os.path.join(self.dir, "chunks.sqlite3")
+        self.embed_fn = embed_fn or (lambda texts: embed_texts(texts, model=model))
+        self._mmap = None
+        self._mmap_rows = 0
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            conn.execute("CREATE TABLE IF NOT EXISTS vectors (hash TEXT PRIMARY KEY, row INTEGER UNIQUE NOT NULL)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS chunks (
+                    url TEXT NOT NULL,
+                    idx INTEGER NOT NULL,
+                    hash TEXT NOT NULL,
+                    remote_id TEXT,
+                    title TEXT,
+                    start REAL,
+                    "end" REAL,
+                    text TEXT,
+                    PRIMARY KEY (url, idx)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_chunks_hash ON chunks(hash)")
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=60, isolation_level=None)
+
+    def _dim(self, conn):
+        row = conn.execute("SELECT value FROM meta WHERE key = 'dim'").fetchone()
+        return int(row[0]) if row else None
+
+    def index(self, url, text, segments=None, title="", remote_id=None):
+        """
+        (Re)index one transcript. Only chunks whose text has never been embedded are sent to the
+        embeddings API; returns the number of new embeddings.
+        """
+        chunks = chunk_transcript(text, segments)
+        hashes = [chunk_hash(c["text"], self.model) for c in chunks]
+        with closing(self._connect()) as conn:
+            known = {h for (h,) in conn.execute(
+                f"SELECT hash FROM vectors WHERE hash IN ({','.join('?' * len(hashes))})", hashes)} if hashes else set()
+        new = {}
+        for h, c in zip(hashes, chunks):
+            if h not in known:
+                new.setdefault(h, c["text"])
+        # Embedding happens outside the write lock; other processes keep indexing meanwhile
+        vectors = self.embed_fn(list(new.values())) if new else None
+
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")  # also serializes appends to the matrix file across processes
+            try:
+                added = 0
+                if new:
+                    vectors = np.asarray(vectors, dtype=np.float32)
+                    vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+                    dim = self._dim(conn)
+                    if dim is None:
+                        dim = vectors.shape[1]
+                        conn.execute("INSERT INTO meta (key, value) VALUES ('dim', ?)", (str(dim),))
+                    row = os.path.getsize(self.matrix_path) // (dim * 2) if os.path.exists(self.matrix_path) else 0
+                    with open(self.matrix_path, "ab") as f:
+                        for h, vec in zip(new, vectors):
+                            if conn.execute("SELECT 1 FROM vectors WHERE hash = ?", (h,)).fetchone():
+                                continue  # another process embedded it first
+                            f.write(vec.astype(np.float16).tobytes())
+                            conn.execute("INSERT INTO vectors (hash, row) VALUES (?, ?)", (h, row))
+                            row += 1
+                            added += 1
+                conn.execute("DELETE FROM chunks WHERE url = ?", (url,))
+                conn.executemany(
+                    'INSERT INTO chunks (url, idx, hash, remote_id, title, start, "end", text) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    [(url, i, h, None if remote_id is None else str(remote_id), title or "", c["start"], c["end"], c["text"])
+                     for i, (h, c) in enumerate(zip(hashes, chunks))],
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return added
+
+    def remove(self, url):
+        with closing(self._connect()) as conn:
+            conn.execute("DELETE FROM chunks WHERE url = ?", (url,))
+
+    def _matrix(self, dim):
+        rows = os.path.getsize(self.matrix_path) // (dim * 2) if os.path.exists(self.matrix_path) else 0
+        if rows and rows != self._mmap_rows:
+            self._mmap = np.memmap(self.matrix_path, dtype=np.float16, mode="r", shape=(rows, dim))
+            self._mmap_rows = rows
+        return self._mmap if rows else None
+
+    def search(self, query, k=10, per_reel=1, block_rows=65536):
+        """
+        Top reels for a natural-language query: [{"url", "id", "title", "score", "text", "start", "end"}].
+        Brute-force cosine similarity over the memory-mapped matrix, scanned in blocks.
+        """
+        with closing(self._connect()) as conn:
+            dim = self._dim(conn)
+        matrix = self._matrix(dim) if dim else None
+        if matrix is None or not (query or "").strip():
+            return []
+        q = np.asarray(self.embed_fn([query]), dtype=np.float32)[0]
+        q /= max(np.linalg.norm(q), 1e-12)
+
+        # Over-fetch: vectors no longer referenced by any chunk, and extra chunks of one reel, are dropped below
+        want = max(k * per_reel * 4, 50)
+        best_rows, best_scores = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        for offset in range(0, matrix.shape[0], block_rows):
+            scores = np.asarray(matrix[offset:offset + block_rows], dtype=np.float32) @ q
+            top = np.argpartition(-scores, min(want, len(scores) - 1))[:want]
+            best_rows = np.concatenate([best_rows, top + offset])
+            best_scores = np.concatenate([best_scores, scores[top]])
+        order = np.argsort(-best_scores)[:want]
+        score_by_row = {int(best_rows[i]): float(best_scores[i]) for i in order}
+
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                f'SELECT v.row, c.url, c.remote_id, c.title, c.text, c.start, c."end" FROM vectors v '
+                f"JOIN chunks c ON c.hash = v.hash WHERE v.row IN ({','.join('?' * len(score_by_row))})",
+                list(score_by_row),
+            ).fetchall()
+        hits = sorted(rows, key=lambda r: -score_by_row[r[0]])
+        results, per_url = [], {}
+        for row, url, remote_id, title, text, start, end in hits:
+            if per_url.get(url, 0) >= per_reel:
+                continue
+            per_url[url] = per_url.get(url, 0) + 1
+            results.append({"url": url, "id": remote_id, "title": title, "score": score_by_row[row],
+                            "text": text, "start": start, "end": end})
+            if len(results) >= k * per_reel:
+                break
+        return results
+
+    def stats(self):
+        with closing(self._connect()) as conn:
+            dim = self._dim(conn)
+            vectors = conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+            live = conn.execute("SELECT COUNT(DISTINCT hash) FROM chunks").fetchone()[0]
+            reels = conn.execute("SELECT COUNT(DISTINCT url) FROM chunks").fetchone()[0]
+        size = os.path.getsize(self.matrix_path) if os.path.exists(self.matrix_path) else 0
+        return {"model": self.model, "dim": dim, "vectors": vectors, "live_vectors": live, "reels": reels, "matrix_mb": size / 1e6}
+
+
+def index_row(row, index=None):
+    """Index a Supabase transcripts row; segments come from metadata when present."""
+    index = index or get_vector_index()
+    metadata = row.get("metadata") or {}
+    segments = row.get("segments") or metadata.get("segments")
+    if isinstance(segments, str):
+        segments = json.loads(segments)
+    title = metadata.get("title") or row.get("title") or ""
+    return index.index(row["url"], row.get("text") or "", segments, title, row.get("id"))
+
+
+def sync_from_database(db_manager, index=None, page_size=200):
+    """Embed every transcript not yet indexed (or whose text changed). Returns the number of new embeddings."""
+    index = index or get_vector_index()
+    added, cursor = 0, None
+    while True:
+        rows, cursor = db_manager.list_transcripts(
+            limit=page_size, cursor=cursor, columns="id, url, text, created_at, title:metadata->>title, segments:metadata->segments")
+        for row in rows:
+            added += index_row(row, index)
+        if not cursor:
+            break
+    return added
+
+
+def find_reels(query, k=10):
+    """Python API: reels most semantically related to `query`, best first."""
+    return get_vector_index().search(query, k=k)
+
+
+_index = None
+_sync_started = False
+_lock = threading.Lock()
+
+
+def get_vector_index():
+    global _index
+    with _lock:
+        if _index is None:
+            _index = VectorIndex()
+    return _index
+
+
+def ensure_vector_index(db_manager):
+    """Start one background embedding sync per process (needs OPENAI_API_KEY)."""
+    global _sync_started
+    with _lock:
+        if _sync_started or not db_manager.supabase or not os.getenv("OPENAI_API_KEY"):
+            return
+        _sync_started = True
+    threading.Thread(target=sync_from_database, args=(db_manager,), daemon=True).start()
@@ -0,0 +1,28 @@
+from frames import get_frame_sampler, image_part, VISION_TOKEN_BUDGET
+from llm_cache import cached_chat
+
+VISUAL_HOOK_PROMPT = (
+    "These are key frames from a specific Reel, in order (0s, 3s, then the biggest visual changes). "
+    "Analyze the VISUAL HOOK. What happens in the first 3 seconds visually? How does the camera move? "
+    "What text is overlayed? Explain why the VISUALS made this viral."
+)
+
+
+def analyze_visual_frames(video_path):
+    sampler = get_frame_sampler(video_path)
+    duration = sampler.duration
+
+    # Hook frames (0s, 3s) plus the most visually distinct moments of the rest, near-duplicates dropped
+    timestamps = sampler.select(4, token_budget=VISION_TOKEN_BUDGET, include=[min(3, duration / 2)])
+
+    return sampler.frames(timestamps)
+
+
+def analyze_visual_hook(video_path, openai_client):
+    """
+    GPT-4o read of the reel's visual hook. Goes through the LLM cache, so running it during
+    ingest (alongside transcription) makes the app's Visual Decoder instant for that reel.
+    """
+    frames = analyze_visual_frames(video_path)
+    messages = [{"role": "user", "content": [{"type": "text", "text": VISUAL_HOOK_PROMPT}, *map(image_part, frames)]}]
+    return cached_chat(openai_client, "gpt-4o", messages, template="visual_hook", max_tokens=600)
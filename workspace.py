@@ -0,0 +1,79 @@
+import os
+import time
+import shutil
+import tempfile
+import weakref
+
+
+def workspace_root():
+    """Parent directory for job workspaces. Point WORKSPACE_ROOT at fast local disk or tmpfs (e.g. /dev/shm)."""
+    root = os.getenv("WORKSPACE_ROOT") or os.path.join(tempfile.gettempdir(), "transcribe-reels")
+    os.makedirs(root, exist_ok=True)
+    return root
+
+
+class JobWorkspace:
+    """
+    Unique scratch directory for one job (one "Add Source" click, one storyboard, ...).
+    Every intermediate file lives here, so concurrent sessions never touch each other's files.
+    The directory is removed on `cleanup()`, on leaving a `with` block, or when the object is garbage collected.
+    """
+
+    def __init__(self, prefix="job_", root=None, name=None):
+        self.root = root or workspace_root()
+        if name:
+            # Named workspaces can be reopened, e.g. by a worker resuming a queued job
+            self.path = os.path.join(self.root, name)
+            os.makedirs(self.path, exist_ok=True)
+        else:
+            self.path = tempfile.mkdtemp(prefix=prefix, dir=self.root)
+        self.job_id = os.path.basename(self.path)
+        self._finalizer = weakref.finalize(self, shutil.rmtree, self.path, ignore_errors=True)
+
+    def file(self, name):
+        """Path for `name` inside the workspace (the file itself is not created)."""
+        return os.path.join(self.path, name)
+
+    def subdir(self, name):
+        path = os.path.join(self.path, name)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def cleanup(self):
+        self._finalizer.detach()
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def detach(self):
+        """Hand ownership of the directory to the caller; it is then only removed by `cleanup_stale_workspaces`."""
+        self._finalizer.detach()
+        return self.path
+
+    @property
+    def closed(self):
+        return not os.path.exists(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.cleanup()
+
+    def __repr__(self):
+        return f"JobWorkspace({self.path!r})"
+
+
+def cleanup_stale_workspaces(max_age_hours=None, root=None):
+    """Remove workspaces left behind by crashed processes. Returns the number removed."""
+    max_age_hours = max_age_hours or float(os.getenv("WORKSPACE_MAX_AGE_HOURS", "6"))
+    root = root or workspace_root()
+    cutoff = time.time() - max_age_hours * 3600
+    removed = 0
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        try:
+            if os.path.isdir(path) and os.path.getmtime(path) < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+                removed += 1
+        except OSError:
+            pass
+    return removed